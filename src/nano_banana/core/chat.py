@@ -1,38 +1,246 @@
-"""OpenAI-compatible 流式聊天，无 Qt 依赖。"""
+"""OpenAI-compatible 流式聊天，无 Qt 依赖。
+
+同步版（stream_chat / iter_sse_response）供桌面线程与 WSGI 使用；
+a 前缀的异步版基于 AsyncOpenAI，供 ASGI 入口在一个事件循环里承载大量并发流。
+客户端从进程级连接池借用（client_pool.chat_client），同一 base_url 的流复用 TLS 连接。
+输出边到边做增量 JSON 解析（core.partial_json）：schema 字段一读完就产出 field 事件，
+输出不是合法 JSON 时尽早产出 invalid 事件，调用方不必等 done 再整体 json.loads。
+逐 token 的 content 事件经 coalesce_events 按时间窗 / 字数合并后再发 SSE 或 Qt 信号。
+局部修改（mode="patch"）时模型只返回改动的字段，with_patch_result 在 done 前校验合并，
+产出带完整新文档的 result 事件。按分类修改（categories）时只把相关分类的切片发给模型，
+合并回来时其余分类原样保留。
+生成请求带 structured（StructuredOutput）时用 response_format 传 schema 派生的 JSON Schema，
+端点明确拒绝 response_format 时依次降级到 json_object、纯提示词，
+并按 (base_url, model) 记住能用的那一级，过期后重新从 JSON Schema 试起。
+"""
 from __future__ import annotations
 
+import asyncio
+import inspect
 import json
+import os
 import re
-from collections.abc import Callable, Iterator
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
 from dataclasses import dataclass
 from typing import Any
 
-from nano_banana.core.images.protocol import encode_image_reference
-from nano_banana.core.prompts import MODIFY_SYSTEM_PROMPT, SYSTEM_PROMPT
+from nano_banana.core.client_pool import async_chat_client, chat_client
+from nano_banana.core.images.protocol import encode_image_references
+from nano_banana.core.partial_json import PromptFieldParser
+from nano_banana.core.prompt_doc import (
+    detect_categories,
+    document_json_schema,
+    merge_patch,
+    subset_categories,
+)
+from nano_banana.core.prompts import (
+    MODIFY_PATCH_SYSTEM_PROMPT,
+    MODIFY_SYSTEM_PROMPT,
+    STRUCTURED_SYSTEM_PROMPT,
+    SYSTEM_PROMPT,
+)
+from nano_banana.core.schema import get_schema
 
 
 CancelledFn = Callable[[], bool]
 
+# content 合并：相邻两次发出至少间隔这么久（秒），攒够这么多字立即发；0 表示不合并
+DEFAULT_COALESCE_WINDOW = 0.05
+DEFAULT_COALESCE_CHARS = 1024
+
+# 修改模式：full 返回完整 JSON；patch 只返回改动的字段，本地合并
+MODIFY_MODE_FULL = "full"
+MODIFY_MODE_PATCH = "patch"
+MODIFY_MODES = (MODIFY_MODE_FULL, MODIFY_MODE_PATCH)
+# 修改范围：分类 id 列表，或 auto 按修改要求自动判断（需显式传入，默认整份文档）
+MODIFY_SCOPE_AUTO = "auto"
+# auto 判断范围时按这些分隔把修改要求拆成子句，每个子句都要认出分类才算有把握
+_INSTRUCTION_CLAUSE_RE = re.compile(r"[，,。；;！!？?\n]|并且|同时|另外")
+
+# 结构化输出按此顺序降级：JSON Schema 约束 → 只要求 JSON 对象 → 不带 response_format
+FORMAT_JSON_SCHEMA = "json_schema"
+FORMAT_JSON_OBJECT = "json_object"
+FORMAT_NONE = "none"
+RESPONSE_FORMAT_LEVELS = (FORMAT_JSON_SCHEMA, FORMAT_JSON_OBJECT, FORMAT_NONE)
+# 端点拒绝 response_format 时的状态码；错误内容还必须提到下列字段之一才算不支持
+_UNSUPPORTED_FORMAT_STATUS = (400, 422)
+_UNSUPPORTED_FORMAT_MARKERS = ("response_format", "json_schema", "json_object")
+# 记住的降级级别多久后失效（秒），端点升级或一次误判不会永久关掉结构化输出
+FORMAT_LEVEL_TTL = 3600.0
+
 
 @dataclass(frozen=True)
 class ChatEvent:
+    """type: thinking / content / field / invalid / result / error / done。
+
+    field 事件的 data 为 {"id", "path", "value"}（见 partial_json.FieldValue），
+    result 事件的 data 为局部修改合并后的完整文档。
+    """
+
     type: str
     text: str = ""
+    data: Any = None
 
 
-def create_chat_client(*, base_url: str, api_key: str, timeout: float = 180):
-    """立刻构造客户端（SSE 要在上游 create 之前先把 started 发出去）。"""
-    from openai import OpenAI
-    import httpx
+class _CompletionEvents:
+    """把流式 chunk 翻译成 ChatEvent；同步与异步迭代共用。"""
 
-    http_client = httpx.Client(http2=False)
-    client = OpenAI(
-        api_key=api_key,
-        base_url=(base_url or "").rstrip("/"),
-        timeout=timeout,
-        http_client=http_client,
-    )
-    return client, http_client
+    def __init__(self):
+        self.thinking_reported = False
+        self.parts: list[str] = []
+        self.fields = PromptFieldParser()
+        self.invalid_reported = False
+
+    def feed(self, chunk) -> Iterator[ChatEvent]:
+        if not chunk.choices:
+            return
+        delta = chunk.choices[0].delta
+        reasoning_content = getattr(delta, "reasoning_content", None)
+        if reasoning_content and not self.thinking_reported:
+            self.thinking_reported = True
+            yield ChatEvent("thinking")
+        if delta and delta.content:
+            self.parts.append(delta.content)
+            yield ChatEvent("content", delta.content)
+            for field in self.fields.feed(delta.content):
+                yield ChatEvent("field", data=field.to_dict())
+            yield from self._invalid()
+
+    def done(self) -> Iterator[ChatEvent]:
+        self.fields.finish()
+        yield from self._invalid()
+        yield ChatEvent("done", "".join(self.parts))
+
+    def _invalid(self) -> Iterator[ChatEvent]:
+        if self.fields.error and not self.invalid_reported:
+            self.invalid_reported = True
+            yield ChatEvent("invalid", self.fields.error)
+
+
+@dataclass(frozen=True)
+class StructuredOutput:
+    """结构化输出请求：json_schema 用的 JSON Schema，以及降级后换回的完整系统提示词。
+
+    用 json_schema 时系统提示词可以省掉示例块；降级到 json_object / 纯提示词后，
+    结构只能靠提示词里的示例，所以把 system 消息换成 fallback_prompt。
+    """
+
+    schema: dict[str, Any]
+    fallback_prompt: str
+    name: str = "prompt_document"
+
+    def response_format(self, level: str) -> dict[str, Any] | None:
+        if level == FORMAT_JSON_SCHEMA:
+            return {
+                "type": "json_schema",
+                "json_schema": {"name": self.name, "strict": True, "schema": self.schema},
+            }
+        if level == FORMAT_JSON_OBJECT:
+            return {"type": "json_object"}
+        return None
+
+    def messages_for(self, messages: list[dict[str, Any]], level: str) -> list[dict[str, Any]]:
+        if level == FORMAT_JSON_SCHEMA:
+            return messages
+        return [
+            {**message, "content": self.fallback_prompt} if message.get("role") == "system" else message
+            for message in messages
+        ]
+
+
+def structured_output_enabled() -> bool:
+    """NANO_BANANA_STRUCTURED_OUTPUT=0 时不发 response_format（端点接受却不遵守时用）。"""
+    value = os.environ.get("NANO_BANANA_STRUCTURED_OUTPUT", "").strip().lower()
+    return value not in ("0", "false", "no", "off")
+
+
+def generate_structured_output() -> StructuredOutput | None:
+    """生成提示词的结构化输出请求；关闭时返回 None。"""
+    if not structured_output_enabled():
+        return None
+    return StructuredOutput(document_json_schema(get_schema()), SYSTEM_PROMPT)
+
+
+# (base_url, model) → (上次成功的降级级别, 记录时间)，避免每次请求都先吃一次 400
+_response_format_levels: dict[tuple[str, str], tuple[str, float]] = {}
+
+
+def _format_key(client, model: str) -> tuple[str, str]:
+    return (str(getattr(client, "base_url", "")), model)
+
+
+def _completion_attempts(
+    client,
+    messages: list[dict[str, Any]],
+    model: str,
+    structured: StructuredOutput | None,
+) -> list[tuple[str, dict[str, Any]]]:
+    """按降级顺序列出 (级别, create 参数)；没有 structured 时只有一次普通请求。"""
+    base = {"model": model, "stream": True}
+    if structured is None:
+        return [(FORMAT_NONE, {**base, "messages": messages})]
+    known = _known_format_level(_format_key(client, model))
+    attempts = []
+    for level in RESPONSE_FORMAT_LEVELS[RESPONSE_FORMAT_LEVELS.index(known):]:
+        kwargs = {**base, "messages": structured.messages_for(messages, level)}
+        response_format = structured.response_format(level)
+        if response_format is not None:
+            kwargs["response_format"] = response_format
+        attempts.append((level, kwargs))
+    return attempts
+
+
+def _known_format_level(key: tuple[str, str]) -> str:
+    level, recorded_at = _response_format_levels.get(key, (FORMAT_JSON_SCHEMA, 0.0))
+    if time.monotonic() - recorded_at > FORMAT_LEVEL_TTL:
+        _response_format_levels.pop(key, None)
+        return FORMAT_JSON_SCHEMA
+    return level
+
+
+def _remember_format_level(client, model: str, level: str) -> None:
+    key = _format_key(client, model)
+    if level == FORMAT_JSON_SCHEMA:
+        _response_format_levels.pop(key, None)
+    else:
+        _response_format_levels[key] = (level, time.monotonic())
+
+
+def _format_unsupported(exc: Exception) -> bool:
+    """只有 400/422 且错误内容指向 response_format 才降级；上下文超长、内容审核等照常抛出。"""
+    if getattr(exc, "status_code", None) not in _UNSUPPORTED_FORMAT_STATUS:
+        return False
+    detail = f"{exc} {getattr(exc, 'body', '') or ''}".lower()
+    return any(marker in detail for marker in _UNSUPPORTED_FORMAT_MARKERS)
+
+
+def _create_stream(client, messages, model: str, structured: StructuredOutput | None):
+    attempts = _completion_attempts(client, messages, model, structured)
+    for index, (level, kwargs) in enumerate(attempts):
+        try:
+            stream = client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            if index == len(attempts) - 1 or not _format_unsupported(exc):
+                raise
+            continue
+        if structured is not None:
+            _remember_format_level(client, model, level)
+        return stream
+
+
+async def _acreate_stream(client, messages, model: str, structured: StructuredOutput | None):
+    attempts = _completion_attempts(client, messages, model, structured)
+    for index, (level, kwargs) in enumerate(attempts):
+        try:
+            stream = await client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            if index == len(attempts) - 1 or not _format_unsupported(exc):
+                raise
+            continue
+        if structured is not None:
+            _remember_format_level(client, model, level)
+        return stream
 
 
 def iter_completion_events(
@@ -41,29 +249,296 @@ def iter_completion_events(
     *,
     model: str,
     cancelled: CancelledFn | None = None,
+    structured: StructuredOutput | None = None,
 ) -> Iterator[ChatEvent]:
-    thinking_reported = False
-    stream = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        stream=True,
+    stream = _create_stream(client, messages, model, structured)
+    events = _CompletionEvents()
+    try:
+        for chunk in stream:
+            if cancelled and cancelled():
+                yield ChatEvent("error", "已取消")
+                return
+            yield from events.feed(chunk)
+    finally:
+        # 客户端是共享的：提前结束时要关掉这条响应，连接才能回到池里
+        _close_stream(stream)
+    yield from events.done()
+
+
+async def aiter_completion_events(
+    client,
+    messages: list[dict[str, Any]],
+    *,
+    model: str,
+    cancelled: CancelledFn | None = None,
+    structured: StructuredOutput | None = None,
+) -> AsyncIterator[ChatEvent]:
+    """iter_completion_events 的异步版，client 为 AsyncOpenAI。"""
+    stream = await _acreate_stream(client, messages, model, structured)
+    events = _CompletionEvents()
+    try:
+        async for chunk in stream:
+            if cancelled and cancelled():
+                yield ChatEvent("error", "已取消")
+                return
+            for event in events.feed(chunk):
+                yield event
+    finally:
+        result = _close_stream(stream)
+        if inspect.isawaitable(result):
+            await result
+    for event in events.done():
+        yield event
+
+
+def _close_stream(stream) -> Any:
+    close = getattr(stream, "close", None)
+    return close() if callable(close) else None
+
+
+def coalesce_settings() -> tuple[float, int]:
+    """(时间窗秒数, 字数阈值)；可用 NANO_BANANA_STREAM_COALESCE_MS / _CHARS 覆盖。"""
+    window_ms = os.environ.get("NANO_BANANA_STREAM_COALESCE_MS", "").strip()
+    chars = os.environ.get("NANO_BANANA_STREAM_COALESCE_CHARS", "").strip()
+    return (
+        int(window_ms) / 1000 if window_ms.isdigit() else DEFAULT_COALESCE_WINDOW,
+        int(chars) if chars.isdigit() else DEFAULT_COALESCE_CHARS,
     )
-    full_content = ""
-    for chunk in stream:
-        if cancelled and cancelled():
-            yield ChatEvent("error", "已取消")
-            return
-        if not chunk.choices:
-            continue
-        delta = chunk.choices[0].delta
-        reasoning_content = getattr(delta, "reasoning_content", None)
-        if reasoning_content and not thinking_reported:
-            thinking_reported = True
-            yield ChatEvent("thinking")
-        if delta and delta.content:
-            full_content += delta.content
-            yield ChatEvent("content", delta.content)
-    yield ChatEvent("done", full_content)
+
+
+class ChunkCoalescer:
+    """把连续的小段文本攒成一段：片段存列表，发出时才 join 一次。
+
+    距上次发出已超过 window 秒的片段立即发出（停顿后的首字不延迟），
+    否则先攒着，直到时间窗到期或攒够 max_chars 字。window / max_chars 为 0 表示不按该条件发出。
+    """
+
+    def __init__(
+        self,
+        window: float = DEFAULT_COALESCE_WINDOW,
+        max_chars: int = DEFAULT_COALESCE_CHARS,
+        *,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.window = max(0.0, window)
+        self.max_chars = max(0, max_chars)
+        self._clock = clock
+        self._parts: list[str] = []
+        self._size = 0
+        self._last_emit = float("-inf")
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0 or self.max_chars > 0
+
+    @property
+    def pending(self) -> bool:
+        return bool(self._parts)
+
+    def push(self, text: str) -> str:
+        """放入一段；该发出时返回合并后的文本，否则返回空串。"""
+        self._parts.append(text)
+        self._size += len(text)
+        if 0 < self.max_chars <= self._size or self.time_left() == 0:
+            return self.flush()
+        return ""
+
+    def time_left(self) -> float | None:
+        """距时间窗到期的秒数；没有待发内容或不按时间发出时为 None。"""
+        if not self._parts or not self.window:
+            return None
+        return max(0.0, self._last_emit + self.window - self._clock())
+
+    def flush(self) -> str:
+        text = "".join(self._parts)
+        self._parts = []
+        self._size = 0
+        if text:
+            self._last_emit = self._clock()
+        return text
+
+
+def coalesce_events(
+    events: Iterator[ChatEvent],
+    *,
+    window: float | None = None,
+    max_chars: int | None = None,
+) -> Iterator[ChatEvent]:
+    """合并相邻的 content 事件；其他事件原样透传，透传前先发出已攒的内容保持顺序。
+
+    同步迭代只在下一个事件到达时检查时间窗：上游停顿期间最多压住一个时间窗内的内容。
+    """
+    default_window, default_chars = coalesce_settings()
+    coalescer = ChunkCoalescer(
+        default_window if window is None else window,
+        default_chars if max_chars is None else max_chars,
+    )
+    if not coalescer.enabled:
+        yield from events
+        return
+    try:
+        for event in events:
+            if event.type == "content":
+                text = coalescer.push(event.text)
+                if text:
+                    yield ChatEvent("content", text)
+                continue
+            if coalescer.pending:
+                yield ChatEvent("content", coalescer.flush())
+            yield event
+        if coalescer.pending:
+            yield ChatEvent("content", coalescer.flush())
+    finally:
+        _close_stream(events)
+
+
+async def acoalesce_events(
+    events: AsyncIterator[ChatEvent],
+    *,
+    window: float | None = None,
+    max_chars: int | None = None,
+) -> AsyncIterator[ChatEvent]:
+    """coalesce_events 的异步版：时间窗到期即发出，不必等下一个事件。"""
+    default_window, default_chars = coalesce_settings()
+    coalescer = ChunkCoalescer(
+        default_window if window is None else window,
+        default_chars if max_chars is None else max_chars,
+    )
+    if not coalescer.enabled:
+        async for event in events:
+            yield event
+        return
+    iterator = events.__aiter__()
+    pending: asyncio.Future | None = None
+    try:
+        while True:
+            if pending is None:
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({pending}, timeout=coalescer.time_left())
+            if not done:
+                yield ChatEvent("content", coalescer.flush())
+                continue
+            future, pending = pending, None
+            try:
+                event = future.result()
+            except StopAsyncIteration:
+                break
+            if event.type == "content":
+                text = coalescer.push(event.text)
+                if text:
+                    yield ChatEvent("content", text)
+                continue
+            if coalescer.pending:
+                yield ChatEvent("content", coalescer.flush())
+            yield event
+        if coalescer.pending:
+            yield ChatEvent("content", coalescer.flush())
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        aclose = getattr(events, "aclose", None)
+        if callable(aclose):
+            await aclose()
+
+
+def parse_modify_base(current_data: Any) -> dict[str, Any]:
+    """局部修改的合并基准：当前提示词（JSON 文本或 dict）必须是 JSON 对象。"""
+    if isinstance(current_data, str):
+        try:
+            current_data = json.loads(current_data)
+        except ValueError as exc:
+            raise ValueError(f"当前提示词不是合法的 JSON: {exc}") from exc
+    if not isinstance(current_data, dict):
+        raise ValueError("当前提示词必须是 JSON 对象")
+    return current_data
+
+
+def resolve_modify_scope(requested: Any, instruction: str = "") -> list[str] | None:
+    """修改范围 → 分类 id 列表；None 表示整份文档（未指定，或 auto 没有把握）。
+
+    auto 只在修改要求的每个子句都认出了分类时才收窄范围，取各子句分类的并集；
+    有任何子句认不出，就退回整份文档，避免漏掉修改要求实际涉及的分类。
+    """
+    if not requested:
+        return None
+    schema = get_schema()
+    if requested == MODIFY_SCOPE_AUTO:
+        clauses = [
+            clause for clause in _INSTRUCTION_CLAUSE_RE.split(instruction or "") if clause.strip()
+        ]
+        detected = [detect_categories(clause, schema) for clause in clauses]
+        if not detected or not all(detected):
+            return None
+        found = {category_id for categories in detected for category_id in categories}
+        return [category_id for category_id in schema.category_ids if category_id in found]
+    if isinstance(requested, str) or not isinstance(requested, (list, tuple)):
+        raise ValueError(f"无效的修改范围: {requested!r}")
+    unknown = [item for item in requested if item not in schema.category_ids]
+    if unknown:
+        raise ValueError(f"未知分类: {', '.join(map(str, unknown))}")
+    return [category_id for category_id in schema.category_ids if category_id in requested]
+
+
+def resolve_patch(
+    current: dict[str, Any], content: str, categories: list[str] | None = None
+) -> ChatEvent:
+    """模型输出的局部文档 → result 事件（合并后的完整文档）；不合法时为 error 事件。"""
+    try:
+        merged = merge_patch(
+            current, json.loads(strip_code_fences(content)), categories=categories
+        )
+    except ValueError as exc:
+        return ChatEvent("error", f"AI 返回的修改无法应用: {exc}")
+    return ChatEvent("result", data=merged)
+
+
+def with_patch_result(
+    events: Iterator[ChatEvent],
+    current: dict[str, Any],
+    categories: list[str] | None = None,
+) -> Iterator[ChatEvent]:
+    """在 done 之前插入 result 事件；局部文档不合法时以 error 结束。"""
+    try:
+        for event in events:
+            if event.type == "done":
+                result = resolve_patch(current, event.text, categories)
+                yield result
+                if result.type == "error":
+                    return
+            yield event
+    finally:
+        _close_stream(events)
+
+
+async def awith_patch_result(
+    events: AsyncIterator[ChatEvent],
+    current: dict[str, Any],
+    categories: list[str] | None = None,
+) -> AsyncIterator[ChatEvent]:
+    """with_patch_result 的异步版。"""
+    try:
+        async for event in events:
+            if event.type == "done":
+                result = resolve_patch(current, event.text, categories)
+                yield result
+                if result.type == "error":
+                    return
+            yield event
+    finally:
+        aclose = getattr(events, "aclose", None)
+        if callable(aclose):
+            await aclose()
+
+
+def _chat_config_error(*, base_url: str, api_key: str, model: str) -> str:
+    if not api_key:
+        return "请先配置API密钥"
+    if not (base_url or "").strip():
+        return "请先配置Base URL"
+    if not (model or "").strip():
+        return "请先配置模型名称"
+    return ""
 
 
 def stream_chat(
@@ -74,34 +549,51 @@ def stream_chat(
     model: str,
     cancelled: CancelledFn | None = None,
     timeout: float = 180,
+    structured: StructuredOutput | None = None,
 ) -> Iterator[ChatEvent]:
     """向 OpenAI-compatible chat completions 发流式请求。"""
-    if not api_key:
-        yield ChatEvent("error", "请先配置API密钥")
-        return
-    if not (base_url or "").strip():
-        yield ChatEvent("error", "请先配置Base URL")
-        return
-    if not (model or "").strip():
-        yield ChatEvent("error", "请先配置模型名称")
+    config_error = _chat_config_error(base_url=base_url, api_key=api_key, model=model)
+    if config_error:
+        yield ChatEvent("error", config_error)
         return
 
     try:
-        client, http_client = create_chat_client(
-            base_url=base_url, api_key=api_key, timeout=timeout
-        )
+        with chat_client(base_url=base_url, api_key=api_key, timeout=timeout) as client:
+            yield from iter_completion_events(
+                client, messages, model=model, cancelled=cancelled, structured=structured
+            )
     except ImportError as exc:
         yield ChatEvent("error", f"openai 导入失败: {exc}")
+    except Exception as exc:  # noqa: BLE001
+        yield ChatEvent("error", _format_chat_error(exc))
+
+
+async def astream_chat(
+    messages: list[dict[str, Any]],
+    *,
+    base_url: str,
+    api_key: str,
+    model: str,
+    cancelled: CancelledFn | None = None,
+    timeout: float = 180,
+    structured: StructuredOutput | None = None,
+) -> AsyncIterator[ChatEvent]:
+    """stream_chat 的异步版：等待上游 token 时不占线程。"""
+    config_error = _chat_config_error(base_url=base_url, api_key=api_key, model=model)
+    if config_error:
+        yield ChatEvent("error", config_error)
         return
 
     try:
-        yield from iter_completion_events(
-            client, messages, model=model, cancelled=cancelled
-        )
+        with async_chat_client(base_url=base_url, api_key=api_key, timeout=timeout) as client:
+            async for event in aiter_completion_events(
+                client, messages, model=model, cancelled=cancelled, structured=structured
+            ):
+                yield event
+    except ImportError as exc:
+        yield ChatEvent("error", f"openai 导入失败: {exc}")
     except Exception as exc:  # noqa: BLE001
         yield ChatEvent("error", _format_chat_error(exc))
-    finally:
-        http_client.close()
 
 
 def iter_sse_response(
@@ -111,27 +603,66 @@ def iter_sse_response(
     api_key: str,
     model: str,
     timeout: float = 180,
+    patch_base: dict[str, Any] | None = None,
+    categories: list[str] | None = None,
+    structured: StructuredOutput | None = None,
 ) -> Iterator[str]:
-    """Web SSE：先构造客户端并发送 started，再打上游。"""
-    client, http_client = create_chat_client(
-        base_url=base_url, api_key=api_key, timeout=timeout
-    )
-    try:
-        yield f"data: {json.dumps({'status': 'started'})}\n\n"
-        yield from iter_sse(
-            iter_completion_events(client, messages, model=model),
-            include_started=False,
-        )
-    except Exception as exc:  # noqa: BLE001
-        yield f"data: {json.dumps({'error': _format_chat_error(exc)})}\n\n"
-    finally:
-        http_client.close()
+    """Web SSE：先借出客户端并发送 started，再打上游。
+
+    patch_base 不为空时按局部 / 分类修改处理，在 [DONE] 前发送 {"result": 合并后的文档}。
+    structured 不为空时请求结构化输出（见 StructuredOutput）。
+    """
+    with chat_client(base_url=base_url, api_key=api_key, timeout=timeout) as client:
+        try:
+            yield f"data: {json.dumps({'status': 'started'})}\n\n"
+            events = iter_completion_events(
+                client, messages, model=model, structured=structured
+            )
+            if patch_base is not None:
+                events = with_patch_result(events, patch_base, categories)
+            yield from iter_sse(coalesce_events(events), include_started=False)
+        except Exception as exc:  # noqa: BLE001
+            yield f"data: {json.dumps({'error': _format_chat_error(exc)})}\n\n"
+
+
+async def aiter_sse_response(
+    messages: list[dict[str, Any]],
+    *,
+    base_url: str,
+    api_key: str,
+    model: str,
+    timeout: float = 180,
+    patch_base: dict[str, Any] | None = None,
+    categories: list[str] | None = None,
+    structured: StructuredOutput | None = None,
+) -> AsyncIterator[str]:
+    """iter_sse_response 的异步版（ASGI）：同样先发 started 再打上游。"""
+    with async_chat_client(base_url=base_url, api_key=api_key, timeout=timeout) as client:
+        try:
+            yield f"data: {json.dumps({'status': 'started'})}\n\n"
+            events = aiter_completion_events(
+                client, messages, model=model, structured=structured
+            )
+            if patch_base is not None:
+                events = awith_patch_result(events, patch_base, categories)
+            async for event in acoalesce_events(events):
+                line = sse_line(event)
+                if line:
+                    yield line
+                if event.type in ("error", "done"):
+                    return
+            yield "data: [DONE]\n\n"
+        except Exception as exc:  # noqa: BLE001
+            yield f"data: {json.dumps({'error': _format_chat_error(exc)})}\n\n"
 
 
 def build_generate_messages(
     user_prompt: str,
     images: list[str] | None = None,
+    *,
+    structured: bool = False,
 ) -> list[dict[str, Any]]:
+    """structured=True 时用不带示例块的精简系统提示词（配合 response_format 使用）。"""
     user_content = _multimodal_user_content(
         images or [],
         text_with_images=f"请根据以下描述和参考图片生成提示词：\n\n{user_prompt}",
@@ -140,7 +671,7 @@ def build_generate_messages(
         require_any=True,
     )
     return [
-        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "system", "content": STRUCTURED_SYSTEM_PROMPT if structured else SYSTEM_PROMPT},
         {"role": "user", "content": user_content},
     ]
 
@@ -149,10 +680,26 @@ def build_modify_messages(
     current_data: str,
     modify_request: str,
     images: list[str] | None = None,
+    *,
+    mode: str = MODIFY_MODE_FULL,
+    categories: list[str] | None = None,
 ) -> list[dict[str, Any]]:
-    text_content = (
-        f"当前提示词：\n{current_data}\n\n修改要求：{modify_request}\n\n请返回修改后的JSON提示词:"
+    """categories 不为空时只发送这些分类的切片（current_data 须为 JSON 对象）。"""
+    if mode not in MODIFY_MODES:
+        raise ValueError(f"未知的修改模式: {mode}")
+    instruction = (
+        "请只返回需要修改的字段（JSON 片段）:"
+        if mode == MODIFY_MODE_PATCH
+        else "请返回修改后的JSON提示词:"
     )
+    heading = "当前提示词"
+    if categories:
+        schema = get_schema()
+        sliced = subset_categories(parse_modify_base(current_data), categories, schema)
+        current_data = json.dumps(sliced, ensure_ascii=False, indent=2)
+        labels = "、".join(schema.get_category(category_id).label for category_id in categories)
+        heading = f"当前提示词（只包含与本次修改相关的部分：{labels}）"
+    text_content = f"{heading}：\n{current_data}\n\n修改要求：{modify_request}\n\n{instruction}"
     user_content = _multimodal_user_content(
         images or [],
         text_with_images=text_content,
@@ -161,7 +708,10 @@ def build_modify_messages(
         require_any=False,
     )
     return [
-        {"role": "system", "content": MODIFY_SYSTEM_PROMPT},
+        {
+            "role": "system",
+            "content": MODIFY_PATCH_SYSTEM_PROMPT if mode == MODIFY_MODE_PATCH else MODIFY_SYSTEM_PROMPT,
+        },
         {"role": "user", "content": user_content},
     ]
 
@@ -171,19 +721,33 @@ def iter_sse(events: Iterator[ChatEvent], *, include_started: bool = True) -> It
     if include_started:
         yield f"data: {json.dumps({'status': 'started'})}\n\n"
     for event in events:
-        if event.type == "thinking":
-            yield f"data: {json.dumps({'status': 'thinking'})}\n\n"
-        elif event.type == "content":
-            yield f"data: {json.dumps({'content': event.text})}\n\n"
-        elif event.type == "error":
-            yield f"data: {json.dumps({'error': event.text})}\n\n"
-            return
-        elif event.type == "done":
-            yield "data: [DONE]\n\n"
+        line = sse_line(event)
+        if line:
+            yield line
+        if event.type in ("error", "done"):
             return
     yield "data: [DONE]\n\n"
 
 
+def sse_line(event: ChatEvent) -> str:
+    """单个 ChatEvent 对应的 SSE 消息；未知类型返回空串。"""
+    if event.type == "thinking":
+        return f"data: {json.dumps({'status': 'thinking'})}\n\n"
+    if event.type == "content":
+        return f"data: {json.dumps({'content': event.text})}\n\n"
+    if event.type == "field":
+        return f"data: {json.dumps({'field': event.data})}\n\n"
+    if event.type == "invalid":
+        return f"data: {json.dumps({'invalid': event.text})}\n\n"
+    if event.type == "result":
+        return f"data: {json.dumps({'result': event.data})}\n\n"
+    if event.type == "error":
+        return f"data: {json.dumps({'error': event.text})}\n\n"
+    if event.type == "done":
+        return "data: [DONE]\n\n"
+    return ""
+
+
 def _multimodal_user_content(
     images: list[str],
     *,
@@ -192,14 +756,10 @@ def _multimodal_user_content(
     images_only: str,
     require_any: bool,
 ) -> Any:
-    parts: list[dict[str, Any]] = []
-    for image_ref in images:
-        parts.append(
-            {
-                "type": "image_url",
-                "image_url": {"url": encode_image_reference(image_ref)},
-            }
-        )
+    parts: list[dict[str, Any]] = [
+        {"type": "image_url", "image_url": {"url": url}}
+        for url in encode_image_references(images)
+    ]
     if parts and (text_with_images or "").strip():
         parts.append({"type": "text", "text": text_with_images})
         return parts
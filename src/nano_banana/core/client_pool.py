@@ -0,0 +1,312 @@
+"""进程级客户端池：复用 keep-alive 连接，空闲超时后关闭。
+
+provider 实例仍然按次构造（它们持有每次请求的生成参数），
+真正昂贵的 OpenAI / genai / httpx 客户端从这里按键复用。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import importlib.util
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from contextlib import contextmanager
+from typing import Any, Optional
+
+# 必须大于单次生图/流式对话的最长耗时，避免请求进行中被回收。
+DEFAULT_IDLE_TIMEOUT = 600.0
+DEFAULT_MAX_CLIENTS = 32
+
+
+def api_key_fingerprint(api_key: str) -> str:
+    """缓存键只保留密钥摘要，换密钥即换客户端。"""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def http2_available() -> bool:
+    """httpx 的 HTTP/2 依赖 h2 包，未安装时退回 HTTP/1.1。"""
+    return importlib.util.find_spec("h2") is not None
+
+
+class ClientPool:
+    """线程安全的 LRU 客户端池，按键复用并回收空闲客户端。
+
+    客户端只能通过 lease() 借出；借出期间不会因空闲超时或容量淘汰被关闭（流式响应可能很长）。
+    异步客户端传入所属事件循环：关闭时在该循环上 await aclose()，循环关闭后条目直接丢弃。
+    """
+
+    def __init__(
+        self,
+        *,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        max_clients: int = DEFAULT_MAX_CLIENTS,
+    ):
+        self.idle_timeout = idle_timeout
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        # key -> [client, 最近使用时间, 借出次数, 所属事件循环（同步客户端为 None）]
+        self._entries: OrderedDict[Hashable, list[Any]] = OrderedDict()
+
+    @contextmanager
+    def lease(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        *,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+    ) -> Iterator[Any]:
+        """借出客户端直到 with 块结束，期间不会被回收。"""
+        client = self._acquire(key, factory, loop)
+        try:
+            yield client
+        finally:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] is client:
+                    entry[1] = time.monotonic()
+                    entry[2] -= 1
+
+    def _acquire(
+        self,
+        key: Hashable,
+        factory: Callable[[], Any],
+        loop: Optional[asyncio.AbstractEventLoop],
+    ) -> Any:
+        now = time.monotonic()
+        expired: list[list[Any]] = []
+        with self._lock:
+            expired.extend(self._pop_idle(now))
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = [factory(), now, 0, loop]
+                self._entries[key] = entry
+                expired.extend(self._pop_overflow(keep=key))
+            else:
+                entry[1] = now
+                self._entries.move_to_end(key)
+            entry[2] += 1
+            client = entry[0]
+        for old_entry in expired:
+            _close_entry(old_entry)
+        return client
+
+    def in_use(self) -> int:
+        """当前借出中的客户端数。"""
+        with self._lock:
+            return sum(1 for entry in self._entries.values() if entry[2])
+
+    def evict_idle(self) -> int:
+        with self._lock:
+            expired = self._pop_idle(time.monotonic())
+        for entry in expired:
+            _close_entry(entry)
+        return len(expired)
+
+    def clear(self) -> None:
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            _close_entry(entry)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def _pop_idle(self, now: float) -> list[list[Any]]:
+        """空闲超时的条目，以及所属事件循环已关闭的条目（其连接已不可用）。"""
+        stale = [
+            key
+            for key, (_, last_used, leases, loop) in self._entries.items()
+            if (loop is not None and loop.is_closed())
+            or (not leases and now - last_used > self.idle_timeout)
+        ]
+        return [self._entries.pop(key) for key in stale]
+
+    def _pop_overflow(self, keep: Hashable) -> list[list[Any]]:
+        """超出容量时从最久未用的开始淘汰；借出中的跳过（可暂时超出上限）。"""
+        overflow = len(self._entries) - self.max_clients
+        if overflow <= 0:
+            return []
+        victims = [
+            key for key, entry in self._entries.items() if not entry[2] and key != keep
+        ][:overflow]
+        return [self._entries.pop(key) for key in victims]
+
+
+def _close_entry(entry: list[Any]) -> None:
+    client, loop = entry[0], entry[3]
+    if loop is None:
+        _close_quietly(client)
+    else:
+        _aclose_on_loop(client, loop)
+
+
+def _close_quietly(client: Any) -> None:
+    close = getattr(client, "close", None)
+    if not callable(close):
+        return
+    try:
+        result = close()
+    except Exception:  # noqa: BLE001
+        return
+    if inspect.iscoroutine(result):
+        result.close()
+
+
+def _async_close_method(client: Any) -> Optional[Callable[[], Any]]:
+    """httpx.AsyncClient 用 aclose()，genai 的异步连接在 client.aio 上，AsyncOpenAI 的 close() 本身是协程。"""
+    for owner in (client, getattr(client, "aio", None)):
+        aclose = getattr(owner, "aclose", None)
+        if callable(aclose):
+            return aclose
+    close = getattr(client, "close", None)
+    return close if callable(close) else None
+
+
+def _aclose_on_loop(client: Any, loop: asyncio.AbstractEventLoop) -> None:
+    """异步客户端只能在所属事件循环上关闭；循环已关闭时连接随之失效，无需处理。"""
+    if loop.is_closed():
+        return
+    aclose = _async_close_method(client)
+    if aclose is None:
+        return
+
+    async def close_client() -> None:
+        try:
+            result = aclose()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:  # noqa: BLE001
+            pass
+
+    try:
+        asyncio.run_coroutine_threadsafe(close_client(), loop)
+    except RuntimeError:
+        pass
+
+
+_shared_pool = ClientPool()
+
+
+def get_client_pool() -> ClientPool:
+    return _shared_pool
+
+
+def create_http_client(**kwargs: Any):
+    """构造 httpx.Client；安装了 h2 时默认开启 HTTP/2。"""
+    import httpx
+
+    kwargs.setdefault("http2", http2_available())
+    kwargs.setdefault(
+        "limits",
+        httpx.Limits(max_connections=64, max_keepalive_connections=16, keepalive_expiry=60),
+    )
+    return httpx.Client(**kwargs)
+
+
+def shared_http_client(scope: str, **kwargs: Any):
+    """借出按 scope 复用的 httpx.Client，超时等在单次请求上传。返回上下文管理器。"""
+    return _shared_pool.lease(("httpx", scope), lambda: create_http_client(**kwargs))
+
+
+def shared_openai_client(scope: str, *, base_url: str, api_key: str):
+    """借出按 (scope, base_url, 密钥摘要) 复用的 OpenAI 客户端。返回上下文管理器。"""
+    key = ("openai", scope, (base_url or "").rstrip("/"), api_key_fingerprint(api_key))
+
+    def factory():
+        from openai import DefaultHttpxClient, OpenAI
+
+        return OpenAI(
+            api_key=api_key,
+            base_url=(base_url or "").rstrip("/") or None,
+            http_client=DefaultHttpxClient(http2=http2_available()),
+        )
+
+    return _shared_pool.lease(key, factory)
+
+
+def create_async_http_client(**kwargs: Any):
+    """构造 httpx.AsyncClient，参数约定同 create_http_client。"""
+    import httpx
+
+    kwargs.setdefault("http2", http2_available())
+    kwargs.setdefault(
+        "limits",
+        httpx.Limits(max_connections=256, max_keepalive_connections=32, keepalive_expiry=60),
+    )
+    return httpx.AsyncClient(**kwargs)
+
+
+def shared_async_http_client(scope: str, **kwargs: Any):
+    """借出按 (scope, 当前事件循环) 复用的 httpx.AsyncClient；异步连接不能跨循环使用。"""
+    loop = asyncio.get_running_loop()
+    return _shared_pool.lease(
+        ("httpx-async", scope, loop), lambda: create_async_http_client(**kwargs), loop=loop
+    )
+
+
+def chat_client(*, base_url: str, api_key: str, timeout: float):
+    """借出对话用的 OpenAI 客户端，按 (base_url, 密钥摘要, timeout) 复用连接。
+
+    返回上下文管理器；流式响应读完（或中途放弃）后退出 with 块归还。
+    """
+    base_url = (base_url or "").rstrip("/")
+    key = ("chat", base_url, api_key_fingerprint(api_key), timeout)
+
+    def factory():
+        from openai import OpenAI
+
+        return OpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            http_client=create_http_client(timeout=timeout),
+        )
+
+    return _shared_pool.lease(key, factory)
+
+
+def async_chat_client(*, base_url: str, api_key: str, timeout: float):
+    """chat_client 的 AsyncOpenAI 版，额外按当前事件循环隔离。"""
+    base_url = (base_url or "").rstrip("/")
+    loop = asyncio.get_running_loop()
+    key = ("chat-async", base_url, api_key_fingerprint(api_key), timeout, loop)
+
+    def factory():
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            http_client=create_async_http_client(timeout=timeout),
+        )
+
+    return _shared_pool.lease(key, factory, loop=loop)
+
+
+def shared_async_openai_client(scope: str, *, base_url: str, api_key: str):
+    """AsyncOpenAI 版 shared_openai_client，额外按事件循环隔离。"""
+    loop = asyncio.get_running_loop()
+    key = (
+        "openai-async",
+        scope,
+        (base_url or "").rstrip("/"),
+        api_key_fingerprint(api_key),
+        loop,
+    )
+
+    def factory():
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        return AsyncOpenAI(
+            api_key=api_key,
+            base_url=(base_url or "").rstrip("/") or None,
+            http_client=DefaultAsyncHttpxClient(http2=http2_available()),
+        )
+
+    return _shared_pool.lease(key, factory, loop=loop)
@@ -1,11 +1,18 @@
-"""AI API 配置管理。对话 AI 与图片生成渠道使用相互独立的配置。"""
-from copy import deepcopy
-from typing import Any
+"""AI API 配置管理。对话 AI 与图片生成渠道使用相互独立的配置。
 
-import yaml
+配置在内存里保留一份快照，按文件 mtime/size 校验是否失效，getter 不再反复解析 yaml；
+写入只在内容真的变化时发生，batch() 内的多次保存合并成一次原子写。
+写盘时持有跨进程锁，并在磁盘上的最新配置之上重新应用本次修改，多个 worker 互不覆盖。
+"""
+import threading
+from contextlib import contextmanager
+from copy import deepcopy
+from typing import Any, Callable, Optional
 
+from nano_banana.core.file_lock import file_lock
 from nano_banana.core.images.provider_config import IMAGE_PROVIDER_META, extract_provider_credentials
 from nano_banana.core.resource_path import get_resource_path
+from nano_banana.core.yaml_io import file_signature, read_yaml, write_yaml_atomic
 
 
 def flatten_legacy_or_nested(data: dict[str, Any]) -> dict[str, Any]:
@@ -92,49 +99,126 @@ class AIConfigManager:
     def __init__(self):
         self.config_path = get_resource_path("config/ai_config.yaml")
         self._ensure_config_exists()
+        self._lock = threading.RLock()
+        # (路径, mtime_ns, size, inode) -> 扁平配置；路径参与校验，外部改 config_path 时自动失效
+        self._snapshot_key: Optional[tuple] = None
+        self._snapshot: Optional[dict] = None
+        self._batch_depth = 0
+        self._pending: Optional[dict] = None
+        # batch() 内积累的修改函数，落盘时在最新的磁盘配置上依次重放
+        self._pending_updates: list[Callable[[dict], None]] = []
     
     def _ensure_config_exists(self):
         """确保配置文件目录存在"""
         self.config_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    def load_config(self) -> dict:
-        """加载 AI 配置，对外始终返回扁平 dict（兼容旧调用方）。"""
-        try:
-            if self.config_path.exists():
-                with open(self.config_path, "r", encoding="utf-8") as f:
-                    data = yaml.safe_load(f)
-                    if isinstance(data, dict) and data:
-                        return self._normalize_flat(data)
-        except Exception as e:
-            print(f"加载AI配置失败: {e}")
+
+    def _default_flat(self) -> dict:
         return {
             key: deepcopy(default) if isinstance(default, dict) else ""
             for key, default in self.DEFAULT_CONFIG.items()
         }
 
+    def _current_locked(self) -> dict:
+        """返回当前生效的扁平配置（内部只读引用）。未落盘的批量修改优先。"""
+        if self._pending is not None:
+            return self._pending
+        key = file_signature(self.config_path)
+        if key is not None and key == self._snapshot_key and self._snapshot is not None:
+            return self._snapshot
+        config = None
+        if key is not None:
+            try:
+                data = read_yaml(self.config_path)
+                if isinstance(data, dict) and data:
+                    config = self._normalize_flat(data)
+            except Exception as e:
+                print(f"加载AI配置失败: {e}")
+        if config is None:
+            config = self._default_flat()
+        self._snapshot_key = key
+        self._snapshot = config
+        return config
+    
+    def load_config(self) -> dict:
+        """加载 AI 配置，对外始终返回扁平 dict（兼容旧调用方）。"""
+        with self._lock:
+            return deepcopy(self._current_locked())
+
     def save_config(self, config: dict, merge_existing: bool = True) -> bool:
-        """保存 AI 配置。磁盘写入嵌套结构，读取时仍兼容旧扁平 yaml。"""
+        """保存 AI 配置。磁盘写入嵌套结构，读取时仍兼容旧扁平 yaml。
+
+        合并后与当前配置相同则不写盘；batch() 内只更新内存，退出时统一落盘。
+        """
+        updates = flatten_legacy_or_nested(config) if isinstance(config, dict) else {}
+
+        def apply(current: dict) -> None:
+            if not merge_existing:
+                current.clear()
+                current.update(self._default_flat())
+            current.update(deepcopy(updates))
+
+        return self._update_config(apply)
+
+    def _update_config(self, apply: Callable[[dict], None]) -> bool:
+        """用 apply 原地修改扁平配置并保存。读-改-写在跨进程锁内完成。"""
         try:
-            current = self.load_config() if merge_existing else {
-                key: deepcopy(default) if isinstance(default, dict) else ""
-                for key, default in self.DEFAULT_CONFIG.items()
-            }
-            updates = flatten_legacy_or_nested(config) if isinstance(config, dict) else {}
-            current.update(updates)
-            nested = nest_config(current)
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                yaml.dump(
-                    nested,
-                    f,
-                    allow_unicode=True,
-                    default_flow_style=False,
-                    sort_keys=False,
-                )
+            with self._lock:
+                if self._batch_depth:
+                    current = deepcopy(self._current_locked())
+                    apply(current)
+                    if current != self._current_locked():
+                        self._pending = current
+                        self._pending_updates.append(apply)
+                    return True
+                with file_lock(self.config_path):
+                    self._write_updates_locked([apply])
             return True
         except Exception as e:
             print(f"保存AI配置失败: {e}")
             return False
 
+    def _write_updates_locked(self, updates: list[Callable[[dict], None]]) -> None:
+        """在磁盘上的最新配置上应用修改；结果没有变化时不写盘。调用方需持有文件锁。"""
+        base = self._current_locked()
+        current = deepcopy(base)
+        for apply in updates:
+            apply(current)
+        if self._snapshot_key is not None and current == base:
+            return
+        self._write_locked(current)
+
+    @contextmanager
+    def batch(self):
+        """合并多次 save_config：块内只改内存快照，退出时最多写一次盘。"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def flush(self) -> bool:
+        """立即写入 batch() 中积累的修改；没有待写内容时直接返回 True。"""
+        with self._lock:
+            updates, self._pending_updates = self._pending_updates, []
+            self._pending = None
+            if not updates:
+                return True
+            try:
+                with file_lock(self.config_path):
+                    self._write_updates_locked(updates)
+                return True
+            except Exception as e:
+                print(f"保存AI配置失败: {e}")
+                return False
+
+    def _write_locked(self, flat: dict) -> None:
+        write_yaml_atomic(self.config_path, nest_config(flat))
+        self._snapshot = flat
+        self._snapshot_key = file_signature(self.config_path)
+
     def _normalize_flat(self, data: dict) -> dict:
         flat = flatten_legacy_or_nested(data)
         result = {}
@@ -233,14 +317,20 @@ class AIConfigManager:
         """保存指定渠道/模型的生成参数偏好。"""
         if provider not in IMAGE_PROVIDER_META:
             raise ValueError(f"未知图片生成渠道: {provider}")
-        config = self.load_config()
-        all_options = config.get("image_generation_options") or {}
-        if not isinstance(all_options, dict):
-            all_options = {}
-        all_options = deepcopy(all_options)
-        provider_options = all_options.setdefault(provider, {})
-        provider_options[self._options_model_key(model)] = deepcopy(options)
-        return self.save_config({"image_generation_options": all_options})
+        options = deepcopy(options)
+
+        def apply(current: dict) -> None:
+            # 在锁内读取最新的全部参数再改一项，不覆盖其他进程刚保存的别的渠道
+            all_options = current.get("image_generation_options")
+            if not isinstance(all_options, dict):
+                all_options = {}
+            provider_options = all_options.setdefault(provider, {})
+            if not isinstance(provider_options, dict):
+                provider_options = all_options[provider] = {}
+            provider_options[self._options_model_key(model)] = deepcopy(options)
+            current["image_generation_options"] = all_options
+
+        return self._update_config(apply)
 
     def get_openai_image_config(self) -> dict:
         config = self.load_config()
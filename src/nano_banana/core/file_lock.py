@@ -0,0 +1,60 @@
+"""跨进程文件锁：多个 worker 进程读-改-写同一份配置时用它串行化。
+
+锁加在目标旁边的 `<文件名>.lock` 上（POSIX 用 flock，Windows 用 msvcrt），
+进程退出时操作系统会自动释放，不会留下死锁。锁文件本身保留，不参与数据读写。
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+def lock_path_for(path: Path | str) -> Path:
+    path = Path(path)
+    return path.with_name(f"{path.name}.lock")
+
+
+if os.name == "nt":
+    import msvcrt
+
+    def _acquire(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        while True:
+            try:
+                # LK_LOCK 自身最多重试 10 秒，超时后继续等
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                time.sleep(0.05)
+
+    def _release(fd: int) -> None:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _acquire(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+    def _release(fd: int) -> None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: Path | str) -> Iterator[None]:
+    """对 path 加排他锁直到退出 with 块。同一进程的不同线程之间同样互斥。"""
+    lock_path = lock_path_for(path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        _acquire(fd)
+        try:
+            yield
+        finally:
+            _release(fd)
+    finally:
+        os.close(fd)
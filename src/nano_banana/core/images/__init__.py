@@ -1,15 +1,19 @@
 """图片生成适配层。provider 实现按需导入，避免 schema/config 被 openai 绑死。"""
 
 from nano_banana.core.images.protocol import (
+    ImageData,
     ImageGenerateOptions,
     ImageProvider,
     create_image_provider,
     create_image_provider_from_credentials,
     encode_image_reference,
+    encode_image_references,
     get_image_provider_capabilities,
     get_provider_label,
+    supports_partial_images,
 )
 from nano_banana.core.images.provider_config import IMAGE_PROVIDER_META
+from nano_banana.core.images.result import ImageResult, as_image_result
 
 _PROVIDER_EXPORTS = {
     "DoubaoImageProvider": ("nano_banana.core.images.doubao", "DoubaoImageProvider"),
@@ -24,16 +28,21 @@ __all__ = [
     "IMAGE_PROVIDER_META",
     "DoubaoImageProvider",
     "GeminiImageProvider",
+    "ImageData",
     "ImageGenerateOptions",
+    "ImageResult",
     "ImageProvider",
     "OpenAIImagesProvider",
     "QwenHTTPError",
     "QwenImageProvider",
+    "as_image_result",
     "create_image_provider",
     "create_image_provider_from_credentials",
     "encode_image_reference",
+    "encode_image_references",
     "get_image_provider_capabilities",
     "get_provider_label",
+    "supports_partial_images",
 ]
 
 
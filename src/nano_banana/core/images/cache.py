@@ -0,0 +1,275 @@
+"""生图结果缓存：按请求指纹内容寻址，命中时直接读盘，不再调用付费接口。
+
+渠道返回的原始字节原样落盘，不做转码。
+
+默认关闭，设置 NANO_BANANA_IMAGE_CACHE=1 开启；
+NANO_BANANA_IMAGE_CACHE_MB 控制容量（默认 512），超出后按最近使用淘汰。
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+from nano_banana.core.images.protocol import (
+    ImageData,
+    ImageRef,
+    PartialImageCallback,
+    filter_generation_options,
+)
+from nano_banana.core.images.result import ImageResult, as_image_result
+from nano_banana.core.resource_path import get_resource_path
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+_HASH_CHUNK = 1024 * 1024
+
+
+def hash_image_reference(image_ref: ImageRef) -> str:
+    """本地文件与 ImageData 按内容取摘要；data URI / URL 按字符串本身取摘要。"""
+    digest = hashlib.sha256()
+    if isinstance(image_ref, ImageData):
+        digest.update(image_ref.data)
+        return digest.hexdigest()
+    value = (image_ref or "").strip()
+    if value and not value.startswith(("data:", "http://", "https://")) and os.path.isfile(value):
+        with open(value, "rb") as file_obj:
+            for chunk in iter(lambda: file_obj.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+    else:
+        digest.update(value.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def request_fingerprint(
+    provider: str,
+    model: str,
+    options: dict[str, Any],
+    text: str,
+    images: Optional[list[ImageRef]] = None,
+    variant: int = 0,
+) -> str:
+    """variant 区分同一请求的多张候选；0 号与单张生成共用同一指纹。"""
+    payload = {
+        "provider": provider,
+        "model": model,
+        "options": options,
+        "text": text,
+        "images": [hash_image_reference(ref) for ref in images or []],
+    }
+    if variant:
+        payload["variant"] = variant
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ImageResultCache:
+    """磁盘原始字节存储 + 内存 LRU 索引，线程安全。"""
+
+    def __init__(self, directory: Path | str, *, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index: Optional[OrderedDict[str, int]] = None
+        self._total_bytes = 0
+
+    def get(self, key: str) -> Optional[ImageResult]:
+        path = self._path(key)
+        with self._lock:
+            index = self._load_index_locked()
+            if key not in index:
+                self.misses += 1
+                return None
+            try:
+                result = ImageResult.from_bytes(path.read_bytes())
+                os.utime(path)
+            except OSError:
+                self._drop_locked(key)
+                self.misses += 1
+                return None
+            index.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: str, image: ImageResult) -> None:
+        data = as_image_result(image).data
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file_obj:
+                file_obj.write(data)
+            size = len(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        with self._lock:
+            index = self._load_index_locked()
+            self._total_bytes += size - index.pop(key, 0)
+            index[key] = size
+            self._evict_locked()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            index = self._load_index_locked()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(index),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._load_index_locked()):
+                self._drop_locked(key)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.img"
+
+    def _load_index_locked(self) -> OrderedDict[str, int]:
+        """首次使用时扫描目录，按 mtime 恢复 LRU 顺序。"""
+        if self._index is None:
+            entries = []
+            if self.directory.is_dir():
+                for path in self.directory.glob("*/*.img"):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._index.values())
+            self._evict_locked()
+        return self._index
+
+    def _evict_locked(self) -> None:
+        while self._index and self._total_bytes > self.max_bytes:
+            self._drop_locked(next(iter(self._index)))
+
+    def _drop_locked(self, key: str) -> None:
+        self._total_bytes -= self._index.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+
+class CachedImageProvider:
+    """包装任意 ImageProvider：相同请求指纹直接返回缓存图片。"""
+
+    def __init__(self, provider, cache: ImageResultCache, *, variant: int = 0):
+        self._provider = provider
+        self._cache = cache
+        self._options: dict[str, Any] = {}
+        self.variant = variant
+
+    def __getattr__(self, name: str):
+        return getattr(self._provider, name)
+
+    def set_generation_options(self, options: dict[str, Any]) -> None:
+        self._options = filter_generation_options(type(self._provider), options or {})
+        self._provider.set_generation_options(options)
+
+    def for_variant(self, index: int) -> "CachedImageProvider":
+        """同一请求的第 index 张候选：共享底层 provider 与参数，但各占一个缓存条目。"""
+        view = CachedImageProvider(self._provider, self._cache, variant=index)
+        view._options = self._options
+        return view
+
+    def _fingerprint(self, text: str, images: Optional[list[ImageRef]]) -> str:
+        return request_fingerprint(
+            self._provider.provider,
+            self._provider.model,
+            self._options,
+            text,
+            images,
+            variant=self.variant,
+        )
+
+    def generate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+        on_partial: Optional[PartialImageCallback] = None,
+    ) -> Optional[ImageResult]:
+        key = self._fingerprint(text, images)
+        cached = self._cache.get(key)
+        if cached is not None:
+            return cached
+        kwargs = {"on_partial": on_partial} if on_partial is not None else {}
+        image = as_image_result(
+            self._provider.generate_image(text=text, images=images, **kwargs)
+        )
+        if image is not None:
+            self._store(key, image)
+        return image
+
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]:
+        key = await asyncio.to_thread(self._fingerprint, text, images)
+        cached = await asyncio.to_thread(self._cache.get, key)
+        if cached is not None:
+            return cached
+        image = as_image_result(await self._provider.agenerate_image(text=text, images=images))
+        if image is not None:
+            await asyncio.to_thread(self._store, key, image)
+        return image
+
+    def _store(self, key: str, image: ImageResult) -> None:
+        try:
+            self._cache.put(key, image)
+        except Exception as e:  # noqa: BLE001
+            print(f"写入生图缓存失败: {e}")
+
+
+_shared_cache: Optional[ImageResultCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def image_cache_enabled() -> bool:
+    return os.environ.get("NANO_BANANA_IMAGE_CACHE", "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def get_image_cache() -> Optional[ImageResultCache]:
+    """未开启时返回 None。"""
+    global _shared_cache
+    if not image_cache_enabled():
+        return None
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            try:
+                max_mb = int(os.environ.get("NANO_BANANA_IMAGE_CACHE_MB") or 0)
+            except ValueError:
+                max_mb = 0
+            _shared_cache = ImageResultCache(
+                get_resource_path("cache/images"),
+                max_bytes=max_mb * 1024 * 1024 if max_mb > 0 else DEFAULT_MAX_BYTES,
+            )
+        return _shared_cache
+
+
+def with_image_cache(provider):
+    cache = get_image_cache()
+    return CachedImageProvider(provider, cache) if cache is not None else provider
+
+
+def for_variant(provider, index: int):
+    """多变体生成时给每张候选独立的缓存指纹；未开启缓存时原样返回 provider。"""
+    if isinstance(provider, CachedImageProvider):
+        return provider.for_variant(index)
+    return provider
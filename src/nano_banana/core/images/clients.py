@@ -1,27 +1,36 @@
 """图片生成 provider 兼容导出。"""
 
 from nano_banana.core.images.protocol import (
+    ImageData,
     ImageGenerateOptions,
     create_image_provider,
     create_image_provider_from_credentials,
     encode_image_reference,
+    encode_image_references,
     get_image_provider_capabilities,
     get_provider_label,
+    supports_partial_images,
 )
+from nano_banana.core.images.result import ImageResult, as_image_result
 
 __all__ = [
     "IMAGE_PROVIDER_CAPABILITIES",
     "DoubaoImageProvider",
     "GeminiImageProvider",
+    "ImageData",
     "ImageGenerateOptions",
+    "ImageResult",
     "OpenAIImagesProvider",
     "QwenHTTPError",
     "QwenImageProvider",
+    "as_image_result",
     "create_image_provider",
     "create_image_provider_from_credentials",
     "encode_image_reference",
+    "encode_image_references",
     "get_image_provider_capabilities",
     "get_provider_label",
+    "supports_partial_images",
 ]
 
 
@@ -1,16 +1,25 @@
 """火山方舟豆包 Seedream 生图 provider。"""
 
+import asyncio
+from contextlib import nullcontext
 from typing import Any, Optional
 
 from loguru import logger
-from PIL import Image
 
+from nano_banana.core.client_pool import shared_async_openai_client, shared_openai_client
 from nano_banana.core.images.openai_images import OpenAIImagesProvider
-from nano_banana.core.images.protocol import encode_image_reference, filter_generation_options
+from nano_banana.core.images.preprocess import reference_max_side
+from nano_banana.core.images.protocol import (
+    ImageRef,
+    PartialImageCallback,
+    encode_image_references,
+    filter_generation_options,
+)
 from nano_banana.core.images.provider_config import (
     ASPECT_RATIO_LIST,
     IMAGE_PROVIDER_META,
 )
+from nano_banana.core.images.result import ImageResult
 
 
 DOUBAO_IMAGE_SIZE_MAP = {
@@ -56,6 +65,7 @@ class DoubaoImageProvider:
     """火山方舟豆包 Seedream 图片生成 provider。"""
 
     provider = "doubao_image"
+    SUPPORTS_PARTIAL_IMAGES = True
     CAPABILITIES = {
         "label": IMAGE_PROVIDER_META["doubao_image"]["label"],
         "options": {
@@ -93,15 +103,15 @@ class DoubaoImageProvider:
     }
 
     def __init__(self, base_url: str, api_key: str, model: str):
-        from openai import OpenAI
-
         self.model = model or IMAGE_PROVIDER_META["doubao_image"]["default_model"]
         self.options: dict[str, Any] = {}
         normalized_base_url = (base_url or "").strip().rstrip("/")
         if normalized_base_url.endswith("/images/generations"):
             normalized_base_url = normalized_base_url[: -len("/images/generations")]
         self.base_url = normalized_base_url
-        self.client = OpenAI(api_key=api_key, base_url=self.base_url)
+        self.api_key = api_key
+        # 显式注入的客户端优先；默认每次请求从连接池借用
+        self.client = None
         logger.info(
             f"[DoubaoImageProvider] 初始化完成，模型: {self.model}，地址: {self.base_url}"
         )
@@ -118,9 +128,55 @@ class DoubaoImageProvider:
     def generate_image(
         self,
         text: str,
-        images: Optional[list[str]] = None,
-    ) -> Optional[Image.Image]:
+        images: Optional[list[ImageRef]] = None,
+        on_partial: Optional[PartialImageCallback] = None,
+    ) -> Optional[ImageResult]:
         kwargs = self._build_request_kwargs(text, images)
+        self._log_request(kwargs)
+        with self._lease_client() as client:
+            if on_partial is not None:
+                try:
+                    stream = client.images.generate(**kwargs, stream=True)
+                except Exception as exc:  # noqa: BLE001
+                    # 只有接口明确不支持流式时才改发普通请求，其余错误重发可能重复计费
+                    if not OpenAIImagesProvider._stream_unsupported(exc):
+                        raise RuntimeError(f"豆包 Seedream 请求失败: {exc}") from exc
+                    logger.warning(f"[DoubaoImageProvider] 流式生图不可用，改用普通请求: {exc}")
+                else:
+                    try:
+                        return OpenAIImagesProvider._consume_stream(stream, on_partial)
+                    except Exception as exc:  # noqa: BLE001
+                        raise RuntimeError(f"豆包 Seedream 请求失败: {exc}") from exc
+            try:
+                response = client.images.generate(**kwargs)
+            except Exception as exc:  # noqa: BLE001
+                raise RuntimeError(f"豆包 Seedream 请求失败: {exc}") from exc
+        return OpenAIImagesProvider._extract_image(response)
+
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]:
+        # 参考图读盘 + base64 编码放到线程里，避免阻塞事件循环。
+        kwargs = await asyncio.to_thread(self._build_request_kwargs, text, images)
+        self._log_request(kwargs)
+        with shared_async_openai_client(
+            self.provider, base_url=self.base_url, api_key=self.api_key
+        ) as client:
+            try:
+                response = await client.images.generate(**kwargs)
+            except Exception as exc:  # noqa: BLE001
+                raise RuntimeError(f"豆包 Seedream 请求失败: {exc}") from exc
+        return await OpenAIImagesProvider._aextract_image(response)
+
+    def _lease_client(self):
+        if self.client is not None:
+            return nullcontext(self.client)
+        return shared_openai_client(self.provider, base_url=self.base_url, api_key=self.api_key)
+
+    @staticmethod
+    def _log_request(kwargs: dict[str, Any]) -> None:
         log_kwargs = {key: value for key, value in kwargs.items() if key != "prompt"}
         extra_body = dict(log_kwargs.get("extra_body") or {})
         if "image" in extra_body:
@@ -128,16 +184,11 @@ class DoubaoImageProvider:
             extra_body["image"] = f"{len(refs) if isinstance(refs, list) else 1} 张参考图"
             log_kwargs["extra_body"] = extra_body
         logger.info(f"[DoubaoImageProvider] 发起请求，参数: {log_kwargs}")
-        try:
-            response = self.client.images.generate(**kwargs)
-        except Exception as exc:  # noqa: BLE001
-            raise RuntimeError(f"豆包 Seedream 请求失败: {exc}") from exc
-        return OpenAIImagesProvider._extract_image(response)
 
     def _build_request_kwargs(
         self,
         prompt: str,
-        images: Optional[list[str]],
+        images: Optional[list[ImageRef]],
     ) -> dict[str, Any]:
         extra_body: dict[str, Any] = {
             "watermark": str(self.options.get("watermark", "false")).lower() == "true",
@@ -150,7 +201,9 @@ class DoubaoImageProvider:
                 logger.warning(
                     f"[DoubaoImageProvider] 参考图超过 10 张，仅使用前 10 张（共 {len(images)}）"
                 )
-            encoded_images = [encode_image_reference(image) for image in images[:10]]
+            encoded_images = encode_image_references(
+                images[:10], max_side=reference_max_side(self.provider)
+            )
             extra_body["image"] = (
                 encoded_images[0] if len(encoded_images) == 1 else encoded_images
             )
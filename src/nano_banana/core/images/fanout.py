@@ -0,0 +1,79 @@
+"""多变体并发生图：同一请求生成多张候选，按完成顺序逐张返回。"""
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from nano_banana.core.images.cache import for_variant
+from nano_banana.core.images.protocol import ImageRef, supports_partial_images
+from nano_banana.core.images.provider_config import provider_concurrency_limit
+
+MAX_VARIANTS = 8
+
+
+@dataclass(frozen=True)
+class VariantResult:
+    index: int
+    image: Any = None
+    error: str = ""
+
+
+def clamp_variant_count(count: Any) -> int:
+    try:
+        value = int(count)
+    except (TypeError, ValueError):
+        return 1
+    return max(1, min(MAX_VARIANTS, value))
+
+
+def iter_variant_results(
+    provider,
+    text: str,
+    images: Optional[list[ImageRef]] = None,
+    count: int = 1,
+    on_partial: Optional[Callable[[int, Any], None]] = None,
+) -> Iterator[VariantResult]:
+    """用同一 provider 并发生成 count 张，谁先完成先产出谁。
+
+    provider 的生成参数在并发期间只读，可安全共享；底层客户端来自连接池。
+    同时在途的请求数不超过渠道并发上限（与 Web 任务队列的限流一致），其余排队；
+    生成器被提前关闭时立即返回，排队中的变体不再发出。
+    on_partial(index, 预览图) 仅在 provider 支持流式预览时生效。
+    开启生图缓存时每张候选按 index 区分指纹，不会全部命中第一张。
+    """
+    count = clamp_variant_count(count)
+    streaming = on_partial is not None and supports_partial_images(provider)
+
+    def run(index: int):
+        variant = for_variant(provider, index)
+        if streaming:
+            return variant.generate_image(
+                text=text,
+                images=images,
+                on_partial=lambda partial: on_partial(index, partial),
+            )
+        return variant.generate_image(text=text, images=images)
+
+    workers = min(count, provider_concurrency_limit(getattr(provider, "provider", "")))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="nano-banana-variant")
+    try:
+        futures = {
+            executor.submit(run, index): index
+            for index in range(count)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                image = future.result()
+            except Exception as exc:  # noqa: BLE001
+                yield VariantResult(index, error=str(exc))
+                continue
+            if image is None:
+                yield VariantResult(index, error="未生成图片，请尝试调整提示词或参数")
+            else:
+                yield VariantResult(index, image=image)
+    finally:
+        # 调用方提前停止（取消）时不等进行中的请求，也不再发出还在排队的付费请求
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -3,14 +3,15 @@
 from typing import Any, Optional
 
 from loguru import logger
-from PIL import Image
 
+from nano_banana.core.images.protocol import ImageRef
 from nano_banana.core.images.provider_config import (
     ASPECT_RATIO_LIST,
     IMAGE_PROVIDER_META,
     IMAGE_SIZE_LIST,
     THINKING_LEVEL_LIST,
 )
+from nano_banana.core.images.result import ImageResult
 
 
 class GeminiImageProvider:
@@ -69,6 +70,14 @@ class GeminiImageProvider:
             f"尺寸={options.get('image_size')}，思考级别={options.get('thinking_level')}"
         )
 
-    def generate_image(self, text: str, images: Optional[list[str]] = None) -> Optional[Image.Image]:
+    def generate_image(self, text: str, images: Optional[list[ImageRef]] = None) -> Optional[ImageResult]:
         logger.info(f"[GeminiImageProvider] 开始生图，参考图数量: {len(images) if images else 0}")
         return self.client.generate_image(text=text, images=images)
+
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]:
+        logger.info(f"[GeminiImageProvider] 开始异步生图，参考图数量: {len(images) if images else 0}")
+        return await self.client.agenerate_image(text=text, images=images)
@@ -25,16 +25,19 @@ Gemini AI 客户端封装模块
     image.save("edited.png")
 """
 
+import asyncio
 import os
 import base64
-from io import BytesIO
-from typing import List, Union, Optional, Tuple
-from PIL import Image
+from typing import ContextManager, List, Union, Optional, Tuple
 from loguru import logger
 
 from google import genai
 from google.genai import types
 
+from nano_banana.core.client_pool import api_key_fingerprint, get_client_pool
+from nano_banana.core.images.preprocess import prepare_image_file, prepare_images, reference_max_side
+from nano_banana.core.images.protocol import ImageData, ImageRef
+from nano_banana.core.images.result import ImageResult
 from nano_banana.core.images.provider_config import ASPECT_RATIO_LIST, IMAGE_SIZE_LIST, THINKING_LEVEL_LIST
 
 os.environ['NO_PROXY'] = '*'
@@ -71,11 +74,7 @@ class GeminiClient:
         self.image_size = "2K"
         self.thinking_level = "low"
         
-        # 初始化客户端
-        self.client = genai.Client(
-            http_options=types.HttpOptions(base_url=self.base_url),
-            api_key=self.api_key
-        )
+        # 同一地址与密钥的 genai 客户端在进程内复用，每次调用时从连接池借出
         
         logger.info(f"[GeminiClient] 初始化完成，API地址: {self.base_url}")
     
@@ -122,18 +121,16 @@ class GeminiClient:
         Returns:
             (mime_type, base64_data) 元组
         """
-        mime_type = GeminiClient._get_mime_type(image_path)
-        with open(image_path, 'rb') as f:
-            base64_data = base64.b64encode(f.read()).decode('utf-8')
-        return mime_type, base64_data
+        prepared = prepare_image_file(image_path, max_side=reference_max_side("gemini"))
+        return prepared.mime_type, prepared.base64
     
-    def _build_parts(self, text: str, images: Optional[List[str]] = None) -> List[types.Part]:
+    def _build_parts(self, text: str, images: Optional[List[ImageRef]] = None) -> List[types.Part]:
         """
         构建请求的 parts 列表
         
         Args:
             text: 文本内容
-            images: 图片列表（文件路径或base64字符串）
+            images: 图片列表（文件路径、内存 ImageData 或 base64 字符串）
         
         Returns:
             types.Part 列表
@@ -141,19 +138,25 @@ class GeminiClient:
         parts = [types.Part(text=text)]
         
         if images:
+            # 本地文件与内存图片并行预处理，直接以字节放进 inline_data
+            local_refs = [
+                img for img in images
+                if isinstance(img, ImageData) or os.path.isfile(img)
+            ]
+            prepared = iter(prepare_images(local_refs, max_side=reference_max_side("gemini")))
             for img in images:
-                if os.path.isfile(img):
-                    # 本地文件
-                    mime_type, base64_data = self._load_image_as_base64(img)
+                if isinstance(img, ImageData) or os.path.isfile(img):
+                    item = next(prepared)
+                    mime_type, data = item.mime_type, item.data
                 else:
                     # 假设是 base64 字符串
                     mime_type = "image/jpeg"
-                    base64_data = img
+                    data = img
                 
                 parts.append(types.Part(
                     inline_data=types.Blob(
                         mime_type=mime_type,
-                        data=base64_data
+                        data=data
                     )
                 ))
         
@@ -162,7 +165,7 @@ class GeminiClient:
     def chat(
         self,
         text: str,
-        images: Optional[List[str]] = None,
+        images: Optional[List[ImageRef]] = None,
         model: Optional[str] = None
     ) -> str:
         """
@@ -187,13 +190,14 @@ class GeminiClient:
         parts = self._build_parts(text, images)
         
         try:
-            response = self.client.models.generate_content(
-                model=model,
-                contents=[types.Content(parts=parts)],
-                config=types.GenerateContentConfig(
-                    thinking_config=types.ThinkingConfig(thinking_level=self.thinking_level)
+            with self._client() as client:
+                response = client.models.generate_content(
+                    model=model,
+                    contents=[types.Content(parts=parts)],
+                    config=types.GenerateContentConfig(
+                        thinking_config=types.ThinkingConfig(thinking_level=self.thinking_level)
+                    )
                 )
-            )
             return response.text or ""
         except Exception as e:
             logger.error(f"[GeminiClient] chat 调用失败: {e}")
@@ -202,9 +206,9 @@ class GeminiClient:
     def generate_image(
         self,
         text: str,
-        images: Optional[List[str]] = None,
+        images: Optional[List[ImageRef]] = None,
         model: Optional[str] = None
-    ) -> Optional[Image.Image]:
+    ) -> Optional[ImageResult]:
         """
         图片生成模式（传入文本和可选图片，返回生成的图片）
         
@@ -214,7 +218,7 @@ class GeminiClient:
             model: 指定模型（可选，默认使用 image_model）
         
         Returns:
-            PIL.Image.Image 对象，如果没有生成图片则返回 None
+            ImageResult 对象（渠道原始字节），如果没有生成图片则返回 None
         
         Examples:
             >>> # 纯文本生成图片
@@ -229,53 +233,101 @@ class GeminiClient:
         parts = self._build_parts(text, images)
         
         try:
-            response = self.client.models.generate_content(
-                model=model,
-                contents=[types.Content(parts=parts)],
-                config=types.GenerateContentConfig(
-                    image_config=types.ImageConfig(
-                        aspect_ratio=self.aspect_ratio,
-                        image_size=self.image_size
-                    )
+            with self._client() as client:
+                response = client.models.generate_content(
+                    model=model,
+                    contents=[types.Content(parts=parts)],
+                    config=self._image_generation_config()
                 )
-            )
-            
-            # 提取图片
-            image_parts = [part for part in response.parts if part.inline_data]
-            if image_parts:
-                # 从 inline_data 创建 PIL Image
-                inline_data = image_parts[0].inline_data
-                # logger.debug(f"inline_data type: {type(inline_data)}")
-                # logger.debug(f"inline_data.data type: {type(inline_data.data)}")
-                # logger.debug(f"inline_data.data[:50]: {inline_data.data[:50] if inline_data.data else None}")
-                # logger.debug(f"inline_data.mime_type: {inline_data.mime_type}")
-                
-                # data 可能是 bytes 或 base64 字符串
-                data = inline_data.data
-                if isinstance(data, bytes):
-                    image_bytes = data
-                elif isinstance(data, str):
-                    image_bytes = base64.b64decode(data)
-                else:
-                    # 尝试直接转 bytes
-                    image_bytes = bytes(data)
-                return Image.open(BytesIO(image_bytes))
-            
-            # 没有图片，可能返回了文本
-            if response.text:
-                logger.warning(f"[GeminiClient] 未生成图片，返回文本: {response.text[:100]}")
-            return None
-            
+            return self._image_from_response(response)
         except Exception as e:
             logger.error(f"[GeminiClient] generate_image 调用失败: {e}")
             raise
     
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[List[ImageRef]] = None,
+        model: Optional[str] = None
+    ) -> Optional[ImageResult]:
+        """
+        generate_image 的异步版本，走 genai 的 aio 客户端
+        
+        参考图读盘放在线程里，避免阻塞事件循环。
+        """
+        model = model or self.image_model
+        parts = await asyncio.to_thread(self._build_parts, text, images)
+        
+        try:
+            with self._async_client() as client:
+                response = await client.aio.models.generate_content(
+                    model=model,
+                    contents=[types.Content(parts=parts)],
+                    config=self._image_generation_config()
+                )
+            return self._image_from_response(response)
+        except Exception as e:
+            logger.error(f"[GeminiClient] agenerate_image 调用失败: {e}")
+            raise
+    
+    def _client(self) -> ContextManager[genai.Client]:
+        """借出同步客户端，with 块结束后归还连接池"""
+        return get_client_pool().lease(
+            ("genai", self.base_url, api_key_fingerprint(self.api_key)),
+            self._new_client,
+        )
+    
+    def _async_client(self) -> ContextManager[genai.Client]:
+        """aio 客户端的连接绑定事件循环，按循环单独复用"""
+        loop = asyncio.get_running_loop()
+        return get_client_pool().lease(
+            ("genai-async", self.base_url, api_key_fingerprint(self.api_key), loop),
+            self._new_client,
+            loop=loop,
+        )
+    
+    def _new_client(self) -> genai.Client:
+        return genai.Client(
+            http_options=types.HttpOptions(base_url=self.base_url),
+            api_key=self.api_key
+        )
+    
+    def _image_generation_config(self) -> types.GenerateContentConfig:
+        return types.GenerateContentConfig(
+            image_config=types.ImageConfig(
+                aspect_ratio=self.aspect_ratio,
+                image_size=self.image_size
+            )
+        )
+    
+    @staticmethod
+    def _image_from_response(response) -> Optional[ImageResult]:
+        """从响应中取第一张 inline 图片，没有图片时返回 None"""
+        image_parts = [part for part in (response.parts or []) if part.inline_data]
+        if image_parts:
+            inline_data = image_parts[0].inline_data
+            # data 可能是 bytes 或 base64 字符串
+            data = inline_data.data
+            if isinstance(data, bytes):
+                image_bytes = data
+            elif isinstance(data, str):
+                image_bytes = base64.b64decode(data)
+            else:
+                # 尝试直接转 bytes
+                image_bytes = bytes(data)
+            return ImageResult(image_bytes, getattr(inline_data, "mime_type", None) or "")
+        
+        # 没有图片，可能返回了文本
+        if response.text:
+            logger.warning(f"[GeminiClient] 未生成图片，返回文本: {response.text[:100]}")
+        return None
+    
     def generate_image_with_text(
         self,
         text: str,
-        images: Optional[List[str]] = None,
+        images: Optional[List[ImageRef]] = None,
         model: Optional[str] = None
-    ) -> Tuple[Optional[Image.Image], str]:
+    ) -> Tuple[Optional[ImageResult], str]:
         """
         图片生成模式，同时返回图片和可能的文本响应
         
@@ -291,33 +343,14 @@ class GeminiClient:
         parts = self._build_parts(text, images)
         
         try:
-            response = self.client.models.generate_content(
-                model=model,
-                contents=[types.Content(parts=parts)],
-                config=types.GenerateContentConfig(
-                    image_config=types.ImageConfig(
-                        aspect_ratio=self.aspect_ratio,
-                        image_size=self.image_size
-                    )
+            with self._client() as client:
+                response = client.models.generate_content(
+                    model=model,
+                    contents=[types.Content(parts=parts)],
+                    config=self._image_generation_config()
                 )
-            )
-            
-            # 提取图片
-            image_parts = [part for part in response.parts if part.inline_data]
-            if image_parts:
-                inline_data = image_parts[0].inline_data
-                if isinstance(inline_data.data, bytes):
-                    image_bytes = inline_data.data
-                else:
-                    image_bytes = base64.b64decode(inline_data.data)
-                image = Image.open(BytesIO(image_bytes))
-            else:
-                image = None
-            
-            # 提取文本
-            text_response = response.text or ""
             
-            return image, text_response
+            return self._image_from_response(response), response.text or ""
             
         except Exception as e:
             logger.error(f"[GeminiClient] generate_image_with_text 调用失败: {e}")
@@ -1,21 +1,37 @@
 """OpenAI Images API 兼容生图 provider。"""
 
-import base64
+import asyncio
 import os
-from io import BytesIO
+from contextlib import nullcontext
 from typing import Any, Optional
 from urllib.request import urlopen
 
 from loguru import logger
-from PIL import Image
 
-from nano_banana.core.images.protocol import filter_generation_options
+from nano_banana.core.client_pool import (
+    shared_async_http_client,
+    shared_async_openai_client,
+    shared_openai_client,
+)
+from nano_banana.core.images.preprocess import prepare_images, reference_max_side
+from nano_banana.core.images.protocol import (
+    ImageData,
+    ImageRef,
+    PartialImageCallback,
+    filter_generation_options,
+)
 from nano_banana.core.images.provider_config import (
     ASPECT_RATIO_LIST,
     IMAGE_PROVIDER_META,
     IMAGE_SIZE_LIST,
 )
+from nano_banana.core.images.result import ImageResult
+
 
+# 流式模式下请求的预览帧数（API 允许 0～3）
+PARTIAL_IMAGES = 2
+# 兼容接口拒绝 stream / partial_images 参数时的状态码；其余错误不能重发，避免重复计费
+STREAM_UNSUPPORTED_STATUS = frozenset({400, 404, 422})
 
 OPENAI_IMAGES_SIZE_MAP = {
     "1K": {
@@ -62,6 +78,7 @@ class OpenAIImagesProvider:
     """OpenAI Images API 兼容生图 provider。"""
 
     provider = "openai_images"
+    SUPPORTS_PARTIAL_IMAGES = True
     CAPABILITIES = {
         "label": IMAGE_PROVIDER_META["openai_images"]["label"],
         "options": {
@@ -93,11 +110,12 @@ class OpenAIImagesProvider:
     }
 
     def __init__(self, base_url: str, api_key: str, model: str):
-        from openai import OpenAI
-
         self.model = model or "gpt-image-2"
         self.options: dict[str, Any] = {}
-        self.client = OpenAI(api_key=api_key, base_url=base_url.rstrip("/") if base_url else None)
+        self.base_url = base_url
+        self.api_key = api_key
+        # 显式注入的客户端优先；默认每次请求从连接池借用
+        self.client = None
         logger.info(f"[OpenAIImagesProvider] 初始化完成，模型: {self.model}，地址: {base_url}")
 
     def capabilities(self, model: str = "") -> dict[str, Any]:
@@ -110,26 +128,142 @@ class OpenAIImagesProvider:
         logger.info(f"[OpenAIImagesProvider] 生图参数（原始）→ {options}")
         logger.info(f"[OpenAIImagesProvider] 生图参数（过滤后）→ {self.options}")
 
-    def generate_image(self, text: str, images: Optional[list[str]] = None) -> Optional[Image.Image]:
+    def generate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+        on_partial: Optional[PartialImageCallback] = None,
+    ) -> Optional[ImageResult]:
         kwargs = self._build_request_kwargs(text)
         logger.info(f"[OpenAIImagesProvider] 发起请求，参数: { {k: v for k, v in kwargs.items() if k != 'prompt'} }，参考图数量: {len(images) if images else 0}")
+        with self._lease_client() as client:
+            if on_partial is not None:
+                stream = self._open_stream(client, images, kwargs)
+                if stream is not None:
+                    return self._consume_stream(stream, on_partial)
+            try:
+                response = self._request(client, images, kwargs)
+                logger.info("[OpenAIImagesProvider] 请求成功，正在解析图片")
+            except TypeError:
+                logger.warning("[OpenAIImagesProvider] 参数不兼容，使用核心字段重试")
+                kwargs = {key: value for key, value in kwargs.items() if key in {"model", "prompt", "size"}}
+                logger.info(f"[OpenAIImagesProvider] 重试参数: {kwargs}")
+                response = self._request(client, images, kwargs)
+                logger.info("[OpenAIImagesProvider] 重试成功，正在解析图片")
+        return self._extract_image(response)
+
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]:
+        kwargs = self._build_request_kwargs(text)
+        logger.info(f"[OpenAIImagesProvider] 发起异步请求，参数: { {k: v for k, v in kwargs.items() if k != 'prompt'} }，参考图数量: {len(images) if images else 0}")
+        with self._async_client() as client:
+            try:
+                response = await self._arequest(client, images, kwargs)
+            except TypeError:
+                logger.warning("[OpenAIImagesProvider] 参数不兼容，使用核心字段重试")
+                kwargs = {key: value for key, value in kwargs.items() if key in {"model", "prompt", "size"}}
+                response = await self._arequest(client, images, kwargs)
+        logger.info("[OpenAIImagesProvider] 请求成功，正在解析图片")
+        return await self._aextract_image(response)
+
+    def _open_stream(self, client, images: Optional[list[ImageRef]], kwargs: dict[str, Any]):
+        """发起流式请求；兼容接口不支持 stream 时返回 None，由调用方走普通请求。
+
+        超时、5xx、断连等错误原样抛出：服务端可能已经开始生成，重发会重复计费。
+        """
+        stream_kwargs = {**kwargs, "stream": True, "partial_images": PARTIAL_IMAGES}
         try:
-            if images:
-                response = self._edit_image(images, kwargs)
-            else:
-                response = self.client.images.generate(**kwargs)
-            logger.info("[OpenAIImagesProvider] 请求成功，正在解析图片")
-            return self._extract_image(response)
-        except TypeError:
-            logger.warning("[OpenAIImagesProvider] 参数不兼容，使用核心字段重试")
-            kwargs = {key: value for key, value in kwargs.items() if key in {"model", "prompt", "size"}}
-            logger.info(f"[OpenAIImagesProvider] 重试参数: {kwargs}")
-            if images:
-                response = self._edit_image(images, kwargs)
+            return self._request(client, images, stream_kwargs)
+        except Exception as exc:
+            if not self._stream_unsupported(exc):
+                raise
+            logger.warning(f"[OpenAIImagesProvider] 流式生图不可用，改用普通请求: {exc}")
+            return None
+
+    @staticmethod
+    def _stream_unsupported(exc: Exception) -> bool:
+        """SDK 不接受 stream 参数（请求未发出），或接口以 400/404/422 明确拒绝了流式参数。"""
+        if isinstance(exc, TypeError):
+            return True
+        if getattr(exc, "status_code", None) not in STREAM_UNSUPPORTED_STATUS:
+            return False
+        detail = f"{exc} {getattr(exc, 'body', '') or ''}".lower()
+        return "stream" in detail or "partial_images" in detail
+
+    @staticmethod
+    def _consume_stream(stream, on_partial: PartialImageCallback) -> Optional[ImageResult]:
+        """读取流式事件：预览帧交给 on_partial，completed 事件里的图作为最终结果。
+
+        豆包 Seedream 的 partial_succeeded 本身就是成品图，没有 completed 图时取最后一帧。
+        """
+        final: Optional[ImageResult] = None
+        last_partial: Optional[ImageResult] = None
+        try:
+            for event in stream:
+                event_type = getattr(event, "type", "") or ""
+                if event_type.endswith("partial_failed"):
+                    raise RuntimeError(f"图片生成失败: {getattr(event, 'error', None) or event_type}")
+                b64_json = getattr(event, "b64_json", None)
+                if not b64_json:
+                    continue
+                result = ImageResult.from_base64(b64_json)
+                if event_type.endswith(".completed"):
+                    final = result
+                    continue
+                last_partial = result
+                try:
+                    on_partial(result)
+                except Exception as exc:  # noqa: BLE001
+                    logger.warning(f"[OpenAIImagesProvider] 预览回调出错: {exc}")
+        finally:
+            close = getattr(stream, "close", None)
+            if callable(close):
+                close()
+        return final or last_partial
+
+    def _lease_client(self):
+        if self.client is not None:
+            return nullcontext(self.client)
+        return shared_openai_client(self.provider, base_url=self.base_url, api_key=self.api_key)
+
+    def _async_client(self):
+        return shared_async_openai_client(
+            self.provider, base_url=self.base_url, api_key=self.api_key
+        )
+
+    def _request(self, client, images: Optional[list[ImageRef]], kwargs: dict[str, Any]):
+        if not images:
+            return client.images.generate(**kwargs)
+        files = self._read_edit_files(images, self.provider)
+        image_arg = files[0] if len(files) == 1 else files
+        return client.images.edit(image=image_arg, **kwargs)
+
+    async def _arequest(self, client, images: Optional[list[ImageRef]], kwargs: dict[str, Any]):
+        if not images:
+            return await client.images.generate(**kwargs)
+        files = await asyncio.to_thread(self._read_edit_files, images, self.provider)
+        image_arg = files[0] if len(files) == 1 else files
+        return await client.images.edit(image=image_arg, **kwargs)
+
+    @staticmethod
+    def _read_edit_files(images: list[ImageRef], provider: str) -> list[tuple[str, bytes, str]]:
+        """参考图经预处理缩放重编码后以内存文件上传，文件名后缀跟随新编码。"""
+        names = []
+        for index, image in enumerate(images, start=1):
+            if isinstance(image, ImageData):
+                names.append(os.path.splitext(image.name)[0] or f"reference-{index}")
+            elif os.path.isfile(image):
+                names.append(os.path.splitext(os.path.basename(image))[0])
             else:
-                response = self.client.images.generate(**kwargs)
-            logger.info("[OpenAIImagesProvider] 重试成功，正在解析图片")
-            return self._extract_image(response)
+                raise ValueError("OpenAI Images 编辑模式需要本地图片文件或内存图片")
+        prepared = prepare_images(images, max_side=reference_max_side(provider))
+        return [
+            (name + item.extension, item.data, item.mime_type)
+            for name, item in zip(names, prepared)
+        ]
 
     def _build_request_kwargs(self, prompt: str) -> dict[str, Any]:
         kwargs: dict[str, Any] = {
@@ -151,33 +285,43 @@ class OpenAIImagesProvider:
             OPENAI_IMAGES_SIZE_MAP["2K"]["1:1"],
         )
 
-    def _edit_image(self, images: list[str], kwargs: dict[str, Any]):
-        opened_files = []
-        try:
-            for image_path in images:
-                if not os.path.isfile(image_path):
-                    raise ValueError("OpenAI Images 编辑模式需要本地图片文件路径")
-                opened_files.append(open(image_path, "rb"))
+    @staticmethod
+    def _extract_image(response) -> Optional[ImageResult]:
+        if not getattr(response, "data", None):
+            return None
 
-            image_arg = opened_files[0] if len(opened_files) == 1 else opened_files
-            return self.client.images.edit(image=image_arg, **kwargs)
-        finally:
-            for file_obj in opened_files:
-                file_obj.close()
+        item = response.data[0]
+        b64_json = getattr(item, "b64_json", None)
+        if b64_json:
+            return ImageResult.from_base64(b64_json, **_result_metadata(item))
+
+        url = getattr(item, "url", None)
+        if url:
+            with urlopen(url, timeout=120) as resp:
+                return ImageResult.from_bytes(resp.read(), **_result_metadata(item))
+
+        return None
 
     @staticmethod
-    def _extract_image(response) -> Optional[Image.Image]:
+    async def _aextract_image(response) -> Optional[ImageResult]:
         if not getattr(response, "data", None):
             return None
 
         item = response.data[0]
         b64_json = getattr(item, "b64_json", None)
         if b64_json:
-            return Image.open(BytesIO(base64.b64decode(b64_json)))
+            return ImageResult.from_base64(b64_json, **_result_metadata(item))
 
         url = getattr(item, "url", None)
         if url:
-            with urlopen(url, timeout=120) as resp:
-                return Image.open(BytesIO(resp.read()))
+            with shared_async_http_client("image_download", follow_redirects=True) as client:
+                resp = await client.get(url, timeout=120)
+            resp.raise_for_status()
+            return ImageResult.from_bytes(resp.content, **_result_metadata(item))
 
         return None
+
+
+def _result_metadata(item) -> dict[str, Any]:
+    revised_prompt = getattr(item, "revised_prompt", None)
+    return {"revised_prompt": revised_prompt} if revised_prompt else {}
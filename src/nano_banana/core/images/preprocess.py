@@ -0,0 +1,194 @@
+"""参考图预处理：缩放、重新编码、去元数据，并按文件缓存编码结果。
+
+手机原图动辄十几 MB，直接 base64 塞进请求体既慢又贵。这里统一把本地参考图
+缩到同一个最大边长，重新编码成 JPEG（带透明通道的保留 PNG），
+对话 LLM 与各生图渠道共用同一份缓存结果。
+
+不产出 WebP：同一份编码要同时发给对话端点与各生图渠道，
+OpenAI 兼容的第三方端点并不都接受 WebP 输入，JPEG / PNG 是所有路径都能用的格式。
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import mimetypes
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Optional
+
+from PIL import Image, ImageOps
+
+from nano_banana.core.images.protocol import ImageData, ImageRef
+from nano_banana.core.images.provider_config import IMAGE_PROVIDER_META
+
+DEFAULT_REFERENCE_MAX_SIDE = 2048
+JPEG_QUALITY = 90
+_CACHE_MAX_ENTRIES = 64
+_CACHE_MAX_BYTES = 256 * 1024 * 1024
+_PARALLEL_WORKERS = 4
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime_type: str
+    width: int = 0
+    height: int = 0
+    _base64: Optional[str] = field(default=None, repr=False)
+    _data_uri: Optional[str] = field(default=None, repr=False)
+
+    @property
+    def base64(self) -> str:
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.data).decode("ascii")
+        return self._base64
+
+    @property
+    def data_uri(self) -> str:
+        if self._data_uri is None:
+            self._data_uri = f"data:{self.mime_type};base64,{self.base64}"
+        return self._data_uri
+
+    @property
+    def extension(self) -> str:
+        return {"image/jpeg": ".jpg", "image/png": ".png"}.get(self.mime_type) or (
+            mimetypes.guess_extension(self.mime_type) or ".bin"
+        )
+
+
+def reference_max_side(provider: str = "") -> int:
+    """参考图最大边长。所有路径默认共用 DEFAULT_REFERENCE_MAX_SIDE，同一张图只编码一次；
+
+    只有上限更低的渠道才在元数据里登记 reference_max_side。
+    """
+    meta = IMAGE_PROVIDER_META.get(provider) or {}
+    return int(meta.get("reference_max_side") or DEFAULT_REFERENCE_MAX_SIDE)
+
+
+class _PreparedCache:
+    """本地文件按 (路径, mtime, 大小, 参数)、内存图片按内容摘要缓存编码结果。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, PreparedImage] = OrderedDict()
+        self._total_bytes = 0
+
+    def get(self, key: tuple) -> Optional[PreparedImage]:
+        with self._lock:
+            prepared = self._entries.get(key)
+            if prepared is not None:
+                self._entries.move_to_end(key)
+            return prepared
+
+    def put(self, key: tuple, prepared: PreparedImage) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._total_bytes -= len(old.data)
+            self._entries[key] = prepared
+            self._total_bytes += len(prepared.data)
+            while self._entries and (
+                len(self._entries) > _CACHE_MAX_ENTRIES or self._total_bytes > _CACHE_MAX_BYTES
+            ):
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted.data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+
+_cache = _PreparedCache()
+
+
+def clear_prepared_cache() -> None:
+    _cache.clear()
+
+
+def prepare_image_file(path: str, *, max_side: int = DEFAULT_REFERENCE_MAX_SIDE) -> PreparedImage:
+    """读取本地图片并预处理；PIL 无法解码时原样返回文件内容。"""
+    stat = os.stat(path)
+    key = (os.path.realpath(path), stat.st_mtime_ns, stat.st_size, max_side, JPEG_QUALITY)
+    prepared = _cache.get(key)
+    if prepared is None:
+        with open(path, "rb") as file_obj:
+            raw = file_obj.read()
+        prepared = _encode(raw, _guess_mime(path), max_side)
+        _cache.put(key, prepared)
+    return prepared
+
+
+def prepare_image_data(image: ImageData, *, max_side: int = DEFAULT_REFERENCE_MAX_SIDE) -> PreparedImage:
+    """内存参考图预处理，按内容摘要缓存。"""
+    digest = hashlib.sha256(image.data).hexdigest()
+    key = ("bytes", digest, max_side, JPEG_QUALITY)
+    prepared = _cache.get(key)
+    if prepared is None:
+        prepared = _encode(image.data, image.mime_type or "image/png", max_side)
+        _cache.put(key, prepared)
+    return prepared
+
+
+def prepare_image(image_ref: ImageRef, *, max_side: int = DEFAULT_REFERENCE_MAX_SIDE) -> PreparedImage:
+    if isinstance(image_ref, ImageData):
+        return prepare_image_data(image_ref, max_side=max_side)
+    return prepare_image_file(image_ref, max_side=max_side)
+
+
+def prepare_images(
+    image_refs: list[ImageRef],
+    *,
+    max_side: int = DEFAULT_REFERENCE_MAX_SIDE,
+) -> list[PreparedImage]:
+    """多张参考图（本地路径或 ImageData）并行解码/编码（PIL 编解码会释放 GIL）。"""
+    if len(image_refs) <= 1:
+        return [prepare_image(ref, max_side=max_side) for ref in image_refs]
+    with ThreadPoolExecutor(
+        max_workers=min(_PARALLEL_WORKERS, len(image_refs)),
+        thread_name_prefix="nano-banana-ref",
+    ) as executor:
+        return list(executor.map(lambda ref: prepare_image(ref, max_side=max_side), image_refs))
+
+
+def _guess_mime(path: str) -> str:
+    mime_type, _ = mimetypes.guess_type(path)
+    if not mime_type or not mime_type.startswith("image/"):
+        return "image/png"
+    return mime_type
+
+
+def _encode(raw: bytes, fallback_mime: str, max_side: int) -> PreparedImage:
+    try:
+        with Image.open(BytesIO(raw)) as source:
+            source.load()
+            image = ImageOps.exif_transpose(source)
+    except Exception:  # noqa: BLE001
+        return PreparedImage(raw, fallback_mime)
+
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    # 只写像素，不带 EXIF/ICC 等元数据
+    if _has_alpha(image):
+        if image.mode not in ("RGBA", "LA"):
+            image = image.convert("RGBA")
+        image.save(buffer, format="PNG")
+        mime_type = "image/png"
+    else:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(buffer, format="JPEG", quality=JPEG_QUALITY, optimize=True)
+        mime_type = "image/jpeg"
+    return PreparedImage(buffer.getvalue(), mime_type, image.width, image.height)
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or (
+        image.mode == "P" and "transparency" in image.info
+    )
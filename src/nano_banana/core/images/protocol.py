@@ -2,18 +2,18 @@
 from __future__ import annotations
 
 import base64
+import binascii
 import copy
-import mimetypes
 import os
 from dataclasses import dataclass, field
-from typing import Any, Optional, Protocol, runtime_checkable
-
-from PIL import Image
+from collections.abc import Callable
+from typing import Any, BinaryIO, Optional, Protocol, Union, runtime_checkable
 
 from nano_banana.core.images.provider_config import (
     IMAGE_PROVIDER_META,
     extract_provider_credentials,
 )
+from nano_banana.core.images.result import ImageResult
 
 
 def filter_generation_options(provider_cls: type, options: dict[str, Any]) -> dict[str, Any]:
@@ -25,6 +25,42 @@ def filter_generation_options(provider_cls: type, options: dict[str, Any]) -> di
     }
 
 
+@dataclass(frozen=True)
+class ImageData:
+    """内存中的参考图：原始字节 + MIME，provider 直接据此构建请求，不落盘。"""
+
+    data: bytes
+    mime_type: str = "image/png"
+    name: str = ""
+
+    @classmethod
+    def from_data_uri(cls, uri: str, name: str = "") -> "ImageData":
+        header, sep, encoded = (uri or "").partition(";base64,")
+        if not sep or not header.startswith("data:"):
+            raise ValueError("参考图不是 base64 data URI")
+        try:
+            data = base64.b64decode(encoded, validate=False)
+        except (binascii.Error, ValueError) as exc:
+            raise ValueError(f"参考图 base64 解码失败: {exc}") from exc
+        return cls(data=data, mime_type=header[5:] or "image/png", name=name)
+
+    @classmethod
+    def from_buffer(cls, buffer: BinaryIO, mime_type: str = "image/png", name: str = "") -> "ImageData":
+        return cls(data=buffer.read(), mime_type=mime_type, name=name)
+
+
+# 参考图：本地路径 / data URI / http(s) URL 字符串，或内存中的 ImageData
+ImageRef = Union[str, ImageData]
+
+# 流式生图时每收到一帧预览回调一次；只有 SUPPORTS_PARTIAL_IMAGES 的 provider 接受
+PartialImageCallback = Callable[[ImageResult], None]
+
+
+def supports_partial_images(provider: Any) -> bool:
+    """provider.generate_image 是否接受 on_partial 回调。"""
+    return bool(getattr(provider, "SUPPORTS_PARTIAL_IMAGES", False))
+
+
 @runtime_checkable
 class ImageProvider(Protocol):
     provider: str
@@ -38,8 +74,14 @@ class ImageProvider(Protocol):
     def generate_image(
         self,
         text: str,
-        images: Optional[list[str]] = None,
-    ) -> Optional[Image.Image]: ...
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]: ...
+
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]: ...
 
 
 @dataclass
@@ -80,21 +122,42 @@ def get_provider_label(provider: str) -> str:
     return str(caps.get("label") or meta.get("label") or provider)
 
 
-def encode_image_reference(image_ref: str) -> str:
-    value = (image_ref or "").strip()
-    if not value:
-        raise ValueError("参考图路径为空")
-    if value.startswith("data:") or value.startswith("http://") or value.startswith("https://"):
-        return value
-    if not os.path.isfile(value):
-        raise ValueError(f"参考图文件不存在: {value}")
+def encode_image_reference(image_ref: ImageRef, *, max_side: int = 0) -> str:
+    """参考图转成 data URI；本地文件与 ImageData 先经 preprocess 缩放重编码。"""
+    return encode_image_references([image_ref], max_side=max_side)[0]
+
 
-    mime_type, _ = mimetypes.guess_type(value)
-    if not mime_type or not mime_type.startswith("image/"):
-        mime_type = "image/png"
-    with open(value, "rb") as file_obj:
-        encoded = base64.b64encode(file_obj.read()).decode("utf-8")
-    return f"data:{mime_type};base64,{encoded}"
+def encode_image_references(image_refs: list[ImageRef], *, max_side: int = 0) -> list[str]:
+    """批量版 encode_image_reference，多张图并行预处理。max_side 为 0 时用默认值。"""
+    from nano_banana.core.images.preprocess import prepare_images, reference_max_side
+
+    values: list[ImageRef] = []
+    local_refs: list[ImageRef] = []
+    for image_ref in image_refs:
+        if isinstance(image_ref, ImageData):
+            values.append(image_ref)
+            local_refs.append(image_ref)
+            continue
+        value = (image_ref or "").strip()
+        if not value:
+            raise ValueError("参考图路径为空")
+        values.append(value)
+        if is_remote_or_inline_reference(value):
+            continue
+        if not os.path.isfile(value):
+            raise ValueError(f"参考图文件不存在: {value}")
+        local_refs.append(value)
+
+    prepared = iter(prepare_images(local_refs, max_side=max_side or reference_max_side()))
+    return [
+        value if isinstance(value, str) and is_remote_or_inline_reference(value)
+        else next(prepared).data_uri
+        for value in values
+    ]
+
+
+def is_remote_or_inline_reference(value: str) -> bool:
+    return value.startswith(("data:", "http://", "https://"))
 
 
 def _registry() -> dict[str, type]:
@@ -151,4 +214,6 @@ def create_image_provider_from_credentials(
     if not base_url or not api_key:
         label = get_provider_label(provider)
         raise ValueError(f"请先配置 {label} Base URL 和 API Key")
-    return factory(base_url=base_url, api_key=api_key, model=model)
+    from nano_banana.core.images.cache import with_image_cache
+
+    return with_image_cache(factory(base_url=base_url, api_key=api_key, model=model))
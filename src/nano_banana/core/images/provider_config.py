@@ -1,5 +1,6 @@
 """图片生成渠道的轻量配置元数据。"""
 
+import os
 from typing import Any
 
 
@@ -23,6 +24,7 @@ IMAGE_PROVIDER_META: dict[str, dict[str, Any]] = {
         ],
         "default_model": "gemini-3-pro-image-preview",
         "default_base_url": "",
+        "max_concurrency": 4,
     },
     "openai_images": {
         "label": "OpenAI Images",
@@ -35,6 +37,7 @@ IMAGE_PROVIDER_META: dict[str, dict[str, Any]] = {
         "model_suggestions": ["gpt-image-2"],
         "default_model": "gpt-image-2",
         "default_base_url": "https://api.openai.com/v1",
+        "max_concurrency": 4,
     },
     "qwen_image": {
         "label": "千问图像",
@@ -47,6 +50,7 @@ IMAGE_PROVIDER_META: dict[str, dict[str, Any]] = {
         "model_suggestions": ["qwen-image-3.0-pro"],
         "default_model": "qwen-image-3.0-pro",
         "default_base_url": "",
+        "max_concurrency": 2,
     },
     "doubao_image": {
         "label": "豆包 Seedream",
@@ -59,9 +63,30 @@ IMAGE_PROVIDER_META: dict[str, dict[str, Any]] = {
         "model_suggestions": ["doubao-seedream-5-0-pro-260628"],
         "default_model": "doubao-seedream-5-0-pro-260628",
         "default_base_url": "https://ark.cn-beijing.volces.com/api/v3",
+        "max_concurrency": 4,
     },
 }
 
+DEFAULT_MAX_CONCURRENCY = 2
+
+
+def provider_concurrency_limits() -> dict[str, int]:
+    """渠道并发上限：元数据默认值，可用 NANO_BANANA_JOB_LIMITS="gemini=2,qwen_image=1" 覆盖。"""
+    limits = {
+        provider: int(meta.get("max_concurrency") or DEFAULT_MAX_CONCURRENCY)
+        for provider, meta in IMAGE_PROVIDER_META.items()
+    }
+    for item in os.environ.get("NANO_BANANA_JOB_LIMITS", "").split(","):
+        provider, _, value = item.partition("=")
+        if provider.strip() in limits and value.strip().isdigit():
+            limits[provider.strip()] = max(1, int(value))
+    return limits
+
+
+def provider_concurrency_limit(provider: str) -> int:
+    """单个渠道的并发上限；未登记的渠道用 DEFAULT_MAX_CONCURRENCY。"""
+    return provider_concurrency_limits().get(provider, DEFAULT_MAX_CONCURRENCY)
+
 
 def extract_provider_credentials(config: dict[str, Any], provider: str) -> dict[str, str]:
     """按渠道元数据从完整配置中取出连接参数。"""
@@ -1,21 +1,23 @@
 """阿里云百炼千问图像 provider。"""
 
+import asyncio
 import json
 import ssl
 import time
-from io import BytesIO
 from typing import Any, Optional
 from urllib.error import HTTPError, URLError
 from urllib.request import Request, urlopen
 
 from loguru import logger
-from PIL import Image
 
-from nano_banana.core.images.protocol import encode_image_reference, filter_generation_options
+from nano_banana.core.client_pool import shared_async_http_client, shared_http_client
+from nano_banana.core.images.preprocess import reference_max_side
+from nano_banana.core.images.protocol import ImageRef, encode_image_references, filter_generation_options
 from nano_banana.core.images.provider_config import (
     ASPECT_RATIO_LIST,
     IMAGE_PROVIDER_META,
 )
+from nano_banana.core.images.result import ImageResult
 
 
 QWEN_IMAGE_SIZE_MAP = {
@@ -115,11 +117,30 @@ class QwenImageProvider:
         logger.info(f"[QwenImageProvider] 生图参数（原始）→ {options}")
         logger.info(f"[QwenImageProvider] 生图参数（过滤后）→ {self.options}")
 
-    def generate_image(self, text: str, images: Optional[list[str]] = None) -> Optional[Image.Image]:
+    def generate_image(self, text: str, images: Optional[list[ImageRef]] = None) -> Optional[ImageResult]:
+        payload = self._build_payload(text, images)
+        response = self._post_json(payload)
+        return self._extract_image(response)
+
+    async def agenerate_image(
+        self,
+        text: str,
+        images: Optional[list[ImageRef]] = None,
+    ) -> Optional[ImageResult]:
+        # 参考图读盘 + base64 编码放到线程里，避免阻塞事件循环。
+        payload = await asyncio.to_thread(self._build_payload, text, images)
+        response = await self._apost_json(payload)
+        return await self._aextract_image(response)
+
+    def _build_payload(self, text: str, images: Optional[list[ImageRef]]) -> dict[str, Any]:
         content = self._build_content(text, images)
         has_refs = any("image" in item for item in content)
         parameters = self._build_parameters(has_refs=has_refs)
-        payload = {
+        logger.info(
+            f"[QwenImageProvider] 发起请求，模型={self.model}，参考图={sum(1 for i in content if 'image' in i)}，"
+            f"parameters={parameters}"
+        )
+        return {
             "model": self.model,
             "input": {
                 "messages": [
@@ -131,20 +152,14 @@ class QwenImageProvider:
             },
             "parameters": parameters,
         }
-        logger.info(
-            f"[QwenImageProvider] 发起请求，模型={self.model}，参考图={sum(1 for i in content if 'image' in i)}，"
-            f"parameters={parameters}"
-        )
-        response = self._post_json(payload)
-        return self._extract_image(response)
 
-    def _build_content(self, text: str, images: Optional[list[str]]) -> list[dict[str, str]]:
+    def _build_content(self, text: str, images: Optional[list[ImageRef]]) -> list[dict[str, str]]:
         content: list[dict[str, str]] = []
         if images:
             if len(images) > 3:
                 logger.warning(f"[QwenImageProvider] 参考图超过 3 张，仅使用前 3 张（共 {len(images)}）")
-            for image_ref in images[:3]:
-                content.append({"image": self._encode_image_ref(image_ref)})
+            for encoded in self._encode_image_refs(images[:3]):
+                content.append({"image": encoded})
         content.append({"text": text})
         return content
 
@@ -175,40 +190,69 @@ class QwenImageProvider:
         size_bucket = QWEN_IMAGE_SIZE_MAP.get(image_size) or QWEN_IMAGE_SIZE_MAP["2K"]
         return size_bucket.get(aspect_ratio) or size_bucket.get("1:1")
 
-    def _encode_image_ref(self, image_ref: str) -> str:
-        return encode_image_reference(image_ref)
+    def _encode_image_refs(self, image_refs: list[ImageRef]) -> list[str]:
+        return encode_image_references(image_refs, max_side=reference_max_side(self.provider))
 
     def _post_json(self, payload: dict[str, Any]) -> dict[str, Any]:
-        body = json.dumps(payload)
+        body = json.dumps(payload).encode("utf-8")
         last_error: Optional[Exception] = None
         for attempt in range(1, 4):
             try:
                 raw = self._http_request(
                     "POST",
                     self.endpoint,
-                    content=body.encode("utf-8"),
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {self.api_key}",
-                    },
+                    content=body,
+                    headers=self._post_headers(),
                     timeout=180.0,
                 )
                 break
-            except QwenHTTPError as exc:
+            except Exception as exc:  # noqa: BLE001
                 last_error = exc
-                if not self._is_transient_http_error(exc.status_code) or attempt >= 3:
-                    raise
+                self._raise_unless_post_retryable(exc, attempt)
                 logger.warning(f"[QwenImageProvider] POST 重试 {attempt}/3: {exc}")
                 time.sleep(1.5 * attempt)
+        else:
+            raise RuntimeError(f"千问图像网络错误: {last_error}")
+        return self._parse_response(raw)
+
+    async def _apost_json(self, payload: dict[str, Any]) -> dict[str, Any]:
+        body = json.dumps(payload).encode("utf-8")
+        last_error: Optional[Exception] = None
+        for attempt in range(1, 4):
+            try:
+                raw = await self._ahttp_request(
+                    "POST",
+                    self.endpoint,
+                    content=body,
+                    headers=self._post_headers(),
+                    timeout=180.0,
+                )
+                break
             except Exception as exc:  # noqa: BLE001
                 last_error = exc
-                if not self._is_transient_network_error(exc) or attempt >= 3:
-                    raise RuntimeError(f"千问图像网络错误: {exc}") from exc
+                self._raise_unless_post_retryable(exc, attempt)
                 logger.warning(f"[QwenImageProvider] POST 重试 {attempt}/3: {exc}")
-                time.sleep(1.5 * attempt)
+                await asyncio.sleep(1.5 * attempt)
         else:
             raise RuntimeError(f"千问图像网络错误: {last_error}")
+        return self._parse_response(raw)
+
+    def _post_headers(self) -> dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}",
+        }
 
+    def _raise_unless_post_retryable(self, exc: Exception, attempt: int) -> None:
+        if isinstance(exc, QwenHTTPError):
+            if not self._is_transient_http_error(exc.status_code) or attempt >= 3:
+                raise exc
+            return
+        if not self._is_transient_network_error(exc) or attempt >= 3:
+            raise RuntimeError(f"千问图像网络错误: {exc}") from exc
+
+    @staticmethod
+    def _parse_response(raw: bytes) -> dict[str, Any]:
         try:
             data = json.loads(raw.decode("utf-8"))
         except json.JSONDecodeError as exc:
@@ -274,32 +318,15 @@ class QwenImageProvider:
         headers: Optional[dict[str, str]] = None,
         timeout: float = 120.0,
     ) -> bytes:
-        """优先 httpx（与项目其它 AI 调用一致），失败再回退 urllib。"""
+        """优先进程共享的 httpx 连接池（与项目其它 AI 调用一致），失败再回退 urllib。"""
         try:
-            import httpx
-
-            with httpx.Client(http2=False, timeout=timeout, follow_redirects=True) as client:
-                response = client.request(method, url, content=content, headers=headers or {})
-                if response.status_code >= 400:
-                    detail = response.text
-                    try:
-                        parsed = response.json()
-                        code = parsed.get("code") or response.status_code
-                        message = parsed.get("message") or detail
-                        request_id = parsed.get("request_id") or ""
-                        raise QwenHTTPError(
-                            f"千问图像请求失败: code={code}, message={message}"
-                            + (f", request_id={request_id}" if request_id else ""),
-                            response.status_code,
-                        )
-                    except QwenHTTPError:
-                        raise
-                    except Exception:  # noqa: BLE001
-                        raise QwenHTTPError(
-                            f"千问图像请求失败: HTTP {response.status_code}, {detail[:300]}",
-                            response.status_code,
-                        )
-                return response.content
+            import httpx  # noqa: F401
+
+            with shared_http_client("qwen_image", follow_redirects=True) as client:
+                response = client.request(
+                    method, url, content=content, headers=headers or {}, timeout=timeout
+                )
+            return QwenImageProvider._httpx_response_content(response)
         except ImportError:
             pass
 
@@ -334,20 +361,48 @@ class QwenImageProvider:
         except URLError as exc:
             raise
 
-    def _extract_image(self, response: dict[str, Any]) -> Optional[Image.Image]:
-        choices = ((response.get("output") or {}).get("choices")) or []
-        if not choices:
-            logger.warning("[QwenImageProvider] 响应无 choices")
-            return None
+    @staticmethod
+    async def _ahttp_request(
+        method: str,
+        url: str,
+        *,
+        content: Optional[bytes] = None,
+        headers: Optional[dict[str, str]] = None,
+        timeout: float = 120.0,
+    ) -> bytes:
+        """_http_request 的异步版本，只走 httpx.AsyncClient。"""
+        with shared_async_http_client("qwen_image", follow_redirects=True) as client:
+            response = await client.request(
+                method, url, content=content, headers=headers or {}, timeout=timeout
+            )
+        return QwenImageProvider._httpx_response_content(response)
 
-        content = ((choices[0].get("message") or {}).get("content")) or []
-        image_url = None
-        for item in content:
-            if isinstance(item, dict) and item.get("image"):
-                image_url = item["image"]
-                break
+    @staticmethod
+    def _httpx_response_content(response) -> bytes:
+        if response.status_code >= 400:
+            detail = response.text
+            try:
+                parsed = response.json()
+                code = parsed.get("code") or response.status_code
+                message = parsed.get("message") or detail
+                request_id = parsed.get("request_id") or ""
+                raise QwenHTTPError(
+                    f"千问图像请求失败: code={code}, message={message}"
+                    + (f", request_id={request_id}" if request_id else ""),
+                    response.status_code,
+                )
+            except QwenHTTPError:
+                raise
+            except Exception:  # noqa: BLE001
+                raise QwenHTTPError(
+                    f"千问图像请求失败: HTTP {response.status_code}, {detail[:300]}",
+                    response.status_code,
+                )
+        return response.content
+
+    def _extract_image(self, response: dict[str, Any]) -> Optional[ImageResult]:
+        image_url = self._find_image_url(response)
         if not image_url:
-            logger.warning("[QwenImageProvider] 响应未包含 image URL")
             return None
 
         logger.info("[QwenImageProvider] 正在下载生成图片")
@@ -355,14 +410,49 @@ class QwenImageProvider:
         for attempt in range(1, 4):
             try:
                 image_bytes = self._http_request("GET", image_url, timeout=120.0)
-                return Image.open(BytesIO(image_bytes))
+                return ImageResult.from_bytes(image_bytes)
             except Exception as exc:  # noqa: BLE001
                 last_error = exc
-                is_transient = self._is_transient_network_error(exc)
-                if isinstance(exc, QwenHTTPError):
-                    is_transient = self._is_transient_http_error(exc.status_code)
-                if not is_transient or attempt >= 3:
-                    raise RuntimeError(f"千问图像下载失败: {exc}") from exc
+                self._raise_unless_download_retryable(exc, attempt)
                 logger.warning(f"[QwenImageProvider] 下载重试 {attempt}/3: {exc}")
                 time.sleep(1.5 * attempt)
         raise RuntimeError(f"千问图像下载失败: {last_error}")
+
+    async def _aextract_image(self, response: dict[str, Any]) -> Optional[ImageResult]:
+        image_url = self._find_image_url(response)
+        if not image_url:
+            return None
+
+        logger.info("[QwenImageProvider] 正在下载生成图片")
+        last_error: Optional[Exception] = None
+        for attempt in range(1, 4):
+            try:
+                image_bytes = await self._ahttp_request("GET", image_url, timeout=120.0)
+                return ImageResult.from_bytes(image_bytes)
+            except Exception as exc:  # noqa: BLE001
+                last_error = exc
+                self._raise_unless_download_retryable(exc, attempt)
+                logger.warning(f"[QwenImageProvider] 下载重试 {attempt}/3: {exc}")
+                await asyncio.sleep(1.5 * attempt)
+        raise RuntimeError(f"千问图像下载失败: {last_error}")
+
+    @staticmethod
+    def _find_image_url(response: dict[str, Any]) -> Optional[str]:
+        choices = ((response.get("output") or {}).get("choices")) or []
+        if not choices:
+            logger.warning("[QwenImageProvider] 响应无 choices")
+            return None
+
+        content = ((choices[0].get("message") or {}).get("content")) or []
+        for item in content:
+            if isinstance(item, dict) and item.get("image"):
+                return item["image"]
+        logger.warning("[QwenImageProvider] 响应未包含 image URL")
+        return None
+
+    def _raise_unless_download_retryable(self, exc: Exception, attempt: int) -> None:
+        is_transient = self._is_transient_network_error(exc)
+        if isinstance(exc, QwenHTTPError):
+            is_transient = self._is_transient_http_error(exc.status_code)
+        if not is_transient or attempt >= 3:
+            raise RuntimeError(f"千问图像下载失败: {exc}") from exc
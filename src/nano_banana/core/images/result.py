@@ -0,0 +1,153 @@
+"""生图结果：保留渠道返回的原始字节，像素只在需要时解码。
+
+4K 图解码再重新编码成 PNG 要花数秒 CPU；多数调用方（Web 返回、桌面预览、
+保存文件）只需要原始字节，因此默认直接透传，只有显式要求其他格式时才转码。
+"""
+from __future__ import annotations
+
+import base64
+from io import BytesIO
+from pathlib import Path
+from typing import Any, BinaryIO, Optional, Union
+
+from PIL import Image
+
+_FORMAT_MIME = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+    "BMP": "image/bmp",
+}
+_MIME_EXTENSION = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+    "image/gif": ".gif",
+    "image/bmp": ".bmp",
+}
+
+
+def mime_extension(mime_type: str) -> str:
+    return _MIME_EXTENSION.get(mime_type, ".img")
+
+
+class ImageResult:
+    """渠道返回的一张图。size / mime_type 只读文件头；image 属性才完整解码。"""
+
+    def __init__(
+        self,
+        data: bytes,
+        mime_type: str = "",
+        *,
+        width: int = 0,
+        height: int = 0,
+        metadata: Optional[dict[str, Any]] = None,
+    ):
+        self.data = bytes(data)
+        self.metadata = dict(metadata or {})
+        self._mime_type = mime_type
+        self._size: Optional[tuple[int, int]] = (width, height) if width and height else None
+        self._image: Optional[Image.Image] = None
+
+    @classmethod
+    def from_bytes(cls, data: bytes, **metadata: Any) -> "ImageResult":
+        return cls(data, metadata=metadata)
+
+    @classmethod
+    def from_base64(cls, encoded: str, **metadata: Any) -> "ImageResult":
+        return cls(base64.b64decode(encoded), metadata=metadata)
+
+    @classmethod
+    def from_pil(cls, image: Image.Image, format: str = "PNG", **metadata: Any) -> "ImageResult":
+        """兼容仍返回 PIL 图片的旧 provider：编码一次并保留已解码的像素。"""
+        buffer = BytesIO()
+        image.save(buffer, format=format)
+        result = cls(
+            buffer.getvalue(),
+            _FORMAT_MIME.get(format.upper(), ""),
+            width=image.width,
+            height=image.height,
+            metadata=metadata,
+        )
+        result._image = image
+        return result
+
+    @property
+    def mime_type(self) -> str:
+        if not self._mime_type:
+            self._read_header()
+        return self._mime_type or "application/octet-stream"
+
+    @property
+    def size(self) -> tuple[int, int]:
+        if self._size is None:
+            self._read_header()
+        return self._size or (0, 0)
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def extension(self) -> str:
+        return mime_extension(self.mime_type)
+
+    @property
+    def image(self) -> Image.Image:
+        """完整解码后的 PIL 图片，首次访问时才解码。"""
+        if self._image is None:
+            image = Image.open(BytesIO(self.data))
+            image.load()
+            self._image = image
+        return self._image
+
+    def to_bytes(self, format: Optional[str] = None, **save_kwargs: Any) -> bytes:
+        """format 为空或与原始格式一致时直接返回原始字节，否则转码。"""
+        if not format or _FORMAT_MIME.get(format.upper()) == self.mime_type:
+            return self.data
+        image = self.image
+        if format.upper() == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        image.save(buffer, format=format, **save_kwargs)
+        return buffer.getvalue()
+
+    def data_uri(self, format: Optional[str] = None) -> str:
+        data = self.to_bytes(format)
+        mime_type = _FORMAT_MIME.get(format.upper(), self.mime_type) if format else self.mime_type
+        return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+    def save(self, fp: Union[str, Path, BinaryIO], format: Optional[str] = None) -> None:
+        """与 PIL Image.save 用法兼容；写路径且未指定格式时按扩展名决定是否转码。"""
+        if isinstance(fp, (str, Path)):
+            if format is None:
+                format = Image.registered_extensions().get(Path(fp).suffix.lower())
+            Path(fp).write_bytes(self.to_bytes(format))
+        else:
+            fp.write(self.to_bytes(format))
+
+    def _read_header(self) -> None:
+        try:
+            with Image.open(BytesIO(self.data)) as image:
+                self._size = self._size or image.size
+                if not self._mime_type:
+                    self._mime_type = Image.MIME.get(image.format or "", "")
+        except Exception:  # noqa: BLE001
+            self._size = self._size or (0, 0)
+
+    def __repr__(self) -> str:
+        return f"ImageResult(mime_type={self.mime_type!r}, size={self.size}, bytes={len(self.data)})"
+
+
+def as_image_result(value: Any) -> Optional[ImageResult]:
+    """统一 provider 返回值：ImageResult 原样返回，PIL 图片编码成 PNG。"""
+    if value is None or isinstance(value, ImageResult):
+        return value
+    if isinstance(value, Image.Image):
+        return ImageResult.from_pil(value)
+    raise TypeError(f"不支持的生图结果类型: {type(value).__name__}")
@@ -0,0 +1,164 @@
+"""服务端生图结果暂存：按内容摘要寻址，供 /api/images/<id> 以二进制下发。
+
+结果不再以 base64 塞进 JSON，任务结果只带 id；超出容量后按最近使用淘汰。
+给了 directory 时每张图同时写盘（多个 worker 进程共用同一目录），
+内存里没有的 id 从磁盘读回，磁盘部分超出容量后按写入时间淘汰。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+from nano_banana.core.images.preprocess import prepare_image_data
+from nano_banana.core.images.protocol import ImageData
+from nano_banana.core.images.result import ImageResult, mime_extension
+
+DEFAULT_STORE_BYTES = 512 * 1024 * 1024
+THUMBNAIL_SIZES = (128, 256, 512, 1024)
+
+
+@dataclass(frozen=True)
+class StoredImage:
+    id: str
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+
+    @property
+    def etag(self) -> str:
+        return self.id
+
+    @property
+    def extension(self) -> str:
+        return mime_extension(self.mime_type)
+
+
+class ImageStore:
+    """线程安全的内存 LRU；同一张图重复写入只存一份。"""
+
+    def __init__(
+        self, *, max_bytes: int = DEFAULT_STORE_BYTES, directory: Path | str | None = None
+    ):
+        self.max_bytes = max_bytes
+        self.directory = Path(directory) if directory else None
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, StoredImage] = OrderedDict()
+        self._total_bytes = 0
+
+    def put(self, result: ImageResult) -> StoredImage:
+        image_id = hashlib.sha256(result.data).hexdigest()[:32]
+        stored = StoredImage(
+            id=image_id,
+            data=result.data,
+            mime_type=result.mime_type,
+            width=result.width,
+            height=result.height,
+        )
+        if self.directory is not None:
+            self._write_disk(stored)
+        with self._lock:
+            existing = self._entries.pop(image_id, None)
+            if existing is not None:
+                self._total_bytes -= len(existing.data)
+            self._entries[image_id] = stored
+            self._total_bytes += len(stored.data)
+            while len(self._entries) > 1 and self._total_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._total_bytes -= len(evicted.data)
+        return stored
+
+    def get(self, image_id: str) -> Optional[StoredImage]:
+        with self._lock:
+            stored = self._entries.get(image_id)
+            if stored is not None:
+                self._entries.move_to_end(image_id)
+                return stored
+        # 可能由其它 worker 进程生成，只读不回填内存，内存容量留给本进程的结果
+        return self._read_disk(image_id) if self.directory is not None else None
+
+    def thumbnail(self, image_id: str, max_side: int) -> Optional[StoredImage]:
+        """缩略图复用参考图预处理（缩放 + 重编码 + 缓存），尺寸限定在 THUMBNAIL_SIZES。"""
+        if max_side not in THUMBNAIL_SIZES:
+            raise ValueError(f"不支持的缩略图尺寸: {max_side}")
+        stored = self.get(image_id)
+        if stored is None:
+            return None
+        prepared = prepare_image_data(
+            ImageData(stored.data, stored.mime_type), max_side=max_side
+        )
+        return StoredImage(
+            id=f"{image_id}-{max_side}",
+            data=prepared.data,
+            mime_type=prepared.mime_type,
+            width=prepared.width or stored.width,
+            height=prepared.height or stored.height,
+        )
+
+    def _data_path(self, image_id: str) -> Path:
+        return self.directory / f"{image_id}.img"
+
+    def _write_disk(self, stored: StoredImage) -> None:
+        """先写图片再写元数据，读方看到 .json 时图片一定已完整落盘。"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        meta = {key: value for key, value in asdict(stored).items() if key != "data"}
+        _atomic_write(self._data_path(stored.id), stored.data)
+        _atomic_write(
+            self.directory / f"{stored.id}.json", json.dumps(meta).encode("utf-8")
+        )
+        self._evict_disk()
+
+    def _read_disk(self, image_id: str) -> Optional[StoredImage]:
+        # id 是内容摘要的十六进制，拒绝其它字符，避免拼出目录外的路径
+        if not image_id.isalnum():
+            return None
+        try:
+            meta = json.loads((self.directory / f"{image_id}.json").read_text("utf-8"))
+            data = self._data_path(image_id).read_bytes()
+        except (OSError, ValueError):
+            return None
+        return StoredImage(data=data, **meta)
+
+    def _evict_disk(self) -> None:
+        entries = []
+        for meta_path in self.directory.glob("*.json"):
+            data_path = meta_path.with_suffix(".img")
+            try:
+                entries.append((meta_path.stat().st_mtime, data_path.stat().st_size, meta_path))
+            except OSError:
+                continue
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        # 最新写入的一张总是保留
+        for _, size, meta_path in entries[:-1]:
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, meta_path.with_suffix(".img")):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file_obj:
+            file_obj.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
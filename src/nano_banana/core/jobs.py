@@ -0,0 +1,304 @@
+"""后台任务队列：有界线程池 + 按渠道限流，无 Web 依赖。
+
+任务提交后立即返回 Job，调用方轮询 get() 或用 iter_updates() 订阅状态变化。
+给了 store（如 storage.sqlite.SqliteJobStore）时，每次状态变化都写入共享存储，
+其它进程里的 JobManager 查不到本地任务时从 store 读取，等待与订阅改为按间隔轮询。
+"""
+from __future__ import annotations
+
+import threading
+import time
+import uuid
+from collections import deque
+from collections.abc import Callable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Optional, Protocol
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_TERMINAL_STATES = frozenset({JOB_DONE, JOB_FAILED})
+
+ReportFn = Callable[[dict[str, Any]], None]
+# 等待其它进程的任务时轮询共享存储的间隔（秒）
+REMOTE_POLL_INTERVAL = 0.5
+
+
+class JobStore(Protocol):
+    """跨进程共享的任务记录：Job.to_record() 的 JSON 按 id 存取。"""
+
+    def save(self, record: dict[str, Any]) -> None: ...
+
+    def load(self, job_id: str) -> Optional[dict[str, Any]]: ...
+
+    def prune(self, finished_before: float) -> None: ...
+
+
+@dataclass
+class Job:
+    id: str
+    provider: str
+    status: str = JOB_QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Any = None
+    error: str = ""
+    events: list[dict[str, Any]] = field(default_factory=list)
+    version: int = 0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in JOB_TERMINAL_STATES
+
+    def to_dict(self, *, include_result: bool = True) -> dict[str, Any]:
+        data: dict[str, Any] = {
+            "id": self.id,
+            "provider": self.provider,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "timings": self.timings(),
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result and self.status == JOB_DONE:
+            data["result"] = self.result
+        return data
+
+    def to_record(self) -> dict[str, Any]:
+        record = self.to_dict()
+        record.update(result=self.result, events=list(self.events), version=self.version)
+        return record
+
+    @classmethod
+    def from_record(cls, record: dict[str, Any]) -> "Job":
+        return cls(
+            id=record["id"],
+            provider=record["provider"],
+            status=record["status"],
+            created_at=record["created_at"],
+            started_at=record.get("started_at"),
+            finished_at=record.get("finished_at"),
+            result=record.get("result"),
+            error=record.get("error", ""),
+            events=list(record.get("events") or []),
+            version=record.get("version", 0),
+        )
+
+    def timings(self) -> dict[str, Optional[float]]:
+        now = time.time()
+        queued_until = self.started_at or self.finished_at or now
+        run_until = self.finished_at or now
+        return {
+            "queued_seconds": round(queued_until - self.created_at, 3),
+            "run_seconds": (
+                round(run_until - self.started_at, 3) if self.started_at else None
+            ),
+        }
+
+
+class JobManager:
+    """线程池执行任务；每个渠道最多同时跑 provider_limits[provider] 个。"""
+
+    def __init__(
+        self,
+        *,
+        max_workers: int = 8,
+        provider_limits: Optional[dict[str, int]] = None,
+        default_limit: int = 2,
+        retention_seconds: float = 3600.0,
+        max_jobs: int = 500,
+        store: Optional[JobStore] = None,
+    ):
+        self.max_workers = max_workers
+        self.provider_limits = dict(provider_limits or {})
+        self.default_limit = default_limit
+        self.retention_seconds = retention_seconds
+        self.max_jobs = max_jobs
+        self.store = store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="nano-banana-job"
+        )
+        self._condition = threading.Condition()
+        self._jobs: dict[str, Job] = {}
+        self._pending: dict[str, deque[tuple[Job, Callable[[ReportFn], Any]]]] = {}
+        self._running: dict[str, int] = {}
+
+    def limit_for(self, provider: str) -> int:
+        return max(1, int(self.provider_limits.get(provider) or self.default_limit))
+
+    def submit(self, fn: Callable[[ReportFn], Any], *, provider: str) -> Job:
+        """提交任务。fn 接收 report(event) 回调，返回值作为 job.result。"""
+        job = Job(id=uuid.uuid4().hex, provider=provider)
+        with self._condition:
+            self._prune_locked()
+            self._jobs[job.id] = job
+            self._persist_locked(job)
+            self._pending.setdefault(provider, deque()).append((job, fn))
+            self._dispatch_locked(provider)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """本进程的任务返回活对象；其它进程的任务返回 store 里的只读副本。"""
+        with self._condition:
+            return self._find_locked(job_id)
+
+    def snapshot(self, job_id: str, *, include_result: bool = True) -> Optional[dict[str, Any]]:
+        with self._condition:
+            job = self._find_locked(job_id)
+            return job.to_dict(include_result=include_result) if job else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Job]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                job = self._find_locked(job_id)
+                if job is None or job.finished:
+                    return job
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return job
+                if job_id not in self._jobs:
+                    # 其它进程的任务不会唤醒本进程的 condition，只能轮询
+                    remaining = (
+                        REMOTE_POLL_INTERVAL
+                        if remaining is None
+                        else min(remaining, REMOTE_POLL_INTERVAL)
+                    )
+                self._condition.wait(remaining)
+
+    def iter_updates(
+        self,
+        *job_ids: str,
+        heartbeat: float = 15.0,
+    ) -> Iterator[Optional[dict[str, Any]]]:
+        """任一任务状态或事件变化时产出其快照（附带新事件），全部结束后停止。
+
+        超过 heartbeat 秒无变化时产出 None，供 SSE 发送心跳。
+        """
+        seen: dict[str, tuple[int, int]] = {job_id: (-1, 0) for job_id in job_ids}
+        last_yield = time.monotonic()
+        while seen:
+            with self._condition:
+                updates = self._collect_updates_locked(seen)
+                if not updates and seen:
+                    timeout = heartbeat - (time.monotonic() - last_yield)
+                    if any(job_id not in self._jobs for job_id in seen):
+                        timeout = min(timeout, REMOTE_POLL_INTERVAL)
+                    self._condition.wait(max(0.0, timeout))
+                    updates = self._collect_updates_locked(seen)
+            if updates:
+                last_yield = time.monotonic()
+                yield from updates
+            elif seen and time.monotonic() - last_yield >= heartbeat:
+                last_yield = time.monotonic()
+                yield None
+
+    def _collect_updates_locked(
+        self, seen: dict[str, tuple[int, int]]
+    ) -> list[dict[str, Any]]:
+        updates = []
+        for job_id, (version, event_count) in list(seen.items()):
+            job = self._find_locked(job_id)
+            if job is None:
+                del seen[job_id]
+                continue
+            if job.version == version:
+                continue
+            update = job.to_dict()
+            update["events"] = job.events[event_count:]
+            updates.append(update)
+            if job.finished:
+                del seen[job_id]
+            else:
+                seen[job_id] = (job.version, len(job.events))
+        return updates
+
+    def active_count(self) -> int:
+        """排队中与运行中的任务数。"""
+        with self._condition:
+            return sum(self._running.values()) + sum(len(queue) for queue in self._pending.values())
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """等待所有已提交的任务结束（用于优雅退出）；超时返回 False。"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while any(self._running.values()) or any(self._pending.values()):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+            return True
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+    def _dispatch_locked(self, provider: str) -> None:
+        queue = self._pending.get(provider)
+        while queue and self._running.get(provider, 0) < self.limit_for(provider):
+            job, fn = queue.popleft()
+            self._running[provider] = self._running.get(provider, 0) + 1
+            self._executor.submit(self._run, job, fn)
+
+    def _run(self, job: Job, fn: Callable[[ReportFn], Any]) -> None:
+        self._update(job, status=JOB_RUNNING, started_at=time.time())
+        try:
+            result = fn(lambda event: self._report(job, event))
+        except Exception as exc:  # noqa: BLE001
+            self._update(job, status=JOB_FAILED, error=str(exc), finished_at=time.time())
+        else:
+            self._update(job, status=JOB_DONE, result=result, finished_at=time.time())
+        finally:
+            with self._condition:
+                self._running[job.provider] -= 1
+                self._dispatch_locked(job.provider)
+                self._condition.notify_all()
+
+    def _report(self, job: Job, event: dict[str, Any]) -> None:
+        with self._condition:
+            job.events.append(dict(event))
+            job.version += 1
+            self._persist_locked(job)
+            self._condition.notify_all()
+
+    def _update(self, job: Job, **changes: Any) -> None:
+        with self._condition:
+            for key, value in changes.items():
+                setattr(job, key, value)
+            job.version += 1
+            self._persist_locked(job)
+            self._condition.notify_all()
+
+    def _find_locked(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            record = self.store.load(job_id)
+            job = Job.from_record(record) if record else None
+        return job
+
+    def _persist_locked(self, job: Job) -> None:
+        if self.store is not None:
+            self.store.save(job.to_record())
+
+    def _prune_locked(self) -> None:
+        cutoff = time.time() - self.retention_seconds
+        if self.store is not None:
+            self.store.prune(cutoff)
+        finished = [
+            job for job in self._jobs.values()
+            if job.finished and (job.finished_at or 0) < cutoff
+        ]
+        for job in finished:
+            del self._jobs[job.id]
+        overflow = len(self._jobs) - self.max_jobs + 1
+        if overflow > 0:
+            oldest = sorted(
+                (job for job in self._jobs.values() if job.finished),
+                key=lambda job: job.finished_at or 0,
+            )
+            for job in oldest[:overflow]:
+                del self._jobs[job.id]
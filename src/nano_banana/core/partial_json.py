@@ -0,0 +1,343 @@
+"""流式 JSON 增量解析：模型输出逐段喂入，每个值一闭合就回调，已读部分不再重扫。
+
+容忍 JSON 前的说明文字和 ```json 围栏（跳到第一个 '{'），根对象闭合后的内容忽略。
+语法错误在出错的那个字符处抛 PartialJSONError，不必等流结束再 json.loads 才发现输出坏了。
+PromptFieldParser 在此之上按 schema 字段路径过滤，产出可直接填表的字段值。
+"""
+from __future__ import annotations
+
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from nano_banana.core.schema import PromptSchema, get_schema
+
+JsonPath = tuple[Any, ...]
+ValueCallback = Callable[[JsonPath, Any], None]
+
+_PREAMBLE = "preamble"
+_VALUE = "value"
+_VALUE_OR_END = "value_or_end"
+_KEY = "key"
+_KEY_OR_END = "key_or_end"
+_COLON = "colon"
+_COMMA_OR_END = "comma_or_end"
+_STRING = "string"
+_ESCAPE = "escape"
+_UNICODE = "unicode"
+_SCALAR = "scalar"
+_DONE = "done"
+
+_WHITESPACE = re.compile(r"[ \t\r\n]*")
+_STRING_RUN = re.compile(r'[^"\\\x00-\x1f]+')
+_SCALAR_RUN = re.compile(r"[-+.0-9a-zA-Z]+")
+_NUMBER = re.compile(r"-?(?:0|[1-9][0-9]*)(?:\.[0-9]+)?(?:[eE][-+]?[0-9]+)?")
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+_LITERALS = {"true": True, "false": False, "null": None}
+_ESCAPES = {
+    '"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t",
+}
+
+
+class PartialJSONError(ValueError):
+    def __init__(self, message: str, position: int):
+        super().__init__(f"{message}（第 {position + 1} 个字符）")
+        self.position = position
+
+
+class _Frame:
+    __slots__ = ("container", "path", "key")
+
+    def __init__(self, container: Any, path: JsonPath):
+        self.container = container
+        self.path = path
+        self.key: Optional[str] = None
+
+
+class IncrementalJSONParser:
+    """逐段 feed 的 JSON 对象解析器。
+
+    on_value(path, value) 在每个值（含容器）闭合时调用，path 由键名与数组下标组成，
+    根对象为 ()。root 随解析增长，任意时刻都是已读部分对应的文档。
+    """
+
+    def __init__(self, on_value: Optional[ValueCallback] = None):
+        self.on_value = on_value
+        self.root: Optional[dict[str, Any]] = None
+        self.position = 0
+        self._state = _PREAMBLE
+        self._stack: list[_Frame] = []
+        self._buffer: list[str] = []
+        self._string_is_key = False
+        self._hex = ""
+        self._surrogates = False
+        self._error: Optional[PartialJSONError] = None
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    @property
+    def started(self) -> bool:
+        return self._state != _PREAMBLE
+
+    def feed(self, text: str) -> None:
+        if self._error is not None:
+            raise self._error
+        try:
+            self._feed(text)
+        finally:
+            self.position += len(text)
+
+    def finish(self) -> dict[str, Any]:
+        """流结束时调用：根对象未读到或未闭合则抛 PartialJSONError。"""
+        if self._error is not None:
+            raise self._error
+        if self._state == _PREAMBLE:
+            raise PartialJSONError("没有找到 JSON 对象", self.position)
+        if self._state != _DONE:
+            raise PartialJSONError("JSON 不完整", self.position)
+        return self.root
+
+    def _feed(self, text: str) -> None:
+        index, length = 0, len(text)
+        while index < length:
+            state = self._state
+            if state == _STRING:
+                match = _STRING_RUN.match(text, index)
+                if match:
+                    self._buffer.append(match.group())
+                    index = match.end()
+                    continue
+                char = text[index]
+                if char == '"':
+                    self._end_string()
+                elif char == "\\":
+                    self._state = _ESCAPE
+                else:
+                    self._fail("字符串中有未转义的控制字符", index)
+                index += 1
+            elif state == _ESCAPE:
+                char = text[index]
+                if char == "u":
+                    self._hex = ""
+                    self._state = _UNICODE
+                elif char in _ESCAPES:
+                    self._buffer.append(_ESCAPES[char])
+                    self._state = _STRING
+                else:
+                    self._fail("无效的转义字符", index)
+                index += 1
+            elif state == _UNICODE:
+                char = text[index]
+                if char not in _HEX_DIGITS:
+                    self._fail("无效的 \\u 转义", index)
+                self._hex += char
+                if len(self._hex) == 4:
+                    code = int(self._hex, 16)
+                    self._surrogates = self._surrogates or 0xD800 <= code <= 0xDFFF
+                    self._buffer.append(chr(code))
+                    self._state = _STRING
+                index += 1
+            elif state == _SCALAR:
+                match = _SCALAR_RUN.match(text, index)
+                if match:
+                    self._buffer.append(match.group())
+                    index = match.end()
+                if index < length:
+                    # 分隔符不在这里消费，留给结构状态处理
+                    self._end_scalar(index)
+            elif state == _PREAMBLE:
+                start = text.find("{", index)
+                if start < 0:
+                    return
+                self._open({}, start)
+                index = start + 1
+            elif state == _DONE:
+                return
+            else:
+                index = _WHITESPACE.match(text, index).end()
+                if index < length:
+                    self._structural(text[index], index)
+                    index += 1
+
+    def _structural(self, char: str, index: int) -> None:
+        state = self._state
+        if state in (_VALUE, _VALUE_OR_END):
+            if char == "]" and state == _VALUE_OR_END:
+                self._close(list, index)
+            elif char == "{":
+                self._open({}, index)
+            elif char == "[":
+                self._open([], index)
+            elif char == '"':
+                self._start_string(is_key=False)
+            elif char == "-" or char.isdigit() or char in "tfn":
+                self._buffer = [char]
+                self._state = _SCALAR
+            else:
+                self._fail("这里应该是一个值", index)
+        elif state in (_KEY, _KEY_OR_END):
+            if char == "}" and state == _KEY_OR_END:
+                self._close(dict, index)
+            elif char == '"':
+                self._start_string(is_key=True)
+            else:
+                self._fail("这里应该是带引号的键名", index)
+        elif state == _COLON:
+            if char != ":":
+                self._fail("键名后缺少冒号", index)
+            self._state = _VALUE
+        else:
+            in_object = isinstance(self._stack[-1].container, dict)
+            if char == ",":
+                self._state = _KEY if in_object else _VALUE
+            elif char == ("}" if in_object else "]"):
+                self._close(dict if in_object else list, index)
+            else:
+                self._fail("缺少逗号或右括号", index)
+
+    def _child_path(self) -> JsonPath:
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            return frame.path + (frame.key,)
+        return frame.path + (len(frame.container),)
+
+    def _attach(self, value: Any) -> None:
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            frame.container[frame.key] = value
+        else:
+            frame.container.append(value)
+
+    def _open(self, container: Any, index: int) -> None:
+        if self._stack:
+            path = self._child_path()
+            self._attach(container)
+        else:
+            path = ()
+            self.root = container
+        self._stack.append(_Frame(container, path))
+        self._state = _KEY_OR_END if isinstance(container, dict) else _VALUE_OR_END
+
+    def _close(self, kind: type, index: int) -> None:
+        frame = self._stack.pop()
+        if not isinstance(frame.container, kind):
+            self._fail("括号不匹配", index)
+        self._state = _COMMA_OR_END if self._stack else _DONE
+        self._emit(frame.path, frame.container)
+
+    def _start_string(self, *, is_key: bool) -> None:
+        self._buffer = []
+        self._string_is_key = is_key
+        self._surrogates = False
+        self._state = _STRING
+
+    def _end_string(self) -> None:
+        text = "".join(self._buffer)
+        if self._surrogates:
+            text = text.encode("utf-16", "surrogatepass").decode("utf-16", "replace")
+        self._buffer = []
+        if self._string_is_key:
+            self._stack[-1].key = text
+            self._state = _COLON
+        else:
+            self._scalar_value(text)
+
+    def _end_scalar(self, index: int) -> None:
+        token = "".join(self._buffer)
+        self._buffer = []
+        if token in _LITERALS:
+            value = _LITERALS[token]
+        elif _NUMBER.fullmatch(token):
+            value = float(token) if any(c in token for c in ".eE") else int(token)
+        else:
+            self._fail(f"无效的字面量 {token!r}", index - len(token))
+        self._scalar_value(value)
+
+    def _scalar_value(self, value: Any) -> None:
+        path = self._child_path()
+        self._attach(value)
+        self._state = _COMMA_OR_END
+        self._emit(path, value)
+
+    def _emit(self, path: JsonPath, value: Any) -> None:
+        if self.on_value is not None:
+            self.on_value(path, value)
+
+    def _fail(self, message: str, index: int) -> None:
+        self._error = PartialJSONError(message, self.position + index)
+        raise self._error
+
+
+@dataclass(frozen=True)
+class FieldValue:
+    """一个 schema 字段读完整后的值；value 保持模型输出的 JSON 形态（字符串或字符串数组）。"""
+
+    id: str
+    path: tuple[str, ...]
+    value: Any
+
+    def to_dict(self) -> dict[str, Any]:
+        return {"id": self.id, "path": list(self.path), "value": self.value}
+
+
+class PromptFieldParser:
+    """按 schema 字段（含 overlay）路径过滤增量解析结果。
+
+    feed() 返回本段新读完的字段；error 记录第一个问题（语法错误或字段类型不对），
+    语法错误之后不再产出字段，类型不对的字段单独跳过。
+    """
+
+    def __init__(self, schema: Optional[PromptSchema] = None):
+        schema = schema or get_schema()
+        self._fields: dict[tuple[str, ...], tuple[str, str]] = {
+            overlay.path: (overlay.id, "string") for overlay in schema.overlays
+        }
+        self._fields.update((field.path, (field.id, field.type)) for field in schema.iter_fields())
+        self._parser = IncrementalJSONParser(self._on_value)
+        self._ready: list[FieldValue] = []
+        self._broken = False
+        self.error = ""
+
+    @property
+    def root(self) -> Optional[dict[str, Any]]:
+        return self._parser.root
+
+    def feed(self, text: str) -> list[FieldValue]:
+        if not self._broken:
+            try:
+                self._parser.feed(text)
+            except PartialJSONError as exc:
+                self._fail(str(exc), broken=True)
+        ready, self._ready = self._ready, []
+        return ready
+
+    def finish(self) -> str:
+        """流结束：返回首个问题的描述，没有问题返回空串。"""
+        if not self._broken:
+            try:
+                self._parser.finish()
+            except PartialJSONError as exc:
+                self._fail(str(exc), broken=True)
+        return self.error
+
+    def _on_value(self, path: JsonPath, value: Any) -> None:
+        entry = self._fields.get(path)
+        if entry is None:
+            return
+        field_id, field_type = entry
+        if isinstance(value, dict) or (
+            isinstance(value, list)
+            and (field_type != "string_list" or any(isinstance(item, (dict, list)) for item in value))
+        ):
+            expected = "字符串数组" if field_type == "string_list" else "字符串"
+            self._fail(f"字段 {'.'.join(path)} 应为{expected}")
+            return
+        self._ready.append(FieldValue(field_id, path, value))
+
+    def _fail(self, message: str, *, broken: bool = False) -> None:
+        self._broken = self._broken or broken
+        if not self.error:
+            self.error = message
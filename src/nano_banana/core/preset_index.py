@@ -0,0 +1,405 @@
+"""预设元数据索引：SQLite 里保存每个预设的 mtime/size/内容摘要/展开后的字段值。
+
+目录 mtime 未变化时直接从索引回答列表与详情查询；目录变化后只 stat 一遍，
+并且只重新读取 mtime 或 size 变化过的文件。原地改写文件不会改动目录 mtime，
+所以即使目录没变，每隔 RESCAN_INTERVAL 秒也会 stat 一遍文件。
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Iterable, Optional, Protocol
+
+# 全局预设在索引里的 scope；分类预设使用各自的 scope 名
+GLOBAL_SCOPE = ""
+# 放在独立子目录里：SQLite 的日志文件增删不会改动预设目录本身的 mtime
+INDEX_DIRNAME = ".index"
+INDEX_FILENAME = "presets.sqlite3"
+_SCHEMA_VERSION = 2
+# 目录 mtime 未变时，两次逐文件 stat 之间的最短间隔（秒），用来发现原地改写的预设
+RESCAN_INTERVAL = 2.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS presets (
+    scope TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    data TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (scope, name)
+);
+CREATE INDEX IF NOT EXISTS presets_by_mtime ON presets (scope, mtime_ns DESC);
+CREATE INDEX IF NOT EXISTS presets_by_name ON presets (name);
+CREATE TABLE IF NOT EXISTS directories (
+    scope TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    generation INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _flatten_fields(data: Any) -> dict[str, Any]:
+    if not isinstance(data, dict):
+        return {}
+    from nano_banana.core.prompt_doc import flatten
+
+    try:
+        return {key: value for key, value in flatten(data).items() if value}
+    except Exception:  # noqa: BLE001
+        return {}
+
+
+class IndexListener(Protocol):
+    """索引行变化的订阅者（如检索用的倒排索引）。"""
+
+    def add(self, scope: str, name: str, fields: dict[str, Any], mtime_ns: int = 0) -> None: ...
+
+    def remove(self, scope: str, name: str) -> None: ...
+
+    def reset(self, scope: str) -> None: ...
+
+
+class PresetIndex:
+    """线程安全；数据库打不开（只读目录等）时退化为内存索引。
+
+    disposable=False 时这张表就是数据本身（SQLite 存储后端），版本不符时报错而不是重建；
+    wal=True 开启 WAL，允许多个进程并发读写。
+    """
+
+    def __init__(self, path: Path | str, *, disposable: bool = True, wal: bool = False):
+        self.path = Path(path)
+        self.disposable = disposable
+        self.wal = wal
+        self._lock = threading.RLock()
+        self._conn = self._connect()
+        self._listeners: list[IndexListener] = []
+        # 订阅者已经看到的各 scope generation；与库里不一致说明别的进程改过
+        self._synced: dict[str, int] = {}
+        # 各 scope 上次逐文件 stat 的时间（monotonic）
+        self._scanned_at: dict[str, float] = {}
+
+    def subscribe(self, listener: IndexListener) -> None:
+        """注册后，先收到现有全部行，此后每次增删都会同步通知。"""
+        with self._lock:
+            if not self._listeners:
+                # 先读 generation 再读行：两次读取之间的并发修改只会让下次同步多重建一次
+                self._synced = dict(self._conn.execute("SELECT scope, generation FROM directories"))
+            self._listeners.append(listener)
+            for scope, name, mtime_ns, fields in self._conn.execute(
+                "SELECT scope, name, mtime_ns, fields FROM presets"
+            ):
+                listener.add(scope, name, json.loads(fields), mtime_ns)
+
+    def _resync_locked(self, scope: str, generation: int) -> None:
+        """别的进程改过这个 scope（共享同一个库）：订阅者的该 scope 整体重建。"""
+        rows = self._conn.execute(
+            "SELECT name, mtime_ns, fields FROM presets WHERE scope = ?", (scope,)
+        ).fetchall()
+        for listener in self._listeners:
+            listener.reset(scope)
+            for name, mtime_ns, fields in rows:
+                listener.add(scope, name, json.loads(fields), mtime_ns)
+        self._synced[scope] = generation
+
+    def _delete_locked(self, scope: str, names: Iterable[str]) -> None:
+        names = list(names)
+        if not names:
+            return
+        self._conn.executemany(
+            "DELETE FROM presets WHERE scope = ? AND name = ?", [(scope, name) for name in names]
+        )
+        self._bump_locked(scope)
+        for listener in self._listeners:
+            for name in names:
+                listener.remove(scope, name)
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+            if self.wal:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version not in (0, _SCHEMA_VERSION):
+                if not self.disposable:
+                    raise RuntimeError(f"预设数据库版本 {version} 与程序不兼容: {self.path}")
+                conn.executescript(
+                    "DROP TABLE IF EXISTS presets; DROP TABLE IF EXISTS directories;"
+                    " DROP TABLE IF EXISTS meta;"
+                )
+            conn.executescript(_SCHEMA)
+            self._init_meta(conn)
+            conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            conn.commit()
+            return conn
+        except (OSError, sqlite3.Error) as e:
+            if not self.disposable:
+                raise
+            print(f"预设索引不可用，改用内存索引: {e}")
+            conn = sqlite3.connect(":memory:", check_same_thread=False)
+            conn.executescript(_SCHEMA)
+            self._init_meta(conn)
+            return conn
+
+    @staticmethod
+    def _init_meta(conn: sqlite3.Connection) -> None:
+        # 每个索引库一个随机 id，库重建后 generation 从头计数也不会与旧状态撞车
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (key, value) VALUES ('instance', ?)",
+            (uuid.uuid4().hex,),
+        )
+
+    def _bump_locked(self, scope: str) -> None:
+        self._conn.execute(
+            "INSERT INTO directories (scope, mtime_ns, generation) VALUES (?, -1, 1)"
+            " ON CONFLICT(scope) DO UPDATE SET generation = generation + 1",
+            (scope,),
+        )
+        # 已在写事务内，读到的就是本次加一后的值；只有紧接着上次已同步的版本才算同步
+        generation = self._conn.execute(
+            "SELECT generation FROM directories WHERE scope = ?", (scope,)
+        ).fetchone()[0]
+        if self._synced.get(scope, 0) == generation - 1:
+            self._synced[scope] = generation
+
+    def state_token(self, scope: str) -> str:
+        """scope 内容的版本标识：任何预设增删改都会让它变化，可直接用作 ETag。
+
+        返回前会让订阅者追上这个版本（包括其他进程写入的修改）。
+        """
+        with self._lock:
+            instance = self._conn.execute("SELECT value FROM meta WHERE key = 'instance'").fetchone()
+            row = self._conn.execute(
+                "SELECT generation FROM directories WHERE scope = ?", (scope,)
+            ).fetchone()
+            generation = row[0] if row else 0
+            if self._listeners and self._synced.get(scope, 0) != generation:
+                self._resync_locked(scope, generation)
+        return f"{instance[0] if instance else ''}:{scope}:{generation}"
+
+    def refresh(self, scope: str, directory: Path, *, force: bool = False) -> None:
+        """目录 mtime 变化、距上次扫描超过 RESCAN_INTERVAL 或 force 时重新 stat 目录，只重读有变化的文件。"""
+        with self._lock:
+            try:
+                dir_mtime = directory.stat().st_mtime_ns
+            except OSError:
+                names = [
+                    row[0]
+                    for row in self._conn.execute("SELECT name FROM presets WHERE scope = ?", (scope,))
+                ]
+                self._delete_locked(scope, names)
+                self._conn.execute(
+                    "UPDATE directories SET mtime_ns = -1 WHERE scope = ?", (scope,)
+                )
+                self._conn.commit()
+                return
+            row = self._conn.execute(
+                "SELECT mtime_ns FROM directories WHERE scope = ?", (scope,)
+            ).fetchone()
+            now = time.monotonic()
+            if (
+                row
+                and row[0] == dir_mtime
+                and not force
+                and now - self._scanned_at.get(scope, float("-inf")) < RESCAN_INTERVAL
+            ):
+                return
+            self._scanned_at[scope] = now
+
+            known = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in self._conn.execute(
+                    "SELECT name, mtime_ns, size FROM presets WHERE scope = ?", (scope,)
+                )
+            }
+            seen = set()
+            for file in directory.glob("*.json"):
+                try:
+                    stat = file.stat()
+                except OSError:
+                    continue
+                seen.add(file.stem)
+                if known.get(file.stem) == (stat.st_mtime_ns, stat.st_size):
+                    continue
+                self._index_file_locked(scope, file)
+            self._delete_locked(scope, [name for name in known if name not in seen])
+            self._conn.execute(
+                "INSERT INTO directories (scope, mtime_ns) VALUES (?, ?)"
+                " ON CONFLICT(scope) DO UPDATE SET mtime_ns = excluded.mtime_ns",
+                (scope, dir_mtime),
+            )
+            self._conn.commit()
+
+    def index_file(self, scope: str, file: Path) -> None:
+        """保存预设后立即更新对应的一行，不必等下一次目录扫描。"""
+        with self._lock:
+            self._index_file_locked(scope, file)
+            self._conn.commit()
+
+    def _index_file_locked(self, scope: str, file: Path) -> None:
+        try:
+            raw = file.read_bytes()
+            stat = file.stat()
+            data = json.loads(raw.decode("utf-8"))
+        except (OSError, ValueError) as e:
+            print(f"索引预设失败 {file.name}: {e}")
+            self._delete_locked(scope, [file.stem])
+            return
+        self._upsert_locked(
+            scope,
+            file.stem,
+            data,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            digest=hashlib.sha256(raw).hexdigest(),
+        )
+
+    def upsert(self, scope: str, name: str, data: Any, *, mtime_ns: int) -> None:
+        """直接写入一行（SQLite 后端保存预设时使用），摘要按规范化 JSON 计算。"""
+        raw = json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+        with self._lock:
+            self._upsert_locked(
+                scope,
+                name,
+                data,
+                mtime_ns=mtime_ns,
+                size=len(raw),
+                digest=hashlib.sha256(raw).hexdigest(),
+            )
+            self._conn.commit()
+
+    def rename(self, scope: str, old_name: str, new_name: str) -> bool:
+        """在同一事务里改名；新名字已存在或旧名字不存在时返回 False。"""
+        with self._lock:
+            if self._conn.execute(
+                "SELECT 1 FROM presets WHERE scope = ? AND name = ?", (scope, new_name)
+            ).fetchone():
+                return False
+            entry = self.get(scope, old_name)
+            if entry is None:
+                return False
+            self._delete_locked(scope, [old_name])
+            self._upsert_locked(
+                scope,
+                new_name,
+                entry["data"],
+                mtime_ns=entry["mtime_ns"],
+                size=entry["size"],
+                digest=entry["hash"],
+            )
+            self._conn.commit()
+            return True
+
+    def _upsert_locked(
+        self,
+        scope: str,
+        name: str,
+        data: Any,
+        *,
+        mtime_ns: int,
+        size: int,
+        digest: str,
+    ) -> None:
+        fields = _flatten_fields(data)
+        previous = self._conn.execute(
+            "SELECT hash FROM presets WHERE scope = ? AND name = ?", (scope, name)
+        ).fetchone()
+        if previous is None or previous[0] != digest:
+            self._bump_locked(scope)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO presets (scope, name, mtime_ns, size, hash, data, fields)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                scope,
+                name,
+                mtime_ns,
+                size,
+                digest,
+                json.dumps(data, ensure_ascii=False),
+                json.dumps(fields, ensure_ascii=False),
+            ),
+        )
+        for listener in self._listeners:
+            listener.add(scope, name, fields, mtime_ns)
+
+    def remove(self, scope: str, name: str) -> bool:
+        with self._lock:
+            exists = self._conn.execute(
+                "SELECT 1 FROM presets WHERE scope = ? AND name = ?", (scope, name)
+            ).fetchone()
+            if exists:
+                self._delete_locked(scope, [name])
+                self._conn.commit()
+            return bool(exists)
+
+    def entries(
+        self,
+        scope: str,
+        *,
+        with_data: bool = False,
+        after: Optional[tuple[int, str]] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict[str, Any]]:
+        """按修改时间倒序返回索引行：name / scope / mtime_ns / size / hash / fields [/ data]。
+
+        after=(mtime_ns, name) 为键集分页游标，只返回排在它之后的行。
+        """
+        columns = "name, mtime_ns, size, hash, fields" + (", data" if with_data else "")
+        sql = f"SELECT {columns} FROM presets WHERE scope = ?"
+        params: list[Any] = [scope]
+        if after is not None:
+            sql += " AND (mtime_ns < ? OR (mtime_ns = ? AND name > ?))"
+            params += [after[0], after[0], after[1]]
+        sql += " ORDER BY mtime_ns DESC, name"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [self._row(scope, row, with_data) for row in rows]
+
+    def get(self, scope: str, name: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT name, mtime_ns, size, hash, fields, data FROM presets"
+                " WHERE scope = ? AND name = ?",
+                (scope, name),
+            ).fetchone()
+        return self._row(scope, row, True) if row else None
+
+    @staticmethod
+    def _row(scope: str, row: Iterable[Any], with_data: bool) -> dict[str, Any]:
+        values = list(row)
+        entry = dict(
+            scope=scope,
+            name=values[0],
+            mtime_ns=values[1],
+            size=values[2],
+            hash=values[3],
+            fields=json.loads(values[4]),
+        )
+        if with_data:
+            entry["data"] = json.loads(values[5])
+        return entry
+
+    def scopes(self) -> list[str]:
+        """索引中出现过的全部 scope。"""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT scope FROM presets ORDER BY scope").fetchall()
+        return [row[0] for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,180 @@
+"""预设全文/分字段检索：内存倒排索引，由 PresetIndex 的变更回调增量维护。
+
+分词规则：拉丁字母与数字按整词（小写），中日韩文字按单字 + 相邻两字（bigram）。
+查询语法：空格分隔的多个条件同时满足；`字段:值` 只在该字段中匹配，字段可写
+schema 字段 id（lighting）或中文键名（光线），`name:` 匹配预设名；其余词匹配任意字段。
+候选集先由倒排表求交，再做一次子串校验，排除 bigram 拼接出的误命中。
+"""
+from __future__ import annotations
+
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Iterable, Optional
+
+NAME_FIELD = "name"
+DEFAULT_LIMIT = 50
+
+_TOKEN_RE = re.compile(
+    r"[0-9a-z]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+"
+)
+_CJK_START = "\u3040"
+
+DocKey = tuple[str, str]
+
+
+def tokenize(text: str) -> set[str]:
+    """把文本切成倒排索引的词项。"""
+    tokens: set[str] = set()
+    for run in _TOKEN_RE.findall(str(text).lower()):
+        if run[0] < _CJK_START:
+            tokens.add(run)
+            continue
+        tokens.update(run)
+        tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _query_tokens(text: str) -> set[str]:
+    """查询词只取最长的有效词项：CJK 用 bigram（单字时用单字），减少求交次数。"""
+    tokens: set[str] = set()
+    for run in _TOKEN_RE.findall(str(text).lower()):
+        if run[0] < _CJK_START or len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+@lru_cache(maxsize=1)
+def _field_aliases() -> dict[str, str]:
+    from nano_banana.core.schema import get_schema
+
+    aliases = {NAME_FIELD: NAME_FIELD, "名称": NAME_FIELD}
+    for field in get_schema().iter_fields():
+        aliases[field.id.lower()] = field.id
+        aliases[field.widget_key.lower()] = field.id
+        aliases[field.label.lower()] = field.id
+    return aliases
+
+
+def parse_query(query: str) -> list[tuple[Optional[str], str]]:
+    """'lighting:逆光 海边' → [("lighting", "逆光"), (None, "海边")]；未知字段名按普通词处理。"""
+    aliases = _field_aliases()
+    terms: list[tuple[Optional[str], str]] = []
+    for part in (query or "").split():
+        field, sep, value = part.partition(":")
+        if not sep:
+            field, sep, value = part.partition("：")
+        if sep and field.lower() in aliases and value:
+            terms.append((aliases[field.lower()], value.lower()))
+        else:
+            terms.append((None, part.lower()))
+    return terms
+
+
+class PresetSearchIndex:
+    """(scope, name) 为文档键；全局词表与分字段词表各一份，线程安全。"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._docs: dict[DocKey, dict[str, Any]] = {}
+        self._postings: dict[str, set[DocKey]] = {}
+        self._field_postings: dict[tuple[str, str], set[DocKey]] = {}
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._docs)
+
+    def add(self, scope: str, name: str, fields: dict[str, Any], mtime_ns: int = 0) -> None:
+        key = (scope, name)
+        texts = {NAME_FIELD: name.lower()}
+        texts.update(
+            (field_id, str(value).lower()) for field_id, value in (fields or {}).items() if value
+        )
+        with self._lock:
+            self._remove_locked(key)
+            self._docs[key] = {"texts": texts, "mtime_ns": mtime_ns}
+            for field_id, text in texts.items():
+                for token in tokenize(text):
+                    self._postings.setdefault(token, set()).add(key)
+                    self._field_postings.setdefault((field_id, token), set()).add(key)
+
+    def remove(self, scope: str, name: str) -> None:
+        with self._lock:
+            self._remove_locked((scope, name))
+
+    def reset(self, scope: str) -> None:
+        """清空一个 scope 的全部文档（随后由存储后端重新灌入）。"""
+        with self._lock:
+            for key in [key for key in self._docs if key[0] == scope]:
+                self._remove_locked(key)
+
+    def _remove_locked(self, key: DocKey) -> None:
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        for field_id, text in doc["texts"].items():
+            for token in tokenize(text):
+                for table, table_key in (
+                    (self._postings, token),
+                    (self._field_postings, (field_id, token)),
+                ):
+                    postings = table.get(table_key)
+                    if postings is not None:
+                        postings.discard(key)
+                        if not postings:
+                            del table[table_key]
+
+    def search(self, query: str, scope: str = "", *, limit: int = DEFAULT_LIMIT) -> list[dict[str, Any]]:
+        """返回 [{name, scope, mtime_ns, matched_fields}]，按修改时间倒序。"""
+        terms = parse_query(query)
+        if not terms:
+            return []
+        with self._lock:
+            candidates: Optional[set[DocKey]] = None
+            for field_id, value in sorted(terms, key=lambda term: term[0] is None):
+                tokens = _query_tokens(value)
+                if not tokens:
+                    continue
+                for token in sorted(tokens, key=lambda t: len(self._lookup(field_id, t))):
+                    postings = self._lookup(field_id, token)
+                    candidates = set(postings) if candidates is None else candidates & postings
+                    if not candidates:
+                        return []
+            if candidates is None:
+                return []
+
+            results = []
+            for key in candidates:
+                if key[0] != scope:
+                    continue
+                doc = self._docs[key]
+                matched = self._verify(doc["texts"], terms)
+                if matched is not None:
+                    results.append({
+                        "name": key[1],
+                        "scope": key[0],
+                        "mtime_ns": doc["mtime_ns"],
+                        "matched_fields": matched,
+                    })
+        results.sort(key=lambda item: (-item["mtime_ns"], item["name"]))
+        return results[:limit] if limit else results
+
+    def _lookup(self, field_id: Optional[str], token: str) -> set[DocKey]:
+        if field_id is None:
+            return self._postings.get(token, set())
+        return self._field_postings.get((field_id, token), set())
+
+    @staticmethod
+    def _verify(texts: dict[str, str], terms: Iterable[tuple[Optional[str], str]]) -> Optional[list[str]]:
+        matched: list[str] = []
+        for field_id, value in terms:
+            if field_id is not None:
+                hits = [field_id] if value in texts.get(field_id, "") else []
+            else:
+                hits = [fid for fid, text in texts.items() if value in text]
+            if not hits:
+                return None
+            matched.extend(fid for fid in hits if fid not in matched)
+        return matched
@@ -1,17 +1,43 @@
-"""预设管理器"""
-import os
-import json
+"""预设管理器
+
+实际读写委托给存储后端（nano_banana.core.storage）：默认每个预设一个 JSON 文件，
+列表与详情查询走元数据索引；也可切换到 SQLite 后端。
+"""
+import threading
 from pathlib import Path
 from datetime import datetime
+from nano_banana.core.preset_index import GLOBAL_SCOPE
+from nano_banana.core.preset_search import DEFAULT_LIMIT, PresetSearchIndex
 from nano_banana.core.resource_path import get_presets_dir
+from nano_banana.core.storage import PresetStore, create_preset_store
 
 
 class PresetManager:
     """管理提示词预设的保存和加载"""
 
-    def __init__(self, presets_dir: Path | None = None):
+    def __init__(self, presets_dir: Path | None = None, store: PresetStore | None = None):
         self.presets_dir = Path(presets_dir) if presets_dir else get_presets_dir()
         self._ensure_dir_exists()
+        self.store = store or create_preset_store(Path(presets_dir) if presets_dir else None)
+        self._search_index: PresetSearchIndex | None = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def search_index(self) -> PresetSearchIndex:
+        """倒排索引在首次检索时由存储后端灌入，之后随保存/删除/重命名增量更新。"""
+        with self._index_lock:
+            if self._search_index is None:
+                search_index = PresetSearchIndex()
+                self.store.subscribe(search_index)
+                self._search_index = search_index
+            return self._search_index
+
+    def _listing(self, scope: str, entry: dict) -> dict:
+        return {
+            "name": entry["name"],
+            "path": self.store.location(scope, entry["name"]),
+            "modified_time": datetime.fromtimestamp(entry["mtime_ns"] / 1e9),
+        }
 
     @staticmethod
     def _safe_name(name: str) -> str:
@@ -21,32 +47,56 @@ class PresetManager:
             if c.isalnum() or c in (' ', '-', '_', '（', '）', '(', ')')
         ).strip()
 
-    def _get_category_dir(self, scope: str) -> Path | None:
-        """返回分类预设目录，拒绝可能逃逸预设目录的 scope。"""
-        if not scope or any(c not in "abcdefghijklmnopqrstuvwxyz0123456789_-" for c in scope):
-            return None
-        return self.presets_dir / "categories" / scope
+    @staticmethod
+    def _valid_scope(scope: str) -> bool:
+        """拒绝可能逃逸预设目录的 scope。"""
+        return bool(scope) and all(c in "abcdefghijklmnopqrstuvwxyz0123456789_-" for c in scope)
 
     def _ensure_dir_exists(self):
         """确保预设目录存在"""
         self.presets_dir.mkdir(parents=True, exist_ok=True)
 
     def get_all_presets(self) -> list[dict]:
-        """获取所有预设列表，返回 [{name, path, modified_time}, ...]"""
-        presets = []
-        for file in self.presets_dir.glob("*.json"):
-            try:
-                stat = file.stat()
-                presets.append({
-                    "name": file.stem,
-                    "path": str(file),
-                    "modified_time": datetime.fromtimestamp(stat.st_mtime),
-                })
-            except Exception:
-                continue
-        # 按修改时间倒序排列
-        presets.sort(key=lambda x: x["modified_time"], reverse=True)
-        return presets
+        """获取所有预设列表，返回 [{name, path, modified_time}, ...]，按修改时间倒序"""
+        return [self._listing(GLOBAL_SCOPE, entry) for entry in self.store.entries(GLOBAL_SCOPE)]
+
+    def get_all_preset_details(self) -> list[dict]:
+        """按 get_all_presets 的顺序返回所有预设内容，直接取自索引。"""
+        return [entry["data"] for entry in self.store.entries(GLOBAL_SCOPE, with_data=True)]
+
+    def get_preset_details_page(
+        self,
+        after: tuple[int, str] | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """分页读取预设内容：[{name, mtime_ns, hash, data, ...}]，after 为上一页最后一行的 (mtime_ns, name)。"""
+        return self.store.entries(GLOBAL_SCOPE, with_data=True, after=after, limit=limit)
+
+    def get_presets_state(self, scope: str = GLOBAL_SCOPE) -> str:
+        """预设库当前状态的版本标识，内容不变时保持不变。"""
+        if scope != GLOBAL_SCOPE and not self._valid_scope(scope):
+            return ""
+        return self.store.state_token(scope)
+
+    def search_presets(
+        self,
+        query: str,
+        scope: str = GLOBAL_SCOPE,
+        limit: int = DEFAULT_LIMIT,
+    ) -> list[dict]:
+        """检索预设，返回 [{name, path, modified_time, matched_fields}, ...]。
+
+        query 支持 `lighting:逆光` 这类分字段条件，多个条件需同时满足。
+        """
+        if scope != GLOBAL_SCOPE and not self._valid_scope(scope):
+            return []
+        search_index = self.search_index
+        # 让后端先同步目录变化与其他进程的写入，变更会经订阅回调进入倒排索引
+        self.store.state_token(scope)
+        return [
+            {**self._listing(scope, hit), "matched_fields": hit["matched_fields"]}
+            for hit in search_index.search(query, scope, limit=limit)
+        ]
 
     def save_preset(self, name: str, data: dict) -> bool:
         """保存预设"""
@@ -54,10 +104,7 @@ class PresetManager:
             safe_name = self._safe_name(name)
             if not safe_name:
                 safe_name = f"preset_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-            
-            file_path = self.presets_dir / f"{safe_name}.json"
-            with open(file_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.store.save(GLOBAL_SCOPE, safe_name, data)
             return True
         except Exception as e:
             print(f"保存预设失败: {e}")
@@ -66,10 +113,7 @@ class PresetManager:
     def load_preset(self, name: str) -> dict | None:
         """加载预设"""
         try:
-            file_path = self.presets_dir / f"{name}.json"
-            if file_path.exists():
-                with open(file_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
+            return self.store.load(GLOBAL_SCOPE, name)
         except Exception as e:
             print(f"加载预设失败: {e}")
         return None
@@ -77,10 +121,7 @@ class PresetManager:
     def delete_preset(self, name: str) -> bool:
         """删除预设"""
         try:
-            file_path = self.presets_dir / f"{name}.json"
-            if file_path.exists():
-                file_path.unlink()
-                return True
+            return self.store.delete(GLOBAL_SCOPE, name)
         except Exception as e:
             print(f"删除预设失败: {e}")
         return False
@@ -88,45 +129,24 @@ class PresetManager:
     def rename_preset(self, old_name: str, new_name: str) -> bool:
         """重命名预设"""
         try:
-            old_path = self.presets_dir / f"{old_name}.json"
-            new_path = self.presets_dir / f"{new_name}.json"
-            if old_path.exists() and not new_path.exists():
-                old_path.rename(new_path)
-                return True
+            return self.store.rename(GLOBAL_SCOPE, old_name, new_name)
         except Exception as e:
             print(f"重命名预设失败: {e}")
         return False
 
     def get_category_presets(self, scope: str) -> list[dict]:
         """获取指定分类的预设列表。"""
-        category_dir = self._get_category_dir(scope)
-        if category_dir is None or not category_dir.exists():
+        if not self._valid_scope(scope):
             return []
-
-        presets = []
-        for file in category_dir.glob("*.json"):
-            try:
-                stat = file.stat()
-                presets.append({
-                    "name": file.stem,
-                    "path": str(file),
-                    "modified_time": datetime.fromtimestamp(stat.st_mtime),
-                })
-            except Exception:
-                continue
-        presets.sort(key=lambda item: item["modified_time"], reverse=True)
-        return presets
+        return [self._listing(scope, entry) for entry in self.store.entries(scope)]
 
     def save_category_preset(self, scope: str, name: str, data: dict) -> bool:
         """保存仅包含一个分类字段的预设。"""
         try:
-            category_dir = self._get_category_dir(scope)
             safe_name = self._safe_name(name)
-            if category_dir is None or not safe_name or not isinstance(data, dict):
+            if not self._valid_scope(scope) or not safe_name or not isinstance(data, dict):
                 return False
-            category_dir.mkdir(parents=True, exist_ok=True)
-            with open(category_dir / f"{safe_name}.json", "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            self.store.save(scope, safe_name, data)
             return True
         except Exception as e:
             print(f"保存分类预设失败: {e}")
@@ -135,15 +155,11 @@ class PresetManager:
     def load_category_preset(self, scope: str, name: str) -> dict | None:
         """加载指定分类预设。"""
         try:
-            category_dir = self._get_category_dir(scope)
             safe_name = self._safe_name(name)
-            if category_dir is None or not safe_name or safe_name != name:
+            if not self._valid_scope(scope) or not safe_name or safe_name != name:
                 return None
-            file_path = category_dir / f"{safe_name}.json"
-            if file_path.exists():
-                with open(file_path, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-                return data if isinstance(data, dict) else None
+            data = self.store.load(scope, safe_name)
+            return data if isinstance(data, dict) else None
         except Exception as e:
             print(f"加载分类预设失败: {e}")
         return None
@@ -151,14 +167,10 @@ class PresetManager:
     def delete_category_preset(self, scope: str, name: str) -> bool:
         """删除指定分类预设。"""
         try:
-            category_dir = self._get_category_dir(scope)
             safe_name = self._safe_name(name)
-            if category_dir is None or not safe_name or safe_name != name:
+            if not self._valid_scope(scope) or not safe_name or safe_name != name:
                 return False
-            file_path = category_dir / f"{safe_name}.json"
-            if file_path.exists():
-                file_path.unlink()
-                return True
+            return self.store.delete(scope, safe_name)
         except Exception as e:
             print(f"删除分类预设失败: {e}")
         return False
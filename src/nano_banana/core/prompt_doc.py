@@ -1,4 +1,4 @@
-"""结构化提示词文档：flatten / nest / subset / merge。"""
+"""结构化提示词文档：flatten / nest / subset / merge / patch。"""
 from __future__ import annotations
 
 from typing import Any
@@ -114,6 +114,33 @@ def subset(
     return result
 
 
+def subset_categories(
+    data: dict[str, Any] | None,
+    category_ids: list[str] | tuple[str, ...],
+    schema: PromptSchema | None = None,
+) -> dict[str, Any]:
+    """多个分类切片合在一起（subset 的并集）。"""
+    schema = schema or get_schema()
+    result: dict[str, Any] = {}
+    for category_id in category_ids:
+        _merge(result, subset(data, category_id, schema))
+    return result
+
+
+def detect_categories(instruction: str, schema: PromptSchema | None = None) -> list[str]:
+    """按修改要求里出现的分类名、字段名与分类关键词，猜出涉及的分类（按 schema 顺序）。"""
+    schema = schema or get_schema()
+    text = (instruction or "").lower()
+    detected = []
+    for category in schema.categories:
+        words = {category.label, *category.keywords}
+        for field in category.fields:
+            words.update((field.label, field.widget_key, field.id))
+        if any(word and word.lower() in text for word in words):
+            detected.append(category.id)
+    return detected
+
+
 def apply_partial(dst: dict[str, Any] | None, src: dict[str, Any] | None) -> dict[str, Any]:
     """把 src 中出现的键深合并进 dst，未出现的键保持不动。"""
     result = {} if dst is None else _deepcopy_json(dst)
@@ -121,6 +148,63 @@ def apply_partial(dst: dict[str, Any] | None, src: dict[str, Any] | None) -> dic
     return result
 
 
+def validate_patch(
+    patch: dict[str, Any],
+    schema: PromptSchema | None = None,
+    *,
+    current: dict[str, Any] | None = None,
+) -> dict[str, Any]:
+    """校验模型返回的局部文档（只含改动的字段），返回规整后的副本，不合法时抛 ValueError。
+
+    叶子必须落在 schema 字段 / overlay 路径上，或是 current 里已有的同类叶子；
+    string_list 字段接受数组或逗号分隔的字符串，null 表示清空。
+    """
+    schema = schema or get_schema()
+    leaves: dict[tuple[str, ...], PromptField | None] = {
+        field.path: field for field in schema.iter_fields()
+    }
+    leaves.update((overlay.path, None) for overlay in schema.overlays if overlay.path not in leaves)
+    branches = {path[:depth] for path in leaves for depth in range(1, len(path))}
+    result: dict[str, Any] = {}
+    _validate_patch_node(patch, (), leaves, branches, current or {}, result)
+    return result
+
+
+def patch_from_operations(operations: list[Any]) -> dict[str, Any]:
+    """RFC 6902 的 add / replace / remove 操作 → 局部文档（remove 记为 null，即清空）。"""
+    patch: dict[str, Any] = {}
+    for operation in operations:
+        if not isinstance(operation, dict) or operation.get("op") not in ("add", "replace", "remove"):
+            raise ValueError(f"不支持的修改操作: {operation!r}")
+        pointer = operation.get("path")
+        if not isinstance(pointer, str) or not pointer.startswith("/"):
+            raise ValueError(f"无效的 JSON Pointer: {pointer!r}")
+        path = [part.replace("~1", "/").replace("~0", "~") for part in pointer[1:].split("/")]
+        value = None if operation["op"] == "remove" else operation.get("value")
+        set_at_path(patch, path, value)
+    return patch
+
+
+def merge_patch(
+    current: dict[str, Any] | None,
+    patch: Any,
+    schema: PromptSchema | None = None,
+    *,
+    categories: list[str] | tuple[str, ...] | None = None,
+) -> dict[str, Any]:
+    """把局部文档（或 RFC 6902 操作列表）校验后合并进 current，返回新文档。
+
+    给出 categories 时只取这些分类的字段，其余分类的内容原样保留。
+    """
+    if isinstance(patch, list):
+        patch = patch_from_operations(patch)
+    if not isinstance(patch, dict):
+        raise ValueError("修改结果应为 JSON 对象")
+    if categories:
+        patch = subset_categories(patch, categories, schema)
+    return apply_partial(current, validate_patch(patch, schema, current=current))
+
+
 def order_document(
     data: dict[str, Any] | None,
     schema: PromptSchema | None = None,
@@ -137,6 +221,70 @@ def order_document(
     return ordered
 
 
+def document_json_schema(schema: PromptSchema | None = None) -> dict[str, Any]:
+    """由 schema 字段路径生成整份文档的 JSON Schema（response_format 的 strict 约束）。
+
+    嵌套顺序同 order_document；strict 模式要求每层都列全 required 且禁止额外键。
+    """
+    schema = schema or get_schema()
+    shape: dict[str, Any] = {}
+    for field in schema.iter_fields():
+        set_at_path(shape, field.path, field)
+    return _json_schema_node(order_document(shape, schema))
+
+
+def _json_schema_node(node: Any) -> dict[str, Any]:
+    if isinstance(node, PromptField):
+        if node.type == "string_list":
+            return {"type": "array", "items": {"type": "string"}}
+        return {"type": "string"}
+    return {
+        "type": "object",
+        "properties": {key: _json_schema_node(child) for key, child in node.items()},
+        "required": list(node),
+        "additionalProperties": False,
+    }
+
+
+def _validate_patch_node(
+    node: dict[str, Any],
+    prefix: tuple[str, ...],
+    leaves: dict[tuple[str, ...], PromptField | None],
+    branches: set[tuple[str, ...]],
+    current: Any,
+    result: dict[str, Any],
+) -> None:
+    for key, value in node.items():
+        path = prefix + (key,)
+        existing = current.get(key, _MISSING) if isinstance(current, dict) else _MISSING
+        name = ".".join(path)
+        if path in leaves:
+            result[key] = _patch_leaf_value(leaves[path], value, name)
+        elif isinstance(value, dict) and (path in branches or isinstance(existing, dict)):
+            child: dict[str, Any] = {}
+            _validate_patch_node(value, path, leaves, branches, existing, child)
+            if child:
+                result[key] = child
+        elif existing is not _MISSING and not isinstance(existing, dict) and not isinstance(value, dict):
+            result[key] = "" if value is None else _deepcopy_json(value)
+        else:
+            raise ValueError(f"未知字段: {name}")
+
+
+def _patch_leaf_value(field: PromptField | None, value: Any, name: str) -> Any:
+    if value is None:
+        return [] if field is not None and field.type == "string_list" else ""
+    if field is not None and field.type == "string_list":
+        if isinstance(value, list) and all(isinstance(item, str) for item in value):
+            return encode_field_value(field, value)
+        if isinstance(value, str):
+            return encode_field_value(field, value)
+        raise ValueError(f"字段 {name} 应为字符串数组")
+    if not isinstance(value, str):
+        raise ValueError(f"字段 {name} 应为字符串")
+    return value
+
+
 def _merge(dst: dict[str, Any], src: dict[str, Any]) -> None:
     for key, value in src.items():
         if isinstance(value, dict) and isinstance(dst.get(key), dict):
@@ -36,6 +36,8 @@ class PromptCategory:
     color_class: str = ""
     two_column: bool = False
     fields: tuple[PromptField, ...] = field(default_factory=tuple)
+    # 修改要求里出现这些词（或字段名）时，按分类修改会带上这个分类
+    keywords: tuple[str, ...] = ()
 
 
 @dataclass(frozen=True)
@@ -173,6 +175,7 @@ def _parse_category(raw: dict[str, Any]) -> PromptCategory:
         color_class=raw.get("color_class") or raw["id"],
         two_column=bool(raw.get("two_column")),
         fields=tuple(_parse_field(item) for item in raw.get("fields") or []),
+        keywords=tuple(str(item) for item in raw.get("keywords") or []),
     )
 
 
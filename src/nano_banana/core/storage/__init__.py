@@ -0,0 +1,61 @@
+"""预设与选项的存储后端。
+
+files（默认）：presets/ 下每个预设一个 JSON 文件，选项写 config/options.yaml；
+sqlite：全部放进一个 WAL 模式的 SQLite 数据库。
+NANO_BANANA_STORAGE=sqlite 切换后端，NANO_BANANA_STORAGE_PATH 指定数据库位置。
+两种后端之间用 `nano-banana-storage` 命令迁移。
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Optional
+
+from nano_banana.core.resource_path import get_presets_dir, get_resource_path
+from nano_banana.core.storage.base import OptionsStore, PresetStore
+from nano_banana.core.storage.files import FilePresetStore, YamlOptionsStore
+
+STORAGE_BACKENDS = ("files", "sqlite")
+DEFAULT_DATABASE = "data/nano_banana.sqlite3"
+
+__all__ = [
+    "FilePresetStore",
+    "OptionsStore",
+    "PresetStore",
+    "STORAGE_BACKENDS",
+    "YamlOptionsStore",
+    "create_options_store",
+    "create_preset_store",
+    "get_database_path",
+    "storage_backend",
+]
+
+
+def storage_backend() -> str:
+    backend = os.environ.get("NANO_BANANA_STORAGE", "").strip().lower() or "files"
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(f"未知存储后端: {backend}（可选 {', '.join(STORAGE_BACKENDS)}）")
+    return backend
+
+
+def get_database_path() -> Path:
+    configured = os.environ.get("NANO_BANANA_STORAGE_PATH", "").strip()
+    return Path(configured) if configured else get_resource_path(DEFAULT_DATABASE)
+
+
+def create_preset_store(presets_dir: Optional[Path] = None) -> PresetStore:
+    """显式给出目录时总是文件后端；否则按 NANO_BANANA_STORAGE 选择。"""
+    if presets_dir is None and storage_backend() == "sqlite":
+        from nano_banana.core.storage.sqlite import SqlitePresetStore
+
+        return SqlitePresetStore(get_database_path())
+    return FilePresetStore(presets_dir or get_presets_dir())
+
+
+def create_options_store() -> Optional[OptionsStore]:
+    """sqlite 后端返回数据库存储；文件后端返回 None，由 YamlHandler 按 config_path 读写。"""
+    if storage_backend() == "sqlite":
+        from nano_banana.core.storage.sqlite import SqliteOptionsStore
+
+        return SqliteOptionsStore(get_database_path())
+    return None
@@ -0,0 +1,54 @@
+"""存储后端接口。scope 为空字符串表示全局预设，其余为分类预设的分类名。"""
+from __future__ import annotations
+
+from typing import Any, ContextManager, Optional, Protocol
+
+from nano_banana.core.preset_index import IndexListener
+
+
+class PresetStore(Protocol):
+    """预设存储。列表类接口返回 PresetIndex 同构的行：name / mtime_ns / size / hash / fields [/ data]。"""
+
+    def entries(
+        self,
+        scope: str,
+        *,
+        with_data: bool = False,
+        after: Optional[tuple[int, str]] = None,
+        limit: Optional[int] = None,
+    ) -> list[dict[str, Any]]: ...
+
+    def get_entry(self, scope: str, name: str) -> Optional[dict[str, Any]]: ...
+
+    def load(self, scope: str, name: str) -> Any: ...
+
+    def save(self, scope: str, name: str, data: Any, *, mtime_ns: Optional[int] = None) -> None: ...
+
+    def delete(self, scope: str, name: str) -> bool: ...
+
+    def rename(self, scope: str, old_name: str, new_name: str) -> bool: ...
+
+    def state_token(self, scope: str) -> str: ...
+
+    def subscribe(self, listener: IndexListener) -> None: ...
+
+    def location(self, scope: str, name: str) -> str: ...
+
+    def scopes(self) -> list[str]: ...
+
+
+class OptionsStore(Protocol):
+    """选项（options.yaml 的内容）存储。signature 变化即表示需要重新加载。
+
+    lock() 是跨进程的排他锁，读-改-写必须在锁内完成，否则并发的 worker 会互相覆盖。
+    """
+
+    location: str
+
+    def lock(self) -> ContextManager[None]: ...
+
+    def signature(self) -> Optional[tuple]: ...
+
+    def load(self) -> Any: ...
+
+    def save(self, options: dict) -> None: ...
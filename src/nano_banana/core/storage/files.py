@@ -0,0 +1,135 @@
+"""文件后端：presets/*.json、presets/categories/<scope>/*.json 与 options.yaml。"""
+from __future__ import annotations
+
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+from nano_banana.core.file_lock import file_lock
+from nano_banana.core.preset_index import (
+    GLOBAL_SCOPE,
+    INDEX_DIRNAME,
+    INDEX_FILENAME,
+    IndexListener,
+    PresetIndex,
+)
+from nano_banana.core.yaml_io import file_signature, read_yaml, write_yaml_atomic
+
+
+class FilePresetStore:
+    """每个预设一个 JSON 文件；列表查询走 PresetIndex 元数据索引。
+
+    文件先写临时文件再 rename，其他进程不会读到写了一半的 JSON；
+    索引库由所有进程共享，一方写入后另一方的检索索引按 generation 重新同步。
+    """
+
+    def __init__(self, presets_dir: Path | str):
+        self.presets_dir = Path(presets_dir)
+        self._index: Optional[PresetIndex] = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def index(self) -> PresetIndex:
+        with self._index_lock:
+            if self._index is None:
+                self._index = PresetIndex(self.presets_dir / INDEX_DIRNAME / INDEX_FILENAME)
+            return self._index
+
+    def directory(self, scope: str) -> Path:
+        return self.presets_dir if scope == GLOBAL_SCOPE else self.presets_dir / "categories" / scope
+
+    def _path(self, scope: str, name: str) -> Path:
+        return self.directory(scope) / f"{name}.json"
+
+    def refresh(self, scope: str, *, force: bool = False) -> None:
+        self.index.refresh(scope, self.directory(scope), force=force)
+
+    def entries(self, scope: str, **kwargs) -> list[dict[str, Any]]:
+        self.refresh(scope)
+        return self.index.entries(scope, **kwargs)
+
+    def get_entry(self, scope: str, name: str) -> Optional[dict[str, Any]]:
+        self.refresh(scope)
+        return self.index.get(scope, name)
+
+    def load(self, scope: str, name: str) -> Any:
+        path = self._path(scope, name)
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, scope: str, name: str, data: Any, *, mtime_ns: Optional[int] = None) -> None:
+        path = self._path(scope, name)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            if mtime_ns is not None:
+                os.utime(tmp_path, ns=(mtime_ns, mtime_ns))
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.index.index_file(scope, path)
+
+    def delete(self, scope: str, name: str) -> bool:
+        path = self._path(scope, name)
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            return False
+        self.index.remove(scope, name)
+        return True
+
+    def rename(self, scope: str, old_name: str, new_name: str) -> bool:
+        old_path = self._path(scope, old_name)
+        new_path = self._path(scope, new_name)
+        # 先检查再改名，需要与其他进程的重命名互斥，避免覆盖对方刚建好的同名预设
+        with file_lock(self.presets_dir / INDEX_DIRNAME / "rename"):
+            if not old_path.exists() or new_path.exists():
+                return False
+            old_path.rename(new_path)
+        self.index.remove(scope, old_name)
+        self.index.index_file(scope, new_path)
+        return True
+
+    def state_token(self, scope: str) -> str:
+        self.refresh(scope)
+        return self.index.state_token(scope)
+
+    def subscribe(self, listener: IndexListener) -> None:
+        self.index.subscribe(listener)
+
+    def location(self, scope: str, name: str) -> str:
+        return str(self._path(scope, name))
+
+    def scopes(self) -> list[str]:
+        categories = self.presets_dir / "categories"
+        names = sorted(p.name for p in categories.iterdir() if p.is_dir()) if categories.is_dir() else []
+        return [GLOBAL_SCOPE, *names]
+
+
+class YamlOptionsStore:
+    """options.yaml 单文件，写入走临时文件 + rename。"""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.location = str(self.path)
+
+    def lock(self):
+        return file_lock(self.path)
+
+    def signature(self) -> Optional[tuple]:
+        return file_signature(self.path)
+
+    def load(self) -> Any:
+        return read_yaml(self.path) if self.path.exists() else None
+
+    def save(self, options: dict) -> None:
+        write_yaml_atomic(self.path, options)
@@ -0,0 +1,74 @@
+"""在文件后端与 SQLite 后端之间迁移预设、分类预设和选项。
+
+    nano-banana-storage to-sqlite [--presets-dir DIR] [--options FILE] [--db FILE]
+    nano-banana-storage to-files  [--presets-dir DIR] [--options FILE] [--db FILE]
+
+迁移保留每个预设的修改时间（列表顺序不变），目标中同名预设会被覆盖。
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Optional
+
+from nano_banana.core.resource_path import get_config_path, get_presets_dir
+from nano_banana.core.storage import get_database_path
+from nano_banana.core.storage.base import OptionsStore, PresetStore
+from nano_banana.core.storage.files import FilePresetStore, YamlOptionsStore
+
+
+def migrate_presets(source: PresetStore, target: PresetStore) -> dict[str, int]:
+    """把 source 中的全部预设复制到 target，返回 {scope: 数量}。"""
+    counts: dict[str, int] = {}
+    for scope in source.scopes():
+        entries = source.entries(scope, with_data=True)
+        for entry in entries:
+            target.save(scope, entry["name"], entry["data"], mtime_ns=entry["mtime_ns"])
+        if entries:
+            counts[scope] = len(entries)
+    return counts
+
+
+def migrate_options(source: OptionsStore, target: OptionsStore) -> int:
+    """复制选项，返回字段数；source 中没有选项时不改动 target。"""
+    if source.signature() is None:
+        return 0
+    options = source.load()
+    if not isinstance(options, dict):
+        return 0
+    target.save(options)
+    return len(options)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="nano-banana-storage",
+        description="在文件与 SQLite 存储后端之间迁移预设和选项",
+    )
+    parser.add_argument("direction", choices=("to-sqlite", "to-files"))
+    parser.add_argument("--presets-dir", type=Path, default=None, help="预设目录，默认 presets/")
+    parser.add_argument("--options", type=Path, default=None, help="options.yaml 路径")
+    parser.add_argument("--db", type=Path, default=None, help="SQLite 数据库路径")
+    args = parser.parse_args(argv)
+
+    from nano_banana.core.storage.sqlite import SqliteOptionsStore, SqlitePresetStore
+
+    presets_dir = args.presets_dir or get_presets_dir()
+    db_path = args.db or get_database_path()
+    files = (FilePresetStore(presets_dir), YamlOptionsStore(args.options or get_config_path()))
+    sqlite = (SqlitePresetStore(db_path), SqliteOptionsStore(db_path))
+    (source_presets, source_options), (target_presets, target_options) = (
+        (files, sqlite) if args.direction == "to-sqlite" else (sqlite, files)
+    )
+
+    counts = migrate_presets(source_presets, target_presets)
+    option_count = migrate_options(source_options, target_options)
+    for scope, count in counts.items():
+        print(f"{scope or '全局预设'}: {count} 个")
+    print(f"选项字段: {option_count} 个")
+    print(f"完成：{presets_dir} {'→' if args.direction == 'to-sqlite' else '←'} {db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
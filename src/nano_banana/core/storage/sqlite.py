@@ -0,0 +1,156 @@
+"""SQLite 后端：预设、分类预设与选项放在同一个 WAL 模式数据库里。
+
+预设表与文件后端的元数据索引同构（PresetIndex），这里它就是数据本身；
+选项按字段存一行，整份保存在一个事务里完成。多个进程可以同时打开同一个库。
+SqliteJobStore 另用一个库记录生图任务状态，让多 worker 部署下任一进程都能查到任务。
+"""
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from nano_banana.core.file_lock import file_lock
+from nano_banana.core.preset_index import GLOBAL_SCOPE, IndexListener, PresetIndex
+
+_OPTIONS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS options (
+    key TEXT PRIMARY KEY,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS options_meta (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+_JOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    finished_at REAL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_finished_at ON jobs (finished_at);
+"""
+
+
+def connect(path: Path | str) -> sqlite3.Connection:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+class SqlitePresetStore:
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.table = PresetIndex(self.path, disposable=False, wal=True)
+
+    def entries(self, scope: str, **kwargs) -> list[dict[str, Any]]:
+        return self.table.entries(scope, **kwargs)
+
+    def get_entry(self, scope: str, name: str) -> Optional[dict[str, Any]]:
+        return self.table.get(scope, name)
+
+    def load(self, scope: str, name: str) -> Any:
+        entry = self.table.get(scope, name)
+        return entry["data"] if entry else None
+
+    def save(self, scope: str, name: str, data: Any, *, mtime_ns: Optional[int] = None) -> None:
+        self.table.upsert(scope, name, data, mtime_ns=mtime_ns or time.time_ns())
+
+    def delete(self, scope: str, name: str) -> bool:
+        return self.table.remove(scope, name)
+
+    def rename(self, scope: str, old_name: str, new_name: str) -> bool:
+        return self.table.rename(scope, old_name, new_name)
+
+    def state_token(self, scope: str) -> str:
+        return self.table.state_token(scope)
+
+    def subscribe(self, listener: IndexListener) -> None:
+        self.table.subscribe(listener)
+
+    def location(self, scope: str, name: str) -> str:
+        return f"{self.path}#{scope}/{name}" if scope else f"{self.path}#{name}"
+
+    def scopes(self) -> list[str]:
+        scopes = self.table.scopes()
+        return scopes if GLOBAL_SCOPE in scopes else [GLOBAL_SCOPE, *scopes]
+
+
+class SqliteOptionsStore:
+    """每个选项字段一行（保留原顺序）；version 每次保存加一，供缓存判断是否过期。"""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self.location = f"{self.path}#options"
+        self._lock = threading.Lock()
+        self._conn = connect(self.path)
+        self._conn.executescript(_OPTIONS_SCHEMA)
+        self._conn.commit()
+
+    def lock(self):
+        return file_lock(self.path.with_name(f"{self.path.name}-options"))
+
+    def signature(self) -> Optional[tuple]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM options_meta WHERE key = 'version'"
+            ).fetchone()
+        return (self.location, row[0]) if row else None
+
+    def load(self) -> Any:
+        with self._lock:
+            rows = self._conn.execute("SELECT key, value FROM options ORDER BY position").fetchall()
+        return {key: json.loads(value) for key, value in rows}
+
+    def save(self, options: dict) -> None:
+        rows = [
+            (key, position, json.dumps(value, ensure_ascii=False))
+            for position, (key, value) in enumerate(options.items())
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM options")
+            self._conn.executemany(
+                "INSERT INTO options (key, position, value) VALUES (?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT INTO options_meta (key, value) VALUES ('version', 1)"
+                " ON CONFLICT(key) DO UPDATE SET value = value + 1"
+            )
+
+
+class SqliteJobStore:
+    """任务快照（Job.to_dict + events + version）按 id 存一行，供其它 worker 进程读取。"""
+
+    def __init__(self, path: Path | str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = connect(self.path)
+        self._conn.executescript(_JOBS_SCHEMA)
+        self._conn.commit()
+
+    def save(self, record: dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, finished_at, data) VALUES (?, ?, ?)"
+                " ON CONFLICT(id) DO UPDATE SET finished_at = excluded.finished_at,"
+                " data = excluded.data",
+                (record["id"], record.get("finished_at"), json.dumps(record, ensure_ascii=False)),
+            )
+
+    def load(self, job_id: str) -> Optional[dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def prune(self, finished_before: float) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM jobs WHERE finished_at < ?", (finished_before,))
@@ -1,8 +1,21 @@
-"""YAML配置文件处理工具"""
-import os
-import yaml
-from pathlib import Path
+"""YAML配置文件处理工具
+
+options.yaml 只在文件变化（mtime/size）后重新解析一次，之后各字段直接从内存读取；
+增删改只改内存，稍后由后台定时器合并写盘（临时文件 + rename），batch() 内的修改
+在退出时一次写入，进程退出前也会补写。NANO_BANANA_STORAGE=sqlite 时改存 SQLite。
+
+写盘在跨进程锁内进行：若期间其他进程改过文件，先重新加载，再把本进程积累的
+增删改逐条重放上去，多个 worker 的修改都会保留。
+"""
+import atexit
+import threading
+import weakref
+from contextlib import contextmanager
+from copy import deepcopy
+from typing import Optional
+
 from nano_banana.core.resource_path import get_config_path
+from nano_banana.core.storage import OptionsStore, YamlOptionsStore, create_options_store
 
 
 class YamlHandler:
@@ -11,81 +24,245 @@ class YamlHandler:
     DEFAULT_FIELD_OPTIONS = {
         "反向提示词标签": ["水印、签名、文字"],
     }
+    # 修改后延迟多久写盘（秒），期间的修改合并成一次写入
+    FLUSH_DELAY = 0.5
 
-    def __init__(self):
+    def __init__(self, store: Optional[OptionsStore] = None):
         self.config_path = get_config_path()
+        self.store = store if store is not None else create_options_store()
+        self._lock = threading.RLock()
+        self._options: Optional[dict] = None
+        self._index: dict[str, set] = {}
+        self._signature: Optional[tuple] = None
+        self._loaded_store: Optional[OptionsStore] = None
+        self._dirty = False
+        # 尚未写盘的修改记录，写盘时若文件已被其他进程改过就在最新内容上重放
+        self._ops: list[tuple] = []
+        self._batch_depth = 0
+        self._timer: Optional[threading.Timer] = None
+        _live_handlers.add(self)
         self._ensure_config_exists()
 
     def _ensure_config_exists(self):
         """确保配置文件存在"""
-        if not self.config_path.exists():
-            self.config_path.parent.mkdir(parents=True, exist_ok=True)
-            self.save_options({})
+        backend = self._backend()
+        if backend.signature() is not None:
+            return
+        try:
+            with backend.lock():
+                if backend.signature() is None:
+                    backend.save({})
+        except Exception as e:
+            print(f"保存配置文件失败: {e}")
 
-    def load_options(self) -> dict:
-        """加载所有选项配置"""
+    def _backend(self) -> OptionsStore:
+        """文件模式下每次按当前 config_path 取存储，外部改 config_path 也能跟上。"""
+        if self.store is not None:
+            return self.store
+        return YamlOptionsStore(self.config_path)
+
+    def _is_loaded_from(self, backend: OptionsStore) -> bool:
+        return self._loaded_store is not None and self._loaded_store.location == backend.location
+
+    def _store_locked(self) -> dict:
+        """返回内存中的选项（内部引用）。路径变化或文件被外部修改时重新加载。"""
+        backend = self._backend()
+        if self._dirty:
+            if self._is_loaded_from(backend):
+                return self._options
+            self.flush()
+        signature = backend.signature()
+        if (
+            self._options is not None
+            and self._is_loaded_from(backend)
+            and signature == self._signature
+        ):
+            return self._options
         try:
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
-                return data if data else {}
+            data = backend.load() if signature else None
         except Exception as e:
             print(f"加载配置文件失败: {e}")
-            return {}
+            data = None
+        self._set_store_locked(backend, data if isinstance(data, dict) else {})
+        self._signature = signature
+        self._dirty = False
+        self._ops = []
+        return self._options
+
+    def _set_store_locked(self, backend: OptionsStore, options: dict) -> None:
+        self._options = options
+        self._loaded_store = backend
+        self._index = {
+            field: set(values)
+            for field, values in options.items()
+            if isinstance(values, list) and all(isinstance(v, str) for v in values)
+        }
+
+    def _field_locked(self, field_name: str) -> list:
+        """取出可修改的字段列表；旧配置里没有的字段先以默认值补齐。"""
+        options = self._store_locked()
+        if field_name not in options:
+            options[field_name] = list(self.DEFAULT_FIELD_OPTIONS.get(field_name, []))
+            self._index[field_name] = set(options[field_name])
+        return options[field_name]
+
+    def _apply_locked(self, op: tuple) -> bool:
+        """在内存选项上执行一条修改，返回是否有变化。"""
+        kind, field_name, *args = op
+        if kind == "set":
+            options = self._store_locked()
+            if options.get(field_name) == args[0]:
+                return False
+            options[field_name] = args[0]
+            return True
+        if kind == "add":
+            (value,) = args
+            values = self._field_locked(field_name)
+            index = self._index.get(field_name)
+            exists = value in index if index is not None else value in values
+            if not value or exists:
+                return False
+            values.append(value)
+            if index is not None:
+                index.add(value)
+            return True
+        if kind == "remove":
+            (value,) = args
+            values = self._field_locked(field_name)
+            if value not in values:
+                return False
+            values.remove(value)
+            if value not in values:
+                self._index.get(field_name, set()).discard(value)
+            return True
+        old_value, new_value = args
+        values = self._store_locked().get(field_name)
+        if not isinstance(values, list) or old_value not in values:
+            return False
+        values[values.index(old_value)] = new_value
+        index = self._index.get(field_name)
+        if index is not None:
+            if old_value not in values:
+                index.discard(old_value)
+            index.add(new_value)
+        return True
+
+    def _record_locked(self, op: tuple) -> None:
+        if self._apply_locked(op):
+            self._ops.append(op)
+            self._mark_dirty_locked()
+
+    def _mark_dirty_locked(self) -> None:
+        self._dirty = True
+        if self._batch_depth:
+            return
+        if self._timer is None:
+            self._timer = threading.Timer(self.FLUSH_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> bool:
+        """把内存中未写盘的修改立即写入文件。"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return True
+            backend = self._loaded_store
+            try:
+                with backend.lock():
+                    signature = backend.signature()
+                    if signature != self._signature:
+                        # 其他进程在此期间写过：以最新内容为底，重放本进程的修改
+                        data = backend.load() if signature else None
+                        ops = self._ops
+                        self._set_store_locked(backend, data if isinstance(data, dict) else {})
+                        for op in ops:
+                            self._apply_locked(op)
+                    backend.save(self._options)
+                    self._signature = backend.signature()
+            except Exception as e:
+                print(f"保存配置文件失败: {e}")
+                return False
+            self._dirty = False
+            self._ops = []
+            return True
+
+    @contextmanager
+    def batch(self):
+        """批量修改：块内的增删改只改内存，退出时一次写盘。"""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                yield self
+            finally:
+                self._batch_depth -= 1
+                if not self._batch_depth:
+                    self.flush()
+
+    def load_options(self) -> dict:
+        """加载所有选项配置"""
+        with self._lock:
+            return deepcopy(self._store_locked())
 
     def save_options(self, options: dict):
         """保存所有选项配置"""
-        try:
-            with open(self.config_path, "w", encoding="utf-8") as f:
-                yaml.dump(
-                    options,
-                    f,
-                    allow_unicode=True,
-                    default_flow_style=False,
-                    sort_keys=False,
-                )
-        except Exception as e:
-            print(f"保存配置文件失败: {e}")
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            options = deepcopy(options)
+            backend = self._backend()
+            try:
+                with backend.lock():
+                    backend.save(options)
+                    self._signature = backend.signature()
+            except Exception as e:
+                print(f"保存配置文件失败: {e}")
+                return
+            self._set_store_locked(backend, options)
+            self._dirty = False
+            self._ops = []
 
     def get_field_options(self, field_name: str) -> list:
         """获取指定字段的选项列表"""
-        options = self.load_options()
-        if field_name in options:
-            return options[field_name]
+        with self._lock:
+            options = self._store_locked()
+            if field_name in options:
+                return list(options[field_name] or [])
         return list(self.DEFAULT_FIELD_OPTIONS.get(field_name, []))
 
     def add_option(self, field_name: str, value: str):
         """为指定字段添加一个选项"""
-        options = self.load_options()
-        if field_name not in options:
-            options[field_name] = list(self.DEFAULT_FIELD_OPTIONS.get(field_name, []))
-        if value and value not in options[field_name]:
-            options[field_name].append(value)
-            self.save_options(options)
+        with self._lock:
+            self._record_locked(("add", field_name, value))
 
     def remove_option(self, field_name: str, value: str):
         """从指定字段删除一个选项"""
-        options = self.load_options()
-        if field_name not in options:
-            options[field_name] = list(self.DEFAULT_FIELD_OPTIONS.get(field_name, []))
-        if value in options[field_name]:
-            options[field_name].remove(value)
-            self.save_options(options)
+        with self._lock:
+            self._record_locked(("remove", field_name, value))
 
     def update_option(self, field_name: str, old_value: str, new_value: str):
         """更新指定字段的某个选项"""
-        options = self.load_options()
-        if field_name in options and old_value in options[field_name]:
-            idx = options[field_name].index(old_value)
-            options[field_name][idx] = new_value
-            self.save_options(options)
+        with self._lock:
+            self._record_locked(("update", field_name, old_value, new_value))
 
     def get_line_art_prompt(self) -> str:
         """获取角色线稿生成的提示词"""
-        options = self.load_options()
-        return options.get("角色线稿提示词", "")
+        with self._lock:
+            return self._store_locked().get("角色线稿提示词", "")
 
     def save_line_art_prompt(self, prompt: str):
         """保存角色线稿生成的提示词"""
-        options = self.load_options()
-        options["角色线稿提示词"] = prompt
-        self.save_options(options)
+        with self._lock:
+            self._record_locked(("set", "角色线稿提示词", prompt))
+
+
+_live_handlers: "weakref.WeakSet[YamlHandler]" = weakref.WeakSet()
+
+
+@atexit.register
+def _flush_all_handlers() -> None:
+    for handler in list(_live_handlers):
+        handler.flush()
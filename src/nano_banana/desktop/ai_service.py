@@ -1,14 +1,22 @@
 """桌面端 AI 提示词服务：QThread 只包 core.chat。"""
 from __future__ import annotations
 
+import json
 from typing import Callable, List, Optional
 
 from PyQt6.QtCore import QThread, pyqtSignal
 
 from nano_banana.core.chat import (
+    MODIFY_MODE_FULL,
+    MODIFY_MODE_PATCH,
     build_generate_messages,
     build_modify_messages,
+    coalesce_events,
+    generate_structured_output,
+    parse_modify_base,
+    resolve_modify_scope,
     stream_chat,
+    with_patch_result,
 )
 from nano_banana.core.config import AIConfigManager
 
@@ -19,6 +27,9 @@ class _ChatStreamThread(QThread):
     progress = pyqtSignal(str)
     stream_chunk = pyqtSignal(str)
     stream_done = pyqtSignal(str)
+    # 增量解析：schema 字段读完整（{"id", "path", "value"}）/ 输出不是合法 JSON
+    stream_field = pyqtSignal(dict)
+    stream_invalid = pyqtSignal(str)
 
     def __init__(self, config_manager: AIConfigManager):
         super().__init__()
@@ -31,6 +42,12 @@ class _ChatStreamThread(QThread):
     def _build_messages(self) -> list:
         raise NotImplementedError
 
+    def _wrap_events(self, events):
+        return events
+
+    def _structured_output(self):
+        return None
+
     def run(self):
         try:
             # 消息构建包含参考图读盘 + base64 编码，必须留在工作线程里，
@@ -45,20 +62,34 @@ class _ChatStreamThread(QThread):
                 return
             self.progress.emit("正在连接AI服务...")
             chat = self.config_manager.get_chat_config()
-            full_content = ""
+            parts: list[str] = []
+            result = None
             self.progress.emit("正在生成提示词...")
-            for event in stream_chat(
+            # 合并逐 token 的小块：跨线程信号与输出框的插入 / 滚动按时间窗批量进行
+            events = stream_chat(
                 messages,
                 base_url=chat["base_url"],
                 api_key=chat["api_key"],
                 model=chat["model"] or "gpt-4o-mini",
                 cancelled=lambda: self._cancelled,
-            ):
+                structured=self._structured_output(),
+            )
+            for event in coalesce_events(self._wrap_events(events)):
                 if event.type == "content":
-                    full_content += event.text
+                    parts.append(event.text)
                     self.stream_chunk.emit(event.text)
+                elif event.type == "field":
+                    self.stream_field.emit(event.data)
+                elif event.type == "invalid":
+                    self.stream_invalid.emit(event.text)
+                elif event.type == "result":
+                    result = event.data
                 elif event.type == "done":
-                    self.stream_done.emit(event.text or full_content)
+                    if result is not None:
+                        # 局部修改：交给界面的是合并后的完整文档
+                        self.stream_done.emit(json.dumps(result, ensure_ascii=False, indent=2))
+                    else:
+                        self.stream_done.emit(event.text or "".join(parts))
                     return
                 elif event.type == "error":
                     self.error.emit(event.text)
@@ -79,9 +110,16 @@ class AIGenerateThread(_ChatStreamThread):
         super().__init__(config_manager)
         self.user_prompt = user_prompt
         self.image_paths = image_paths or []
+        self._structured = None
 
     def _build_messages(self) -> list:
-        return build_generate_messages(self.user_prompt, self.image_paths)
+        self._structured = generate_structured_output()
+        return build_generate_messages(
+            self.user_prompt, self.image_paths, structured=self._structured is not None
+        )
+
+    def _structured_output(self):
+        return self._structured
 
 
 class AIModifyThread(_ChatStreamThread):
@@ -91,14 +129,34 @@ class AIModifyThread(_ChatStreamThread):
         modify_request: str,
         config_manager: AIConfigManager,
         image_paths: Optional[List[str]] = None,
+        mode: str = MODIFY_MODE_FULL,
+        categories=None,
     ):
         super().__init__(config_manager)
         self.current_data = current_data
         self.modify_request = modify_request
         self.image_paths = image_paths or []
+        self.mode = mode
+        self.categories = categories
+        self._scope: Optional[List[str]] = None
+        self._patch_base: Optional[dict] = None
 
     def _build_messages(self) -> list:
-        return build_modify_messages(self.current_data, self.modify_request, self.image_paths)
+        self._scope = resolve_modify_scope(self.categories, self.modify_request)
+        if self.mode == MODIFY_MODE_PATCH or self._scope:
+            self._patch_base = parse_modify_base(self.current_data)
+        return build_modify_messages(
+            self.current_data,
+            self.modify_request,
+            self.image_paths,
+            mode=self.mode,
+            categories=self._scope,
+        )
+
+    def _wrap_events(self, events):
+        if self._patch_base is None:
+            return events
+        return with_patch_result(events, self._patch_base, self._scope)
 
     def run(self):
         self.progress.emit("正在修改提示词...")
@@ -124,6 +182,8 @@ class AIService:
         on_stream_chunk: Callable[[str], None] = None,
         on_stream_done: Callable[[str], None] = None,
         image_paths: Optional[List[str]] = None,
+        on_stream_field: Callable[[dict], None] = None,
+        on_stream_invalid: Callable[[str], None] = None,
     ) -> AIGenerateThread:
         return self._start_thread(
             AIGenerateThread(user_prompt, self.config_manager, image_paths),
@@ -132,6 +192,8 @@ class AIService:
             on_progress,
             on_stream_chunk,
             on_stream_done,
+            on_stream_field,
+            on_stream_invalid,
         )
 
     def generate_modify_async(
@@ -144,14 +206,22 @@ class AIService:
         on_stream_chunk: Callable[[str], None] = None,
         on_stream_done: Callable[[str], None] = None,
         image_paths: Optional[List[str]] = None,
+        on_stream_field: Callable[[dict], None] = None,
+        on_stream_invalid: Callable[[str], None] = None,
+        mode: str = MODIFY_MODE_FULL,
+        categories=None,
     ) -> AIModifyThread:
         return self._start_thread(
-            AIModifyThread(current_data, modify_request, self.config_manager, image_paths),
+            AIModifyThread(
+                current_data, modify_request, self.config_manager, image_paths, mode, categories
+            ),
             on_finished,
             on_error,
             on_progress,
             on_stream_chunk,
             on_stream_done,
+            on_stream_field,
+            on_stream_invalid,
         )
 
     def cancel(self):
@@ -173,13 +243,25 @@ class AIService:
             thread.progress,
             thread.stream_chunk,
             thread.stream_done,
+            thread.stream_field,
+            thread.stream_invalid,
         ):
             try:
                 signal.disconnect()
             except TypeError:
                 pass  # 没有连接
 
-    def _start_thread(self, thread, on_finished, on_error, on_progress, on_stream_chunk, on_stream_done):
+    def _start_thread(
+        self,
+        thread,
+        on_finished,
+        on_error,
+        on_progress,
+        on_stream_chunk,
+        on_stream_done,
+        on_stream_field=None,
+        on_stream_invalid=None,
+    ):
         self.cancel()
         self._stale_threads = [t for t in self._stale_threads if t.isRunning()]
         thread.finished.connect(on_finished)
@@ -190,6 +272,10 @@ class AIService:
             thread.stream_chunk.connect(on_stream_chunk)
         if on_stream_done:
             thread.stream_done.connect(on_stream_done)
+        if on_stream_field:
+            thread.stream_field.connect(on_stream_field)
+        if on_stream_invalid:
+            thread.stream_invalid.connect(on_stream_invalid)
         self._current_thread = thread
         thread.start()
         return thread
@@ -21,8 +21,9 @@ from PyQt6.QtWidgets import (
     QListWidgetItem,
     QSizePolicy,
     QDialog,
+    QLineEdit,
 )
-from PyQt6.QtCore import Qt, pyqtSignal, QUrl
+from PyQt6.QtCore import Qt, pyqtSignal, QTimer, QUrl
 from PyQt6.QtGui import QFont, QAction, QKeySequence, QPixmap, QIcon, QCursor, QDesktopServices
 
 try:
@@ -267,6 +268,20 @@ class PromptGeneratorApp(ImageGenController, QMainWindow):
         self.preset_selector.currentTextChanged.connect(self._on_preset_selected)
         layout.addWidget(self.preset_selector)
 
+        # 预设检索：支持 lighting:逆光 这类分字段条件
+        self.preset_search_input = QLineEdit()
+        self.preset_search_input.setObjectName("presetSearchInput")
+        self.preset_search_input.setPlaceholderText("搜索预设，如 光线:逆光")
+        self.preset_search_input.setClearButtonEnabled(True)
+        self.preset_search_input.setMinimumWidth(180)
+        self._preset_search_timer = QTimer(self)
+        self._preset_search_timer.setSingleShot(True)
+        self._preset_search_timer.setInterval(150)
+        self._preset_search_timer.timeout.connect(self._apply_preset_search)
+        self.preset_search_input.textChanged.connect(lambda _text: self._preset_search_timer.start())
+        self.preset_search_input.returnPressed.connect(self._apply_preset_search)
+        layout.addWidget(self.preset_search_input)
+
         # 刷新按钮
         refresh_btn = QPushButton("刷新")
         refresh_btn.setObjectName("secondaryButton")
@@ -754,17 +769,33 @@ class PromptGeneratorApp(ImageGenController, QMainWindow):
     # ========== 预设相关方法 ==========
 
     def _load_presets_to_selector(self):
-        """加载预设到选择器"""
+        """加载预设到选择器；搜索框有内容时只列出检索结果"""
+        query = self.preset_search_input.text().strip()
+        if query:
+            presets = self.preset_manager.search_presets(query)
+        else:
+            presets = self.preset_manager.get_all_presets()
+        self._fill_preset_selector(presets)
+        self._show_toast(f"已加载 {len(presets)} 个预设")
+
+    def _fill_preset_selector(self, presets: list[dict]):
         self.preset_selector.blockSignals(True)
         self.preset_selector.clear()
         self.preset_selector.addItem("")  # 空选项
-
-        presets = self.preset_manager.get_all_presets()
         for preset in presets:
             self.preset_selector.addItem(preset['name'], preset['name'])
-
         self.preset_selector.blockSignals(False)
-        self._show_toast(f"已加载 {len(presets)} 个预设")
+
+    def _apply_preset_search(self):
+        """按搜索框内容刷新预设下拉列表"""
+        self._preset_search_timer.stop()
+        query = self.preset_search_input.text().strip()
+        if not query:
+            self._fill_preset_selector(self.preset_manager.get_all_presets())
+            return
+        presets = self.preset_manager.search_presets(query)
+        self._fill_preset_selector(presets)
+        self._show_toast(f"找到 {len(presets)} 个预设" if presets else "没有匹配的预设")
 
     def _on_preset_selected(self, text: str):
         """选择预设时加载"""
@@ -52,6 +52,8 @@ class AIGenerateDialog(QDialog):
         self.config_manager = AIConfigManager()
         self._is_generating = False
         self._full_content = ""
+        self._parsed_fields = 0
+        self._stream_invalid = False
         self.selected_images: List[str] = []
         self._setup_ui()
         self.setAcceptDrops(True)
@@ -491,6 +493,8 @@ class AIGenerateDialog(QDialog):
         # 清空输出并开始
         self.output_display.clear()
         self._full_content = ""
+        self._parsed_fields = 0
+        self._stream_invalid = False
         self._is_generating = True
         self._set_generating_ui(True)
         self.apply_btn.setEnabled(False)
@@ -516,6 +520,8 @@ class AIGenerateDialog(QDialog):
             on_progress=self._on_generate_progress,
             on_stream_chunk=self._on_stream_chunk,
             on_stream_done=self._on_stream_done,
+            on_stream_field=self._on_stream_field,
+            on_stream_invalid=self._on_stream_invalid,
         )
     
     def _set_generating_ui(self, generating: bool):
@@ -549,6 +555,18 @@ class AIGenerateDialog(QDialog):
         scrollbar = self.output_display.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
     
+    def _on_stream_field(self, field: dict):
+        """增量解析读完一个字段"""
+        self._parsed_fields += 1
+        if not self._stream_invalid:
+            self.status_label.setText(f"生成中 · 已解析 {self._parsed_fields} 个字段")
+
+    def _on_stream_invalid(self, message: str):
+        """AI 输出不是合法 JSON：流还没结束就提示"""
+        self._stream_invalid = True
+        self.status_label.setText(f"输出格式异常: {message}")
+        self.status_label.setStyleSheet("color: #FF9800; font-size: 12px;")
+
     def _on_stream_done(self, full_content: str):
         """流式完成"""
         self._is_generating = False
@@ -1,7 +1,6 @@
 """AI 生图对话框"""
 
 import os
-from io import BytesIO
 from typing import List, Optional
 
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
@@ -30,6 +29,8 @@ from nano_banana.core.images import (
     get_image_provider_capabilities,
     get_provider_label,
 )
+from nano_banana.core.images.fanout import clamp_variant_count, iter_variant_results
+from nano_banana.core.images.result import as_image_result
 from nano_banana.desktop.window_utils import fit_window_to_screen
 
 
@@ -37,6 +38,7 @@ class ImageGenerationThread(QThread):
     """后台线程：调用当前图片生成 provider 生成图片"""
 
     image_ready = pyqtSignal(bytes)
+    partial_ready = pyqtSignal(bytes)
     error = pyqtSignal(str)
     progress = pyqtSignal(str)
 
@@ -49,6 +51,7 @@ class ImageGenerationThread(QThread):
         thinking_level: str = "low",
         options: Optional[dict] = None,
         image_config: Optional[dict] = None,
+        variant_count: int = 1,
     ):
         super().__init__()
         self.prompt = prompt
@@ -59,12 +62,18 @@ class ImageGenerationThread(QThread):
             "thinking_level": thinking_level,
         }
         self.image_config = dict(image_config or AIConfigManager().get_active_image_config())
+        self.variant_count = clamp_variant_count(variant_count)
         self._cancelled = False
 
     def cancel(self):
         """标记取消：无法中断进行中的 HTTP 请求，但完成后不再发任何信号。"""
         self._cancelled = True
 
+    def _emit_partial(self, _index: int, partial) -> None:
+        """流式预览帧（OpenAI Images / 豆包），多张并发时只预览最新到达的一帧。"""
+        if not self._cancelled:
+            self.partial_ready.emit(as_image_result(partial).data)
+
     def run(self):
         try:
             self.progress.emit("正在初始化图片生成客户端...")
@@ -79,20 +88,34 @@ class ImageGenerationThread(QThread):
             provider_label = get_provider_label(self.image_config["provider"])
             ref_count = len(self.image_paths) if self.image_paths else 0
             hint = f"，含 {ref_count} 张参考图" if ref_count else ""
-            self.progress.emit(f"正在生成图片（{provider_label}{hint}）...")
-            image = client.generate_image(
-                text=self.prompt,
-                images=self.image_paths if self.image_paths else None,
-            )
+            count_hint = f" {self.variant_count} 张" if self.variant_count > 1 else ""
+            self.progress.emit(f"正在并发生成{count_hint}图片（{provider_label}{hint}）...")
+            errors = []
+            succeeded = 0
+            # 多张并发：谁先完成先显示谁，不等最慢的那张
+            for result in iter_variant_results(
+                client,
+                self.prompt,
+                self.image_paths if self.image_paths else None,
+                self.variant_count,
+                on_partial=self._emit_partial,
+            ):
+                if self._cancelled:
+                    return
+                if result.error:
+                    errors.append(result.error)
+                    continue
+                succeeded += 1
+                # 原始字节直接交给 QImage 解码，不做 PNG 重编码
+                self.image_ready.emit(as_image_result(result.image).data)
+                if self.variant_count > 1:
+                    self.progress.emit(f"已完成 {succeeded}/{self.variant_count} 张")
             if self._cancelled:
                 return
-            if image is None:
-                self.error.emit("未生成图片，请尝试调整提示词或参数")
-                return
-
-            buffer = BytesIO()
-            image.save(buffer, format="PNG")
-            self.image_ready.emit(buffer.getvalue())
+            if not succeeded:
+                self.error.emit(errors[0])
+            elif errors:
+                self.progress.emit(f"{succeeded} 张完成，{len(errors)} 张失败: {errors[0]}")
         except Exception as exc:  # noqa: BLE001
             if not self._cancelled:
                 self.error.emit(str(exc))
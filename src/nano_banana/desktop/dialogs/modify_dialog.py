@@ -26,9 +26,10 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QSize, Qt, pyqtSignal
 from PyQt6.QtGui import QAction, QFont, QIcon, QKeySequence, QPixmap
 
-from nano_banana.core.chat import strip_code_fences
+from nano_banana.core.chat import MODIFY_MODE_FULL, MODIFY_MODE_PATCH, strip_code_fences
 from nano_banana.core.config import AIConfigManager
 from nano_banana.core.images.provider_config import IMAGE_PROVIDER_META
+from nano_banana.core.schema import get_schema
 from nano_banana.desktop.ai_service import AIService
 from nano_banana.desktop.window_utils import (
     extract_image_paths,
@@ -53,6 +54,8 @@ class AIModifyDialog(QDialog):
         self.config_manager = AIConfigManager()
         self._is_generating = False
         self._full_content = ""
+        self._parsed_fields = 0
+        self._stream_invalid = False
         self.selected_images: List[str] = []
         self.diff_items = []  # 存储差异项信息
         self.diff_checkboxes = {}  # 存储路径到复选框的映射
@@ -220,6 +223,23 @@ class AIModifyDialog(QDialog):
         """)
         input_frame_layout.addWidget(self.prompt_input)
 
+        # 修改范围：只把勾选分类的切片发给 AI，其余分类保持不变
+        scope_label = QLabel("修改范围（不勾选则修改整份提示词）")
+        scope_label.setStyleSheet("font-size: 12px; color: #8c8c8c;")
+        input_frame_layout.addWidget(scope_label)
+        scope_layout = QHBoxLayout()
+        scope_layout.setSpacing(12)
+        self.scope_checkboxes = {}
+        for category in get_schema().categories:
+            checkbox = QCheckBox(category.label)
+            self.scope_checkboxes[category.id] = checkbox
+            scope_layout.addWidget(checkbox)
+        scope_layout.addStretch()
+        input_frame_layout.addLayout(scope_layout)
+        # 局部修改：只让 AI 返回改动的字段，本地校验合并；默认返回完整 JSON
+        self.patch_mode_checkbox = QCheckBox("只返回改动的字段（局部修改）")
+        input_frame_layout.addWidget(self.patch_mode_checkbox)
+
         left_layout.addWidget(input_frame)
         
         # 图片上传区域
@@ -542,6 +562,8 @@ class AIModifyDialog(QDialog):
         self.output_display.clear()
         self.compare_display.clear()
         self._full_content = ""
+        self._parsed_fields = 0
+        self._stream_invalid = False
         self.diff_items = []
         self.diff_checkboxes = {}
         # 清空对比widget
@@ -570,20 +592,32 @@ class AIModifyDialog(QDialog):
         # 传递图片路径列表
         image_paths = self.selected_images.copy() if self.selected_images else None
         
+        scope = [
+            category_id
+            for category_id, checkbox in self.scope_checkboxes.items()
+            if checkbox.isChecked()
+        ]
         self.ai_service.generate_modify_async(
             current_json,
             prompt,
             image_paths=image_paths,
+            mode=MODIFY_MODE_PATCH if self.patch_mode_checkbox.isChecked() else MODIFY_MODE_FULL,
+            categories=scope or None,
             on_finished=self._on_generate_finished,
             on_error=self._on_generate_error,
             on_progress=self._on_generate_progress,
             on_stream_chunk=self._on_stream_chunk,
             on_stream_done=self._on_stream_done,
+            on_stream_field=self._on_stream_field,
+            on_stream_invalid=self._on_stream_invalid,
         )
 
     def _set_generating_ui(self, generating: bool):
         """设置生成中的UI状态"""
         self.prompt_input.setReadOnly(generating)
+        for checkbox in self.scope_checkboxes.values():
+            checkbox.setEnabled(not generating)
+        self.patch_mode_checkbox.setEnabled(not generating)
         self.add_image_btn.setEnabled(not generating)
         self.remove_image_btn.setEnabled(not generating)
         self.clear_image_btn.setEnabled(not generating)
@@ -611,6 +645,18 @@ class AIModifyDialog(QDialog):
         self.output_display.setTextCursor(cursor)
         self.output_display.ensureCursorVisible()
 
+    def _on_stream_field(self, field: dict):
+        """增量解析读完一个字段"""
+        self._parsed_fields += 1
+        if not self._stream_invalid:
+            self.status_label.setText(f"修改中 · 已解析 {self._parsed_fields} 个字段")
+
+    def _on_stream_invalid(self, message: str):
+        """AI 输出不是合法 JSON：流还没结束就提示"""
+        self._stream_invalid = True
+        self.status_label.setText(f"输出格式异常: {message}")
+        self.status_label.setStyleSheet("color: #FF9800; font-size: 12px;")
+
     def _on_stream_done(self, content: str):
         """流式传输完成"""
         self._full_content = content
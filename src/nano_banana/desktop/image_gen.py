@@ -73,6 +73,12 @@ class ImageGenController:
         self.image_model_combo.setEditable(False)
         provider_layout.addWidget(self.image_model_combo, 2)
 
+        provider_layout.addWidget(QLabel("数量"))
+        self.image_count_combo = QComboBox()
+        self.image_count_combo.addItems(["1", "2", "3", "4"])
+        self.image_count_combo.setToolTip("一次并发生成多张候选，先完成的先显示")
+        provider_layout.addWidget(self.image_count_combo)
+
         self.image_config_status = QLabel()
         provider_layout.addWidget(self.image_config_status)
         param_layout.addWidget(provider_row)
@@ -561,9 +567,11 @@ class ImageGenController:
             image_paths=self.selected_images,
             options=self._collect_image_options(),
             image_config=image_config,
+            variant_count=int(self.image_count_combo.currentText()),
         )
         self.worker_thread.progress.connect(lambda msg: self._set_image_status(f"⏳ {msg}", "#1890ff"))
         self.worker_thread.image_ready.connect(self._on_image_ready)
+        self.worker_thread.partial_ready.connect(self._on_partial_image)
         self.worker_thread.error.connect(self._on_generation_error)
         self.worker_thread.finished.connect(self._on_thread_finished)
         self.worker_thread.start()
@@ -574,7 +582,13 @@ class ImageGenController:
         if not thread:
             return
         thread.cancel()
-        for signal in (thread.progress, thread.image_ready, thread.error, thread.finished):
+        for signal in (
+            thread.progress,
+            thread.image_ready,
+            thread.partial_ready,
+            thread.error,
+            thread.finished,
+        ):
             try:
                 signal.disconnect()
             except TypeError:
@@ -594,6 +608,15 @@ class ImageGenController:
         self._set_image_generating_state(False)
         self.worker_thread = None
 
+    def _on_partial_image(self, image_bytes: bytes):
+        """流式预览帧：只刷新预览区，不进历史、不启用保存。"""
+        pixmap = QPixmap.fromImage(QImage.fromData(image_bytes))
+        if pixmap.isNull():
+            return
+        self.preview_area.setSourcePixmap(pixmap)
+        self.preview_area.setScaledContents(False)
+        self._set_image_status("⏳ 已收到预览，正在生成完整图片...", "#1890ff")
+
     def _on_image_ready(self, image_bytes: bytes):
         """图片生成完成"""
         self.generated_image_bytes = image_bytes
@@ -682,6 +705,7 @@ class ImageGenController:
         """设置生成状态"""
         self.image_provider_combo.setEnabled(not generating)
         self.image_model_combo.setEnabled(not generating)
+        self.image_count_combo.setEnabled(not generating)
         for combo in self.image_option_widgets.values():
             combo.setEnabled(not generating)
         self.add_image_btn.setEnabled(not generating)
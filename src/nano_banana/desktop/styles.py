@@ -574,6 +574,17 @@ QSplitter::handle:hover {{
     border-top: 6px solid {ACCENT};
 }}
 
+#presetSearchInput {{
+    background-color: {BG_PRIMARY};
+    border: 1px solid {BORDER_LIGHT};
+    border-radius: 6px;
+    padding: 8px 12px;
+}}
+
+#presetSearchInput:focus {{
+    border-color: {ACCENT};
+}}
+
 #presetBar {{
     background-color: {BG_PRIMARY};
     border: 1px solid {BORDER_LIGHT};
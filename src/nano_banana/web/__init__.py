@@ -1,5 +1,18 @@
-"""Web 端。"""
+"""Web 端。
 
-from nano_banana.web.app import app, create_app, main
+按需导入：`nano-banana-web serve` 的 gunicorn 主进程只加载命令行，
+应用与共享管理器在各 worker 进程里才创建。
+"""
+
+import importlib
 
 __all__ = ["app", "create_app", "main"]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module("nano_banana.web.app")
+        # 导入子模块会把包属性 app 绑定成模块本身，这里改回 Flask 应用，与以前一致
+        globals().update({key: getattr(module, key) for key in __all__})
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -4,7 +4,7 @@ from pathlib import Path
 from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
 
-from nano_banana.web.blueprints import chat, config, images, presets
+from nano_banana.web.blueprints import chat, config, images, jobs, presets
 
 
 def _static_dir() -> Path:
@@ -22,6 +22,7 @@ def create_app() -> Flask:
     app.register_blueprint(presets.bp)
     app.register_blueprint(chat.bp)
     app.register_blueprint(images.bp)
+    app.register_blueprint(jobs.bp)
 
     @app.route("/")
     def index():
@@ -37,16 +38,17 @@ def create_app() -> Flask:
 app = create_app()
 
 
-def main():
+def main(host: str = "0.0.0.0", port: int = 5000):
+    """开发服务器（debug + 自动重载）。生产部署用 `nano-banana-web serve`。"""
     static_dir = _static_dir()
     static_dir.mkdir(exist_ok=True)
     print("=" * 60)
     print("Nano Banana Prompt Tool - Web版本")
     print("=" * 60)
-    print("服务器启动在: http://localhost:5000")
+    print(f"服务器启动在: http://localhost:{port}")
     print("按 Ctrl+C 停止服务器")
     print("=" * 60)
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    app.run(host=host, port=port, debug=True)
 
 
 if __name__ == "__main__":
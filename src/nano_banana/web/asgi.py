@@ -0,0 +1,179 @@
+"""ASGI 入口：对话流在事件循环里原生处理，其余路由交给 Flask。
+
+/api/generate 与 /api/modify 用 AsyncOpenAI 流式转发，等待上游 token 时不占线程，
+一个进程可以同时挂着几百条提示词生成流；客户端断开时立即取消上游请求。
+其他接口经 a2wsgi 的线程池桥接到原有 Flask 应用，行为不变。
+
+    nano-banana-web serve --asgi
+    uvicorn nano_banana.web.asgi:application
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sys
+from collections.abc import AsyncIterator
+from typing import Any, Callable, Optional
+
+ASYNC_CHAT_ROUTES = {"/api/generate": "generate", "/api/modify": "modify"}
+# 桥接 Flask 的线程数（非对话接口的并发上限）
+DEFAULT_WSGI_THREADS = 32
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    return int(value) if value.isdigit() else default
+
+
+class NanoBananaASGI:
+    def __init__(self, wsgi_app: Optional[Callable] = None, *, threads: Optional[int] = None):
+        self._wsgi_app = wsgi_app
+        self.threads = threads or _env_int("NANO_BANANA_WEB_THREADS", DEFAULT_WSGI_THREADS)
+        self._fallback: Optional[Callable] = None
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and scope["path"] in ASYNC_CHAT_ROUTES
+        ):
+            await self._chat(ASYNC_CHAT_ROUTES[scope["path"]], receive, send)
+        else:
+            await self._wsgi()(scope, receive, send)
+
+    def _wsgi(self) -> Callable:
+        if self._fallback is None:
+            from a2wsgi import WSGIMiddleware
+
+            if self._wsgi_app is None:
+                from nano_banana.web.app import app
+
+                self._wsgi_app = app
+            self._fallback = WSGIMiddleware(self._wsgi_app, workers=self.threads)
+        return self._fallback
+
+    async def _chat(self, action: str, receive: Callable, send: Callable) -> None:
+        from nano_banana.core.chat import aiter_sse_response
+        from nano_banana.web.blueprints.chat import (
+            SSE_HEADERS,
+            ChatRequestError,
+            chat_settings,
+            messages_for,
+            stream_options_for,
+        )
+
+        try:
+            data = json.loads((await _read_body(receive)) or b"{}")
+        except ValueError:
+            await _send_json(send, 400, {"error": "请求体不是合法的 JSON"})
+            return
+        if not isinstance(data, dict):
+            data = {}
+        try:
+            # 参考图编码是 CPU 活，放到线程里做，不卡住事件循环
+            messages = await asyncio.to_thread(messages_for, action, data)
+            stream_options = stream_options_for(action, data)
+            chat = chat_settings()
+        except ChatRequestError as exc:
+            await _send_json(send, 400, {"error": str(exc)})
+            return
+        except Exception as exc:  # noqa: BLE001
+            await _send_json(send, 500, {"error": str(exc)})
+            return
+
+        headers = [(b"content-type", b"text/event-stream; charset=utf-8")]
+        headers += [(key.lower().encode(), value.encode()) for key, value in SSE_HEADERS.items()]
+        await send({"type": "http.response.start", "status": 200, "headers": headers})
+        await _stream_until_disconnect(
+            aiter_sse_response(
+                messages,
+                base_url=chat["base_url"],
+                api_key=chat["api_key"],
+                model=chat["model"],
+                **stream_options,
+            ),
+            receive,
+            send,
+        )
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self._drain_jobs()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _drain_jobs() -> None:
+        """退出前等后台生图任务跑完（连接已由服务器排空），上限同 graceful-timeout。"""
+        context = sys.modules.get("nano_banana.web.context")
+        if context is None:
+            return
+        from nano_banana.web.serve import DEFAULT_GRACEFUL_TIMEOUT
+
+        timeout = _env_int("NANO_BANANA_WEB_GRACEFUL_TIMEOUT", DEFAULT_GRACEFUL_TIMEOUT)
+        if not await asyncio.to_thread(context.job_manager.drain, timeout):
+            print(f"生图任务未在 {timeout}s 内完成，强制退出")
+        context.job_manager.shutdown(wait=False)
+
+
+async def _read_body(receive: Callable) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return body
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def _send_json(send: Callable, status: int, payload: Any) -> None:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+async def _stream_until_disconnect(
+    chunks: AsyncIterator[str], receive: Callable, send: Callable
+) -> None:
+    """逐条发送 SSE；客户端先断开时取消发送任务，上游流随生成器关闭一起结束。"""
+
+    async def pump() -> None:
+        async for chunk in chunks:
+            await send(
+                {"type": "http.response.body", "body": chunk.encode("utf-8"), "more_body": True}
+            )
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def wait_disconnect() -> None:
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    pump_task = asyncio.ensure_future(pump())
+    watch_task = asyncio.ensure_future(wait_disconnect())
+    try:
+        await asyncio.wait({pump_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (pump_task, watch_task):
+            task.cancel()
+        await asyncio.gather(pump_task, watch_task, return_exceptions=True)
+        await chunks.aclose()
+
+
+application = NanoBananaASGI()
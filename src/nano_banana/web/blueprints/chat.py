@@ -1,57 +1,128 @@
 from flask import Blueprint, Response, jsonify, request
 
 from nano_banana.core.chat import (
+    MODIFY_MODE_FULL,
+    MODIFY_MODE_PATCH,
+    MODIFY_MODES,
     build_generate_messages,
     build_modify_messages,
+    generate_structured_output,
     iter_sse_response,
+    parse_modify_base,
+    resolve_modify_scope,
+    structured_output_enabled,
 )
 from nano_banana.web.context import config_manager
 
 bp = Blueprint("chat", __name__)
 
+DEFAULT_CHAT_MODEL = "gpt-4o-mini"
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
-def _sse_from_messages(messages):
+
+class ChatRequestError(ValueError):
+    """请求参数不完整（400）。"""
+
+
+def messages_for(action: str, data: dict) -> list:
+    """/api/generate 与 /api/modify 的请求体 → 消息列表；WSGI 与 ASGI 入口共用。"""
+    if action == "generate":
+        user_prompt = data.get("prompt", "")
+        images = data.get("images", [])
+        if not user_prompt and not images:
+            raise ChatRequestError("请提供文字描述或参考图片")
+        return build_generate_messages(
+            user_prompt, images, structured=structured_output_enabled()
+        )
+    current_data = data.get("current_data", "")
+    modify_request = data.get("modify_request", "")
+    images = data.get("images", [])
+    if not current_data or not modify_request:
+        raise ChatRequestError("当前数据和修改要求不能为空")
+    try:
+        return build_modify_messages(
+            current_data,
+            modify_request,
+            images,
+            mode=modify_mode(data),
+            categories=modify_scope(data),
+        )
+    except ValueError as exc:
+        # 按分类修改时当前数据必须是 JSON 对象
+        raise ChatRequestError(str(exc)) from exc
+
+
+def modify_mode(data: dict) -> str:
+    """/api/modify 的 mode：full（默认，返回完整 JSON）或 patch（只返回改动，服务端合并）。"""
+    mode = data.get("mode") or MODIFY_MODE_FULL
+    if mode not in MODIFY_MODES:
+        raise ChatRequestError(f"未知的修改模式: {mode}")
+    return mode
+
+
+def modify_scope(data: dict):
+    """/api/modify 的 categories：分类 id 列表，或 "auto" 按修改要求判断；None 表示整份文档。"""
+    try:
+        return resolve_modify_scope(data.get("categories"), data.get("modify_request", ""))
+    except ValueError as exc:
+        raise ChatRequestError(str(exc)) from exc
+
+
+def stream_options_for(action: str, data: dict) -> dict:
+    """iter_sse_response 的额外参数。
+
+    生成：structured（结构化输出）；局部 / 分类修改：patch_base 与 categories，由服务端合并结果。
+    """
+    if action == "generate":
+        structured = generate_structured_output()
+        return {"structured": structured} if structured is not None else {}
+    categories = modify_scope(data)
+    if modify_mode(data) != MODIFY_MODE_PATCH and not categories:
+        return {}
+    try:
+        base = parse_modify_base(data.get("current_data", ""))
+    except ValueError as exc:
+        raise ChatRequestError(str(exc)) from exc
+    return {"patch_base": base, "categories": categories}
+
+
+def chat_settings() -> dict:
+    """当前对话配置；未配置密钥时抛 ChatRequestError。"""
     chat = config_manager.get_chat_config()
     if not chat["api_key"]:
-        return jsonify({"error": "请先配置API密钥"}), 400
+        raise ChatRequestError("请先配置API密钥")
+    return {**chat, "model": chat["model"] or DEFAULT_CHAT_MODEL}
+
+
+def _sse_response(action: str):
+    try:
+        data = request.json or {}
+        messages = messages_for(action, data)
+        stream_options = stream_options_for(action, data)
+        chat = chat_settings()
+    except ChatRequestError as exc:
+        return jsonify({"error": str(exc)}), 400
+    except Exception as exc:  # noqa: BLE001
+        return jsonify({"error": str(exc)}), 500
     response = Response(
         iter_sse_response(
             messages,
             base_url=chat["base_url"],
             api_key=chat["api_key"],
-            model=chat["model"] or "gpt-4o-mini",
+            model=chat["model"],
+            **stream_options,
         ),
         mimetype="text/event-stream",
     )
-    response.headers["Cache-Control"] = "no-cache"
-    response.headers["X-Accel-Buffering"] = "no"
+    response.headers.update(SSE_HEADERS)
     return response
 
 
 @bp.post("/api/generate")
 def generate_prompt():
-    try:
-        data = request.json or {}
-        user_prompt = data.get("prompt", "")
-        images = data.get("images", [])
-        if not user_prompt and not images:
-            return jsonify({"error": "请提供文字描述或参考图片"}), 400
-        messages = build_generate_messages(user_prompt, images)
-        return _sse_from_messages(messages)
-    except Exception as exc:  # noqa: BLE001
-        return jsonify({"error": str(exc)}), 500
+    return _sse_response("generate")
 
 
 @bp.post("/api/modify")
 def modify_prompt():
-    try:
-        data = request.json or {}
-        current_data = data.get("current_data", "")
-        modify_request = data.get("modify_request", "")
-        images = data.get("images", [])
-        if not current_data or not modify_request:
-            return jsonify({"error": "当前数据和修改要求不能为空"}), 400
-        messages = build_modify_messages(current_data, modify_request, images)
-        return _sse_from_messages(messages)
-    except Exception as exc:  # noqa: BLE001
-        return jsonify({"error": str(exc)}), 500
+    return _sse_response("modify")
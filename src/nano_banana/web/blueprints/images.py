@@ -1,19 +1,29 @@
-import base64
-import os
-import tempfile
+
+import time
 from io import BytesIO
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file
 
 from nano_banana.core.images import (
+    ImageData,
+    ImageResult,
+    as_image_result,
     create_image_provider_from_credentials,
     get_image_provider_capabilities,
+    supports_partial_images,
 )
+from nano_banana.core.images.cache import for_variant
+from nano_banana.core.images.fanout import MAX_VARIANTS, clamp_variant_count
 from nano_banana.core.images.provider_config import IMAGE_PROVIDER_META
-from nano_banana.web.context import config_manager
+from nano_banana.core.jobs import JOB_DONE
+from nano_banana.web.context import config_manager, image_store, job_manager
 
 bp = Blueprint("images", __name__)
 
+IMAGE_CACHE_MAX_AGE = 7 * 24 * 3600
+# wait=true 时同步等待结果的上限（秒）；超时后照常返回 202 + job id，任务继续在后台执行
+SYNC_WAIT_TIMEOUT = 120.0
+
 
 @bp.get("/api/image-providers")
 def get_image_providers():
@@ -55,94 +65,230 @@ def save_image_generation_settings():
     if options is not None and not isinstance(options, dict):
         return jsonify({"error": "生成参数必须是 JSON 对象"}), 400
     model = model.strip()
-    if not config_manager.set_active_image_selection(provider, model):
-        return jsonify({"error": "图片渠道选择保存失败"}), 500
-    if options is not None and not config_manager.save_image_generation_options(
-        provider, model, options
-    ):
-        return jsonify({"error": "图片生成参数保存失败"}), 500
+    with config_manager.batch():
+        if not config_manager.set_active_image_selection(provider, model):
+            return jsonify({"error": "图片渠道选择保存失败"}), 500
+        if options is not None and not config_manager.save_image_generation_options(
+            provider, model, options
+        ):
+            return jsonify({"error": "图片生成参数保存失败"}), 500
+        if not config_manager.flush():
+            return jsonify({"error": "图片生成参数保存失败"}), 500
     return jsonify({"success": True})
 
 
 @bp.post("/api/generate-image")
 def generate_image():
-    temp_files = []
+    """提交生图任务，默认立即返回 job id（202），结果经 /api/jobs/<id> 或其 events 获取。
+
+    wait=true 时在请求内等待结果，最多 timeout 秒（不超过 SYNC_WAIT_TIMEOUT），
+    超时仍未完成则同样返回 202，不会无限占住 worker。
+
+    variants 可以是张数 N，也可以是 [{provider, model, options}, ...] 覆盖列表，
+    每个变体单独成一个任务并发执行。结果以 image_id + image_url 返回，
+    图片本体走 /api/images/<id>；response_format=data_uri 时额外内联 base64。
+    """
     try:
         data = request.json or {}
         prompt = data.get("prompt", "")
         images = data.get("images", [])
-        options = data.get("options") or {}
-        provider = data.get("provider") or config_manager.get_image_provider()
-        if provider not in IMAGE_PROVIDER_META:
-            return jsonify({"error": f"未知图片生成渠道: {provider}"}), 400
+        inline = data.get("response_format") == "data_uri"
+        variants = data.get("variants")
+        if variants is not None and not isinstance(variants, (int, list)):
+            return jsonify({"error": "variants 必须是数量或参数列表"}), 400
+        if isinstance(variants, list):
+            if not variants or len(variants) > MAX_VARIANTS:
+                return jsonify({"error": f"变体数量需在 1～{MAX_VARIANTS} 之间"}), 400
+            overrides = [item if isinstance(item, dict) else {} for item in variants]
+        else:
+            overrides = [{}] * clamp_variant_count(variants if variants is not None else 1)
 
-        credentials = config_manager.get_image_provider_config(provider)
-        model = (data.get("model") or credentials["model"]).strip()
-        if not model:
-            return jsonify({"error": "图片模型不能为空"}), 400
-        credentials["model"] = model
-        if not options:
-            options = {
-                "aspect_ratio": data.get("aspect_ratio", "1:1"),
-                "image_size": data.get("image_size", "2K"),
-                "thinking_level": data.get("thinking_level", "low"),
-            }
+        specs = []
+        for override in overrides:
+            spec, error = _resolve_variant({**data, **override})
+            if error:
+                return jsonify({"error": error}), 400
+            specs.append(spec)
         if not prompt:
             return jsonify({"error": "提示词不能为空"}), 400
 
-        processed_images = []
-        if images:
-            for img_str in images:
-                if isinstance(img_str, str) and img_str.startswith("data:"):
-                    try:
-                        header, encoded = img_str.split(";base64,")
-                        mime_type = header.split(":")[1]
-                        ext_map = {
-                            "image/jpeg": ".jpg",
-                            "image/png": ".png",
-                            "image/webp": ".webp",
-                            "image/gif": ".gif",
-                            "image/bmp": ".bmp",
-                        }
-                        ext = ext_map.get(mime_type, ".jpg")
-                        img_data = base64.b64decode(encoded)
-                        fd, path = tempfile.mkstemp(suffix=ext)
-                        with os.fdopen(fd, "wb") as handle:
-                            handle.write(img_data)
-                        temp_files.append(path)
-                        processed_images.append(path)
-                    except Exception as exc:  # noqa: BLE001
-                        print(f"Error processing image: {exc}")
-                        processed_images.append(img_str)
-                else:
-                    processed_images.append(img_str)
-
-        client = create_image_provider_from_credentials(
-            provider,
-            credentials["base_url"],
-            credentials["api_key"],
-            model,
-        )
-        client.set_generation_options(options)
-        config_manager.set_active_image_selection(provider, model)
-        config_manager.save_image_generation_options(provider, model, options)
-        generated_image = client.generate_image(
-            text=prompt,
-            images=processed_images if processed_images else None,
-        )
-        if generated_image:
-            buffered = BytesIO()
-            generated_image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            return jsonify({"image": f"data:image/png;base64,{img_str}"})
-        return jsonify({"error": "生成图片失败，未返回图片数据"}), 500
+        jobs = []
+        saved_selection = False
+        for index, spec in enumerate(specs):
+            client = create_image_provider_from_credentials(
+                spec["provider"],
+                spec["base_url"],
+                spec["api_key"],
+                spec["model"],
+            )
+            client.set_generation_options(spec["options"])
+            # 同参数的多张候选各占一个缓存条目，避免后几张都命中第一张
+            client = for_variant(client, index)
+            if not saved_selection:
+                # 两次保存合并成一次写盘；参数未变化时完全不写
+                with config_manager.batch():
+                    config_manager.set_active_image_selection(spec["provider"], spec["model"])
+                    config_manager.save_image_generation_options(
+                        spec["provider"], spec["model"], spec["options"]
+                    )
+                saved_selection = True
+            jobs.append(
+                job_manager.submit(
+                    lambda report, client=client: _run_generation(
+                        client, prompt, images, report, inline=inline
+                    ),
+                    provider=spec["provider"],
+                )
+            )
+
+        if not data.get("wait"):
+            return _accepted(jobs, variants is not None)
+
+        deadline = time.monotonic() + _sync_wait_timeout(data.get("timeout"))
+        finished = [
+            job_manager.wait(job.id, timeout=max(0.0, deadline - time.monotonic()))
+            for job in jobs
+        ]
+        if not all(job is not None and job.finished for job in finished):
+            return _accepted(jobs, variants is not None)
+        if variants is None:
+            job = finished[0]
+            if job.status == JOB_DONE:
+                return jsonify(job.result)
+            return jsonify({"error": job.error}), 500
+        results = [
+            {"variant": index, **job.result}
+            if job.status == JOB_DONE
+            else {"variant": index, "error": job.error}
+            for index, job in enumerate(finished)
+        ]
+        status = 200 if any("error" not in item for item in results) else 500
+        return jsonify({"results": results}), status
     except Exception as exc:  # noqa: BLE001
         print(f"Generate Image Error: {exc}")
         return jsonify({"error": str(exc)}), 500
-    finally:
-        for path in temp_files:
+
+
+def _accepted(jobs: list, with_variants: bool):
+    """202 响应：job id 与查询 / 订阅地址。"""
+    job_ids = [job.id for job in jobs]
+    payload = {
+        "job_id": job_ids[0],
+        "status": jobs[0].status,
+        "status_url": f"/api/jobs/{job_ids[0]}",
+        "events_url": f"/api/jobs/{job_ids[0]}/events",
+    }
+    if with_variants:
+        payload["jobs"] = [
+            {"variant": index, "job_id": job.id, "status_url": f"/api/jobs/{job.id}"}
+            for index, job in enumerate(jobs)
+        ]
+        payload["events_url"] = f"/api/jobs/events?ids={','.join(job_ids)}"
+    return jsonify(payload), 202
+
+
+def _sync_wait_timeout(value) -> float:
+    """请求给的 timeout 截到 (0, SYNC_WAIT_TIMEOUT]；缺省或非法时取上限。"""
+    try:
+        timeout = float(value)
+    except (TypeError, ValueError):
+        return SYNC_WAIT_TIMEOUT
+    if not 0 < timeout <= SYNC_WAIT_TIMEOUT:
+        return SYNC_WAIT_TIMEOUT
+    return timeout
+
+
+def _resolve_variant(data: dict) -> tuple[dict, str]:
+    """把一个变体的 provider/model/options 解析成完整生成参数。"""
+    options = data.get("options") or {}
+    provider = data.get("provider") or config_manager.get_image_provider()
+    if provider not in IMAGE_PROVIDER_META:
+        return {}, f"未知图片生成渠道: {provider}"
+
+    credentials = config_manager.get_image_provider_config(provider)
+    model = (data.get("model") or credentials["model"]).strip()
+    if not model:
+        return {}, "图片模型不能为空"
+    if not options:
+        options = {
+            "aspect_ratio": data.get("aspect_ratio", "1:1"),
+            "image_size": data.get("image_size", "2K"),
+            "thinking_level": data.get("thinking_level", "low"),
+        }
+    return {
+        "provider": provider,
+        "base_url": credentials["base_url"],
+        "api_key": credentials["api_key"],
+        "model": model,
+        "options": options,
+    }, ""
+
+
+@bp.get("/api/images/<image_id>")
+def get_image(image_id: str):
+    """二进制下发生成结果，支持 ETag/304、Range 与 ?size= 缩略图。"""
+    size = request.args.get("size", type=int)
+    try:
+        stored = image_store.thumbnail(image_id, size) if size else image_store.get(image_id)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    if stored is None:
+        return jsonify({"error": "图片不存在或已过期"}), 404
+    response = send_file(
+        BytesIO(stored.data),
+        mimetype=stored.mime_type,
+        download_name=f"generated-{stored.id}{stored.extension}",
+        etag=stored.etag,
+        conditional=True,
+        max_age=IMAGE_CACHE_MAX_AGE,
+    )
+    # id 由内容摘要决定，同一 URL 的内容永不变化
+    response.cache_control.immutable = True
+    return response
+
+
+def _image_payload(result: ImageResult, *, inline: bool = False) -> dict:
+    stored = image_store.put(result)
+    payload = {
+        "image_id": stored.id,
+        "image_url": f"/api/images/{stored.id}",
+        "thumbnail_url": f"/api/images/{stored.id}?size=256",
+        "mime_type": stored.mime_type,
+        "width": stored.width,
+        "height": stored.height,
+    }
+    if inline:
+        payload["image"] = result.data_uri()
+    return payload
+
+
+def _run_generation(client, prompt: str, images: list, report, *, inline: bool = False) -> dict:
+    """在任务线程里执行：data URI 解码成内存参考图 → 调 provider → 编码结果。"""
+    report({"type": "progress", "message": "正在处理参考图"})
+    processed_images = []
+    for img_str in images or []:
+        if isinstance(img_str, str) and img_str.startswith("data:"):
             try:
-                if os.path.exists(path):
-                    os.remove(path)
-            except Exception as exc:  # noqa: BLE001
-                print(f"Error removing temp file {path}: {exc}")
+                processed_images.append(ImageData.from_data_uri(img_str))
+            except ValueError as exc:
+                print(f"Error processing image: {exc}")
+                processed_images.append(img_str)
+        else:
+            processed_images.append(img_str)
+
+    report({"type": "progress", "message": "正在生成图片"})
+    kwargs = {}
+    if supports_partial_images(client):
+        # 预览帧同样存进 image_store，SSE 只推 URL
+        kwargs["on_partial"] = lambda partial: report(
+            {"type": "partial", **_image_payload(as_image_result(partial))}
+        )
+    generated_image = as_image_result(client.generate_image(
+        text=prompt,
+        images=processed_images if processed_images else None,
+        **kwargs,
+    ))
+    if not generated_image:
+        raise RuntimeError("生成图片失败，未返回图片数据")
+    # 直接透传渠道原始字节，不再解码后重编码成 PNG
+    return _image_payload(generated_image, inline=inline)
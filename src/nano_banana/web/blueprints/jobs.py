@@ -0,0 +1,45 @@
+import json
+
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from nano_banana.web.context import job_manager
+
+bp = Blueprint("jobs", __name__)
+
+
+@bp.get("/api/jobs/events")
+def stream_many_job_events():
+    """多任务合并事件流：哪个任务先有进展先推哪个，全部结束后关闭。"""
+    job_ids = [item for item in request.args.get("ids", "").split(",") if item]
+    if not job_ids or any(job_manager.get(job_id) is None for job_id in job_ids):
+        return jsonify({"error": "任务不存在或已过期"}), 404
+    return _sse_response(job_ids)
+
+
+@bp.get("/api/jobs/<job_id>")
+def get_job(job_id):
+    snapshot = job_manager.snapshot(job_id)
+    if snapshot is None:
+        return jsonify({"error": "任务不存在或已过期"}), 404
+    return jsonify(snapshot)
+
+
+@bp.get("/api/jobs/<job_id>/events")
+def stream_job_events(job_id):
+    if job_manager.get(job_id) is None:
+        return jsonify({"error": "任务不存在或已过期"}), 404
+    return _sse_response([job_id])
+
+
+def _sse_response(job_ids: list[str]) -> Response:
+    def generate():
+        for update in job_manager.iter_updates(*job_ids):
+            if update is None:
+                yield ": keep-alive\n\n"
+                continue
+            yield f"data: {json.dumps(update, ensure_ascii=False)}\n\n"
+
+    response = Response(stream_with_context(generate()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
@@ -1,10 +1,20 @@
-from flask import Blueprint, jsonify, request
+import base64
+import hashlib
+import json
+from datetime import datetime
 
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+
+from nano_banana.core.prompt_doc import subset_categories
 from nano_banana.core.schema import get_schema
 from nano_banana.web.context import CATEGORY_PRESET_SCOPES, preset_manager, yaml_handler
 
 bp = Blueprint("presets", __name__)
 
+NDJSON_MIMETYPE = "application/x-ndjson"
+MAX_DETAILS_PAGE = 500
+DETAILS_STREAM_CHUNK = 200
+
 
 @bp.get("/api/schema")
 def get_prompt_schema():
@@ -84,13 +94,138 @@ def get_presets():
 
 @bp.get("/api/presets/details")
 def get_all_preset_details():
+    """预设详情列表。
+
+    无参数时返回全部预设内容组成的数组（旧行为）。limit/cursor 开启键集分页，
+    返回 {items: [{name, modified_time, data}], next_cursor}；format=ndjson（或
+    Accept: application/x-ndjson）逐行流式输出 item，下一页游标放在 X-Next-Cursor 头。
+    fields=basic,scene 只保留这些分类的字段。ETag 由预设目录状态与查询参数决定。
+    """
     try:
-        details = []
-        for preset in preset_manager.get_all_presets():
-            data = preset_manager.load_preset(preset["name"])
-            if data is not None:
-                details.append(data)
-        return jsonify(details)
+        limit = request.args.get("limit", type=int)
+        if limit is not None and not 1 <= limit <= MAX_DETAILS_PAGE:
+            return jsonify({"error": f"limit 需在 1～{MAX_DETAILS_PAGE} 之间"}), 400
+        cursor = request.args.get("cursor", "")
+        after = _decode_cursor(cursor) if cursor else None
+        if cursor and after is None:
+            return jsonify({"error": "无效的 cursor"}), 400
+        categories = [item for item in request.args.get("fields", "").split(",") if item]
+        unknown = [item for item in categories if item not in get_schema().category_ids]
+        if unknown:
+            return jsonify({"error": f"未知的字段分类: {', '.join(unknown)}"}), 400
+        ndjson = request.args.get("format") == "ndjson" or (
+            request.accept_mimetypes.best == NDJSON_MIMETYPE
+        )
+        paged = limit is not None or bool(cursor)
+
+        etag = hashlib.sha256(
+            "|".join([
+                preset_manager.get_presets_state(),
+                str(limit),
+                cursor,
+                ",".join(categories),
+                "ndjson" if ndjson else ("page" if paged else "array"),
+            ]).encode("utf-8")
+        ).hexdigest()[:32]
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.cache_control.no_cache = True
+            return response
+
+        if ndjson:
+            if limit is None:
+                lines = _iter_ndjson(after, categories)
+                next_cursor = None
+            else:
+                # 只读一次：正文与 X-Next-Cursor 出自同一批行，中途预设变化也不会对不上
+                rows = preset_manager.get_preset_details_page(after, limit + 1)
+                lines = _ndjson_lines(rows[:limit], categories)
+                next_cursor = _encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+            response = Response(stream_with_context(lines), mimetype=NDJSON_MIMETYPE)
+            if next_cursor:
+                response.headers["X-Next-Cursor"] = next_cursor
+        elif paged:
+            page_size = limit or MAX_DETAILS_PAGE
+            rows = preset_manager.get_preset_details_page(after, page_size + 1)
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            response = jsonify({
+                "items": [_detail_item(row, categories) for row in rows],
+                "next_cursor": _encode_cursor(rows[-1]) if has_more and rows else None,
+            })
+        else:
+            response = jsonify([
+                _project(row["data"], categories)
+                for row in preset_manager.get_preset_details_page()
+            ])
+        response.set_etag(etag)
+        response.cache_control.no_cache = True
+        return response
+    except Exception as exc:  # noqa: BLE001
+        return jsonify({"error": str(exc)}), 500
+
+
+def _iter_ndjson(after, categories):
+    """不分页时按块读取全部预设，边读边输出。"""
+    while True:
+        rows = preset_manager.get_preset_details_page(after, DETAILS_STREAM_CHUNK)
+        yield from _ndjson_lines(rows, categories)
+        if len(rows) < DETAILS_STREAM_CHUNK:
+            return
+        after = (rows[-1]["mtime_ns"], rows[-1]["name"])
+
+
+def _ndjson_lines(rows, categories):
+    for row in rows:
+        yield json.dumps(_detail_item(row, categories), ensure_ascii=False) + "\n"
+
+
+def _detail_item(row: dict, categories: list[str]) -> dict:
+    return {
+        "name": row["name"],
+        "modified_time": datetime.fromtimestamp(row["mtime_ns"] / 1e9).isoformat(),
+        "data": _project(row["data"], categories),
+    }
+
+
+def _project(data, categories: list[str]):
+    if not categories or not isinstance(data, dict):
+        return data
+    return subset_categories(data, categories)
+
+
+def _encode_cursor(row: dict) -> str:
+    raw = json.dumps([row["mtime_ns"], row["name"]], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        mtime_ns, name = json.loads(raw.decode("utf-8"))
+        if isinstance(mtime_ns, int) and isinstance(name, str):
+            return mtime_ns, name
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+@bp.get("/api/presets/search")
+def search_presets():
+    """q 支持 `lighting:逆光` 分字段条件；scope 为空时检索全局预设。"""
+    query = request.args.get("q", "").strip()
+    scope = request.args.get("scope", "")
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+    if scope and scope not in CATEGORY_PRESET_SCOPES:
+        return jsonify({"error": "未知的预设分类"}), 404
+    if not query:
+        return jsonify([])
+    try:
+        results = preset_manager.search_presets(query, scope, limit=limit)
+        for preset in results:
+            preset["modified_time"] = preset["modified_time"].isoformat()
+        return jsonify(results)
     except Exception as exc:  # noqa: BLE001
         return jsonify({"error": str(exc)}), 500
 
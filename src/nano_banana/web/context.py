@@ -1,11 +1,35 @@
-"""Web 共享管理器。"""
+"""Web 共享管理器。
+
+设置了 NANO_BANANA_SHARED_STATE_DIR（serve --workers 大于 1 时自动设置）时，
+任务状态写进该目录下的 SQLite 库、生成的图片同时落盘，多个 worker 进程都能查到。
+"""
+import os
+from pathlib import Path
 
 from nano_banana.core.config import AIConfigManager
+from nano_banana.core.images.provider_config import provider_concurrency_limits
+from nano_banana.core.images.store import DEFAULT_STORE_BYTES, ImageStore
+from nano_banana.core.jobs import JobManager
 from nano_banana.core.presets import PresetManager
+from nano_banana.core.storage.sqlite import SqliteJobStore
 from nano_banana.core.schema import get_schema
 from nano_banana.core.yaml_handler import YamlHandler
 
+
+shared_state_dir = os.environ.get("NANO_BANANA_SHARED_STATE_DIR", "").strip()
+shared_state_path = Path(shared_state_dir) if shared_state_dir else None
+
 yaml_handler = YamlHandler()
 preset_manager = PresetManager()
 config_manager = AIConfigManager()
+job_manager = JobManager(
+    max_workers=int(os.environ.get("NANO_BANANA_JOB_WORKERS") or 8),
+    provider_limits=provider_concurrency_limits(),
+    store=SqliteJobStore(shared_state_path / "jobs.sqlite3") if shared_state_path else None,
+)
+image_store = ImageStore(
+    max_bytes=int(os.environ.get("NANO_BANANA_IMAGE_STORE_MB") or 0) * 1024 * 1024
+    or DEFAULT_STORE_BYTES,
+    directory=shared_state_path / "images" if shared_state_path else None,
+)
 CATEGORY_PRESET_SCOPES = set(get_schema().category_ids)
@@ -0,0 +1,208 @@
+"""nano-banana-web 命令行入口。
+
+    nano-banana-web                 # 开发服务器（Werkzeug，debug + 自动重载），同以前
+    nano-banana-web serve [选项]     # 生产模式：gunicorn gthread，多进程 × 多线程
+    nano-banana-web serve --asgi    # uvicorn + 异步对话流（见 web/asgi.py）
+    nano-banana-web serve --dev     # 用 serve 的地址参数启动开发服务器
+
+生产模式的参数也可用环境变量给出：NANO_BANANA_WEB_HOST / _PORT / _WORKERS /
+_THREADS / _TIMEOUT / _GRACEFUL_TIMEOUT。收到 SIGTERM 后停止接收新连接，
+在 graceful-timeout 内等进行中的请求（含 SSE）和后台生图任务结束再退出。
+
+--workers 大于 1 时，任务状态与生成的图片写进 --shared-dir（默认 data/shared，
+也可用 NANO_BANANA_SHARED_STATE_DIR 指定）：任务仍在提交它的进程里执行，
+但 /api/jobs 与 /api/images 落到任一 worker 都能查到，不需要粘性路由。
+各 worker 的渠道并发上限是分开计算的。配置、选项与预设本来就可被多个 worker 共享。
+--timeout 只作用于 gunicorn（重启卡死的 worker），uvicorn 没有对应机制。
+"""
+from __future__ import annotations
+
+import argparse
+import os
+from typing import Any, Optional
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 5000
+DEFAULT_WORKERS = 1
+DEFAULT_THREADS = 32
+# 单次生图可能要几分钟；gthread 下 timeout 只针对卡死的 worker，不限制单个请求时长
+DEFAULT_TIMEOUT = 300
+DEFAULT_GRACEFUL_TIMEOUT = 120
+DEFAULT_SHARED_DIR = "data/shared"
+SHARED_STATE_ENV = "NANO_BANANA_SHARED_STATE_DIR"
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name, "").strip()
+    return int(value) if value.isdigit() else default
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="nano-banana-web", description="Nano Banana Web 服务")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser("serve", help="以生产模式（gunicorn）启动")
+    serve.add_argument("--host", default=os.environ.get("NANO_BANANA_WEB_HOST") or DEFAULT_HOST)
+    serve.add_argument(
+        "--port", type=int, default=_env_int("NANO_BANANA_WEB_PORT", DEFAULT_PORT)
+    )
+    serve.add_argument(
+        "--workers",
+        type=int,
+        default=_env_int("NANO_BANANA_WEB_WORKERS", DEFAULT_WORKERS),
+        help="worker 进程数；大于 1 时任务与图片经 --shared-dir 在进程间共享",
+    )
+    serve.add_argument(
+        "--threads",
+        type=int,
+        default=_env_int("NANO_BANANA_WEB_THREADS", DEFAULT_THREADS),
+        help="每个 worker 的线程数，即同时保持的请求 / SSE 连接数",
+    )
+    serve.add_argument(
+        "--timeout",
+        type=int,
+        default=_env_int("NANO_BANANA_WEB_TIMEOUT", DEFAULT_TIMEOUT),
+        help="worker 无响应多少秒后被重启（仅 gunicorn，--asgi 时忽略）",
+    )
+    serve.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=_env_int("NANO_BANANA_WEB_GRACEFUL_TIMEOUT", DEFAULT_GRACEFUL_TIMEOUT),
+        help="退出时等待进行中请求与生图任务的秒数",
+    )
+    serve.add_argument(
+        "--asgi",
+        action="store_true",
+        help="用 uvicorn 运行 ASGI 入口：对话流走异步，不再每条流占一个线程",
+    )
+    serve.add_argument(
+        "--shared-dir",
+        default=os.environ.get(SHARED_STATE_ENV, ""),
+        help=f"多 worker 共享任务状态与图片的目录（默认 {DEFAULT_SHARED_DIR}）",
+    )
+    serve.add_argument("--dev", action="store_true", help="改用开发服务器（debug + 自动重载）")
+    return parser
+
+
+def prepare_shared_state(args: argparse.Namespace) -> str:
+    """多 worker 时确定共享目录并写入环境变量，worker 进程创建应用时据此共享任务与图片。
+
+    返回共享目录；单 worker 且未指定时返回空串，任务与图片只放内存。
+    """
+    shared_dir = args.shared_dir
+    if not shared_dir and args.workers > 1:
+        from nano_banana.core.resource_path import get_resource_path
+
+        shared_dir = str(get_resource_path(DEFAULT_SHARED_DIR))
+    if shared_dir:
+        os.environ[SHARED_STATE_ENV] = shared_dir
+    return shared_dir
+
+
+def gunicorn_options(args: argparse.Namespace) -> dict[str, Any]:
+    """命令行参数 → gunicorn 配置项。"""
+    return {
+        "bind": f"{args.host}:{args.port}",
+        "workers": max(1, args.workers),
+        "threads": max(1, args.threads),
+        "worker_class": "gthread",
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "keepalive": 5,
+        # 不预加载：应用（及其中的 SQLite 连接、线程池）在各 worker fork 之后再创建
+        "preload_app": False,
+        "worker_exit": _drain_jobs,
+    }
+
+
+def _drain_jobs(server, worker) -> None:
+    """worker 退出前等后台生图任务跑完；进行中的请求此时已由 gunicorn 处理完毕。"""
+    from nano_banana.web.context import job_manager
+
+    active = job_manager.active_count()
+    if active:
+        server.log.info("等待 %d 个生图任务完成后退出 (pid %s)", active, worker.pid)
+    if not job_manager.drain(server.cfg.graceful_timeout):
+        server.log.warning("生图任务未在 %ss 内完成，强制退出", server.cfg.graceful_timeout)
+    job_manager.shutdown(wait=False)
+
+
+def uvicorn_options(args: argparse.Namespace) -> dict[str, Any]:
+    """命令行参数 → uvicorn.run 参数。对话流不占线程，threads 只用于桥接 Flask 的其他接口。
+
+    --timeout 是 gunicorn 的卡死 worker 检测，uvicorn 没有对应项，这里不传。
+    """
+    return {
+        "host": args.host,
+        "port": args.port,
+        "workers": max(1, args.workers),
+        "timeout_keep_alive": 5,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "lifespan": "on",
+    }
+
+
+def run_asgi(args: argparse.Namespace) -> int:
+    try:
+        import a2wsgi  # noqa: F401
+        import uvicorn
+    except ImportError:
+        print('未安装 ASGI 依赖：pip install -e ".[web,asgi]"')
+        return 1
+
+    options = uvicorn_options(args)
+    # 多 worker 时子进程按字符串重新导入应用，参数经环境变量传过去
+    os.environ["NANO_BANANA_WEB_THREADS"] = str(max(1, args.threads))
+    os.environ["NANO_BANANA_WEB_GRACEFUL_TIMEOUT"] = str(args.graceful_timeout)
+    print(f"Nano Banana Web (ASGI): http://{args.host}:{args.port} ({options['workers']} worker)")
+    uvicorn.run("nano_banana.web.asgi:application", **options)
+    return 0
+
+
+def run_production(args: argparse.Namespace) -> int:
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print('未安装 gunicorn（不支持 Windows）：pip install -e ".[web]"，或加 --dev 使用开发服务器')
+        return 1
+
+    class NanoBananaServer(BaseApplication):
+        def __init__(self, options: dict[str, Any]):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from nano_banana.web.app import app
+
+            return app
+
+    options = gunicorn_options(args)
+    print(
+        f"Nano Banana Web: http://{args.host}:{args.port} "
+        f"({options['workers']} worker × {options['threads']} 线程)"
+    )
+    NanoBananaServer(options).run()
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command != "serve" or args.dev:
+        from nano_banana.web.app import main as run_dev_server
+
+        if args.command == "serve":
+            run_dev_server(host=args.host, port=args.port)
+        else:
+            run_dev_server()
+        return 0
+    shared_dir = prepare_shared_state(args)
+    if shared_dir:
+        print(f"任务状态与生成的图片在 worker 间共享: {shared_dir}")
+    return run_asgi(args) if args.asgi else run_production(args)
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -189,12 +189,34 @@ function openAiModal(mode) {
     if (mode === 'generate') {
         elements.aiModalTitle.textContent = 'AI 生成提示词';
         elements.aiModalLabel.textContent = '描述你想要的画面';
+        elements.aiScopeGroup.style.display = 'none';
     } else {
         elements.aiModalTitle.textContent = 'AI 修改提示词';
         elements.aiModalLabel.textContent = '描述修改要求';
+        renderAiScopeOptions();
+        elements.aiScopeGroup.style.display = '';
     }
 }
 
+// 修改范围：只把勾选分类的切片发给 AI，服务端合并时其余分类保持不变
+function renderAiScopeOptions() {
+    elements.aiScopeOptions.innerHTML = '';
+    (window.PROMPT_SCHEMA?.categories || []).forEach(category => {
+        const label = document.createElement('label');
+        const checkbox = document.createElement('input');
+        checkbox.type = 'checkbox';
+        checkbox.value = category.id;
+        label.appendChild(checkbox);
+        label.appendChild(document.createTextNode(category.label));
+        elements.aiScopeOptions.appendChild(label);
+    });
+}
+
+function selectedAiScope() {
+    const checked = elements.aiScopeOptions.querySelectorAll('input[type="checkbox"]:checked');
+    return checked.length ? Array.from(checked, checkbox => checkbox.value) : null;
+}
+
 async function handleAiExecute() {
     const prompt = elements.aiPromptInput.value.trim();
     if (!prompt) {
@@ -235,6 +257,9 @@ async function handleAiExecute() {
         } else {
             body.current_data = elements.jsonPreviewText.value;
             body.modify_request = prompt;
+            // 勾选局部修改时只让模型返回改动的字段，服务端校验合并后以 result 事件下发完整文档
+            body.mode = elements.aiPatchMode.checked ? 'patch' : 'full';
+            body.categories = selectedAiScope();
         }
 
         const response = await fetch(url, {
@@ -260,6 +285,9 @@ async function handleAiExecute() {
         let fullContent = '';
         const sseParser = new SseStream.SseEventParser();
         let receivedDone = false;
+        let parsedFieldCount = 0;
+        let invalidMessage = '';
+        let patchedData = null;
 
         while (true) {
             const { done, value } = await reader.read();
@@ -269,7 +297,7 @@ async function handleAiExecute() {
             for (const dataStr of dataEvents) {
 
                     if (dataStr === '[DONE]') {
-                        aiFinalStatus = '生成完成';
+                        aiFinalStatus = invalidMessage ? `生成完成，但输出格式异常：${invalidMessage}` : '生成完成';
                         receivedDone = true;
                         elements.aiModalStopBtn.style.display = 'none';
                         elements.aiModalApplyBtn.style.display = 'inline-block';
@@ -291,7 +319,7 @@ async function handleAiExecute() {
                                      }
                                 }
                                 
-                                const newData = JSON.parse(jsonText);
+                                const newData = patchedData || JSON.parse(jsonText);
                                 const currentData = getFormData();
                                 const changes = diffJson(currentData, newData);
                                 
@@ -316,10 +344,23 @@ async function handleAiExecute() {
                                 streamStatusText = thinkingStatusText;
                             }
                         } else if (event.type === 'content') {
-                            streamStatusText = '';
+                            if (!invalidMessage) {
+                                streamStatusText = parsedFieldCount ? `已解析 ${parsedFieldCount} 个字段` : '';
+                            }
                             fullContent += event.content;
                             elements.aiResponsePreview.value = fullContent;
                             elements.aiResponsePreview.scrollTop = elements.aiResponsePreview.scrollHeight;
+                        } else if (event.type === 'field') {
+                            parsedFieldCount += 1;
+                            if (!invalidMessage) {
+                                streamStatusText = `已解析 ${parsedFieldCount} 个字段`;
+                            }
+                        } else if (event.type === 'result') {
+                            patchedData = event.result;
+                        } else if (event.type === 'invalid') {
+                            // 服务端增量解析发现输出不是合法 JSON：不必等结束再报错
+                            invalidMessage = event.message;
+                            streamStatusText = `AI 输出格式异常：${invalidMessage}`;
                         }
                     }
             }
@@ -489,6 +489,9 @@ async function generateImage() {
         return;
     }
 
+    const variantCountSelect = document.getElementById('imageVariantCount');
+    const variantCount = variantCountSelect ? parseInt(variantCountSelect.value, 10) || 1 : 1;
+
     state.isGenerating = true;
     state.imageGenAbortController = new AbortController();
     updateImageGenerationAvailability();
@@ -521,7 +524,8 @@ async function generateImage() {
                 images: state.uploadedImages,
                 provider,
                 model,
-                options: collectImageOptions()
+                options: collectImageOptions(),
+                variants: variantCount > 1 ? variantCount : undefined
             }),
             signal: state.imageGenAbortController.signal
         });
@@ -535,10 +539,36 @@ async function generateImage() {
             data = null;
         }
 
-        if (response.ok && data && data.image) {
-            state.generationHistory.push(data.image);
-            if (state.generationHistory.length > 8) state.generationHistory.shift();
-            renderGenerationResult(data.image);
+        if (response.ok && data && data.job_id) {
+            // 多张变体逐张到达：每完成一张就进历史并展示
+            let received = 0;
+            const showPartial = partial => {
+                // 流式预览帧（OpenAI Images / 豆包）：替换骨架屏，最终图到达前先看到雏形
+                if (received || !partial.image_url) return;
+                let preview = generatingState.querySelector('.generated-img');
+                if (!preview) {
+                    preview = document.createElement('img');
+                    preview.className = 'generated-img';
+                    preview.alt = '生成预览';
+                    skeleton.replaceWith(preview);
+                }
+                preview.src = partial.image_url;
+            };
+            const errors = await followImageJobs(data, state.imageGenAbortController.signal, result => {
+                received += 1;
+                pushGenerationResult(imageResultEntry(result));
+                if (variantCount > 1) {
+                    elapsedText.textContent = `已完成 ${received}/${variantCount} 张，其余仍在生成`;
+                }
+            }, showPartial);
+            if (!received) throw new Error(errors[0] || '生成失败');
+            if (errors.length) {
+                showToast(`${received} 张生成成功，${errors.length} 张失败: ${errors[0]}`, 'warning');
+            } else {
+                showToast('图片生成成功!', 'success');
+            }
+        } else if (response.ok && data && (data.image_url || data.image)) {
+            pushGenerationResult(imageResultEntry(data));
             showToast('图片生成成功!', 'success');
         } else {
             throw new Error(
@@ -585,11 +615,73 @@ async function generateImage() {
     }
 }
 
+/**
+ * 订阅后台生图任务的 SSE 事件，直到所有任务 done/failed。
+ * 任务在服务端排队执行，请求本身不再占住 worker 等待上游；
+ * 多个变体按完成顺序回调 onResult，流式预览帧回调 onPartial，返回失败信息列表。
+ */
+async function followImageJobs(submission, signal, onResult, onPartial = null) {
+    const pending = new Set((submission.jobs || [submission]).map(job => job.job_id));
+    const errors = [];
+    const response = await fetch(submission.events_url, { signal });
+    if (!response.ok || !response.body) {
+        throw new Error(`任务状态获取失败 (HTTP ${response.status} ${response.statusText})`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const sseParser = new SseStream.SseEventParser();
+    while (pending.size) {
+        const { done, value } = await reader.read();
+        const chunks = done
+            ? sseParser.finish(decoder.decode())
+            : sseParser.push(decoder.decode(value, { stream: true }));
+        for (const chunk of chunks) {
+            const update = JSON.parse(chunk);
+            if (!pending.has(update.id)) continue;
+            if (onPartial) {
+                (update.events || [])
+                    .filter(event => event.type === 'partial')
+                    .forEach(onPartial);
+            }
+            if (update.status === 'done') {
+                pending.delete(update.id);
+                onResult(update.result);
+            } else if (update.status === 'failed') {
+                pending.delete(update.id);
+                errors.push(update.error || '生成失败');
+            }
+        }
+        if (done) break;
+    }
+    if (pending.size) errors.push('任务事件流意外结束');
+    return errors;
+}
+
+/**
+ * 服务端结果 → 历史条目。图片走 /api/images/<id> 二进制下发（可缓存、支持 Range），
+ * 缩略图条用 ?size= 小图；旧接口返回的 dataURL 仍然兼容。
+ */
+function imageResultEntry(result) {
+    const src = result.image_url || result.image;
+    return {
+        src,
+        thumb: result.thumbnail_url || src,
+        mimeType: result.mime_type || ''
+    };
+}
+
+function pushGenerationResult(entry) {
+    state.generationHistory.push(entry);
+    if (state.generationHistory.length > 8) state.generationHistory.shift();
+    renderGenerationResult(entry);
+}
+
 /**
  * 渲染生成结果：大图 + 下载按钮 + 历史缩略图条。
  * 用 DOM 构建，避免把几 MB 的 dataURL 写进 HTML 属性。
  */
-function renderGenerationResult(src) {
+function renderGenerationResult(entry) {
+    const src = entry.src;
     state.currentGeneratedImage = src;
     elements.resultPreview.classList.remove('has-error');
 
@@ -602,7 +694,7 @@ function renderGenerationResult(src) {
     img.src = src;
     img.alt = '生成结果';
     img.className = 'generated-img';
-    img.addEventListener('click', () => openImagePreview(src));
+    img.addEventListener('click', () => openImagePreview(src, entry.mimeType));
     const hint = document.createElement('div');
     hint.className = 'img-zoom-hint';
     hint.textContent = '🔍 点击放大';
@@ -616,7 +708,7 @@ function renderGenerationResult(src) {
     downloadBtn.type = 'button';
     downloadBtn.className = 'btn btn-secondary btn-sm';
     downloadBtn.textContent = '下载图片';
-    downloadBtn.addEventListener('click', () => downloadImage(src));
+    downloadBtn.addEventListener('click', () => downloadImage(src, entry.mimeType));
     actions.appendChild(downloadBtn);
     container.appendChild(actions);
 
@@ -626,8 +718,9 @@ function renderGenerationResult(src) {
         strip.setAttribute('aria-label', '生成历史');
         state.generationHistory.forEach((item, idx) => {
             const thumb = document.createElement('img');
-            thumb.src = item;
-            thumb.className = 'result-history-thumb' + (item === src ? ' is-active' : '');
+            thumb.src = item.thumb;
+            thumb.loading = 'lazy';
+            thumb.className = 'result-history-thumb' + (item === entry ? ' is-active' : '');
             thumb.alt = `历史结果 ${idx + 1}`;
             thumb.title = `查看第 ${idx + 1} 张`;
             thumb.addEventListener('click', () => renderGenerationResult(item));
@@ -639,7 +732,7 @@ function renderGenerationResult(src) {
     elements.resultPreview.replaceChildren(container);
 }
 
-function openImagePreview(src) {
+function openImagePreview(src, mimeType = '') {
     const modal = document.getElementById('imagePreviewModal');
     const img = document.getElementById('fullImagePreview');
     const downloadBtn = document.getElementById('downloadFullImageBtn');
@@ -657,21 +750,22 @@ function openImagePreview(src) {
         
         // Setup download button in modal
         if (downloadBtn) {
-            downloadBtn.onclick = () => downloadImage(src);
+            downloadBtn.onclick = () => downloadImage(src, mimeType);
         }
     }
 }
 
-function downloadImage(dataUrl) {
-    if (!dataUrl) return;
+function downloadImage(src, mimeType = '') {
+    if (!src) return;
     
     const link = document.createElement('a');
-    link.href = dataUrl;
+    link.href = src;
     
     // Determine extension
+    const type = mimeType || (src.startsWith('data:') ? src.slice(5, src.indexOf(';')) : '');
     let ext = 'png';
-    if (dataUrl.startsWith('data:image/jpeg')) ext = 'jpg';
-    if (dataUrl.startsWith('data:image/webp')) ext = 'webp';
+    if (type === 'image/jpeg') ext = 'jpg';
+    if (type === 'image/webp') ext = 'webp';
     
     link.download = `generated-${new Date().getTime()}.${ext}`;
     document.body.appendChild(link);
@@ -13,7 +13,7 @@ const state = {
     uploadedImages: [], // Base64 strings
     isGenerating: false,
     imageGenAbortController: null,
-    generationHistory: [] // 本次会话生成的图片 dataURL，最新在末尾
+    generationHistory: [] // 本次会话生成的图片 {src, thumb, mimeType}，最新在末尾
 };
 
 const DEFAULT_NEGATIVE_PROMPT = '水印、签名、文字';
@@ -174,6 +174,9 @@ const elements = {
     aiModalTitle: document.getElementById('aiModalTitle'),
     aiModalLabel: document.getElementById('aiModalLabel'),
     aiPromptInput: document.getElementById('aiPromptInput'),
+    aiScopeGroup: document.getElementById('aiScopeGroup'),
+    aiScopeOptions: document.getElementById('aiScopeOptions'),
+    aiPatchMode: document.getElementById('aiPatchMode'),
     // aiProgress: document.getElementById('aiProgress'), // Removed
     
     // AI Modal New Elements
@@ -56,6 +56,15 @@
         if (typeof payload.content === 'string' && payload.content) {
             return { type: 'content', content: payload.content };
         }
+        if (payload.field && typeof payload.field.id === 'string') {
+            return { type: 'field', field: payload.field };
+        }
+        if (typeof payload.invalid === 'string') {
+            return { type: 'invalid', message: payload.invalid };
+        }
+        if (payload.result && typeof payload.result === 'object') {
+            return { type: 'result', result: payload.result };
+        }
         return { type: 'ignore' };
     }
 
@@ -3,6 +3,7 @@ import tempfile
 import types
 import unittest
 from pathlib import Path
+from unittest.mock import patch
 
 import yaml
 
@@ -228,6 +229,53 @@ class AIConfigManagerTests(unittest.TestCase):
         self.assertEqual(written["chat"]["model"], "new-chat-model")
         self.assertEqual(written["chat"]["api_key"], "chat-key")
 
+    def test_getters_reuse_snapshot_until_file_changes(self):
+        self._write({"base_url": "https://chat.example/v1", "api_key": "chat-key"})
+        with patch("yaml.load", wraps=yaml.load) as load:
+            self.manager.get_chat_config()
+            self.manager.get_image_providers_with_api_key()
+            self.manager.is_image_provider_configured("gemini")
+            self.assertEqual(load.call_count, 1)
+
+            self._write({"base_url": "https://chat.example/v1", "api_key": "other-key-changed"})
+            self.assertEqual(self.manager.get_chat_config()["api_key"], "other-key-changed")
+            self.assertEqual(load.call_count, 2)
+
+    def test_loaded_config_is_a_copy(self):
+        self._write({"api_key": "chat-key"})
+        config = self.manager.load_config()
+        config["api_key"] = "mutated"
+        config["image_generation_options"]["gemini"] = {}
+        self.assertEqual(self.manager.get_api_key(), "chat-key")
+        self.assertEqual(self.manager.load_config()["image_generation_options"], {})
+
+    def test_unchanged_save_does_not_rewrite_file(self):
+        self.manager.set_active_image_selection("qwen_image", "qwen-model")
+        with patch.object(self.manager, "_write_locked", wraps=self.manager._write_locked) as write:
+            self.assertTrue(self.manager.set_active_image_selection("qwen_image", "qwen-model"))
+            self.assertEqual(write.call_count, 0)
+
+    def test_batch_coalesces_writes(self):
+        self._write({"api_key": "chat-key"})
+        with patch.object(self.manager, "_write_locked", wraps=self.manager._write_locked) as write:
+            with self.manager.batch():
+                self.manager.set_active_image_selection("doubao_image", "seedream")
+                self.manager.save_image_generation_options(
+                    "doubao_image", "seedream", {"image_size": "2K"}
+                )
+                self.assertEqual(self.manager.get_image_provider(), "doubao_image")
+                self.assertEqual(write.call_count, 0)
+            self.assertEqual(write.call_count, 1)
+
+        written = yaml.safe_load(self.manager.config_path.read_text(encoding="utf-8"))
+        self.assertEqual(written["image"]["active"], "doubao_image")
+        self.assertEqual(written["image"]["providers"]["doubao_image"]["model"], "seedream")
+        self.assertEqual(
+            written["image"]["options"]["doubao_image"]["seedream"], {"image_size": "2K"}
+        )
+        self.assertEqual(written["chat"]["api_key"], "chat-key")
+        self.assertEqual(list(self.manager.config_path.parent.glob("*.tmp")), [])
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import base64
+import inspect
+import json
+from io import BytesIO
+from contextlib import nullcontext
+from unittest.mock import patch
+
+import httpx
+from openai import AsyncOpenAI
+from PIL import Image
+
+from nano_banana.core.images import (
+    DoubaoImageProvider,
+    ImageProvider,
+    QwenImageProvider,
+    create_image_provider_from_credentials,
+)
+
+
+def _png_bytes(size=(3, 2)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_all_providers_implement_async_protocol():
+    for provider in ("gemini", "openai_images", "qwen_image", "doubao_image"):
+        client = create_image_provider_from_credentials(
+            provider, "https://example.test/api/v1", "test-key", "model"
+        )
+        assert isinstance(client, ImageProvider)
+        assert inspect.iscoroutinefunction(client.agenerate_image)
+
+
+def test_doubao_agenerate_image_uses_async_client():
+    provider = DoubaoImageProvider(
+        base_url="https://ark.cn-beijing.volces.com/api/v3",
+        api_key="test-key",
+        model="doubao-seedream-5-0-pro-260628",
+    )
+    captured = {}
+
+    async def handle_request(request):
+        captured["path"] = request.url.path
+        captured["body"] = json.loads(request.content)
+        return httpx.Response(
+            200,
+            json={"data": [{"b64_json": base64.b64encode(_png_bytes()).decode("ascii")}]},
+        )
+
+    async def run():
+        client = AsyncOpenAI(
+            api_key="test-key",
+            base_url=provider.base_url,
+            http_client=httpx.AsyncClient(transport=httpx.MockTransport(handle_request)),
+        )
+        with patch(
+            "nano_banana.core.images.doubao.shared_async_openai_client",
+            return_value=nullcontext(client),
+        ):
+            try:
+                return await provider.agenerate_image("test prompt")
+            finally:
+                await client.close()
+
+    generated = asyncio.run(run())
+
+    assert generated.size == (3, 2)
+    assert captured["path"] == "/api/v3/images/generations"
+    assert captured["body"]["prompt"] == "test prompt"
+
+
+def test_qwen_agenerate_image_retries_transient_errors_and_downloads():
+    provider = QwenImageProvider(
+        base_url="https://qwen.example/api/v1",
+        api_key="qwen-key",
+        model="qwen-image-3.0-pro",
+    )
+    calls = []
+
+    async def handle_request(request):
+        calls.append((request.method, request.url.path))
+        if request.method == "GET":
+            return httpx.Response(200, content=_png_bytes((4, 4)))
+        if len(calls) == 1:
+            return httpx.Response(503, json={"code": "Busy", "message": "retry"})
+        return httpx.Response(
+            200,
+            json={
+                "output": {
+                    "choices": [
+                        {"message": {"content": [{"image": "https://oss.example/out.png"}]}}
+                    ]
+                }
+            },
+        )
+
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handle_request))
+        with (
+            patch(
+                "nano_banana.core.images.qwen.shared_async_http_client",
+                return_value=nullcontext(client),
+            ),
+            patch("nano_banana.core.images.qwen.asyncio.sleep"),
+        ):
+            try:
+                return await provider.agenerate_image("test prompt")
+            finally:
+                await client.aclose()
+
+    generated = asyncio.run(run())
+
+    assert generated.size == (4, 4)
+    assert [method for method, _ in calls] == ["POST", "POST", "GET"]
@@ -0,0 +1,108 @@
+import asyncio
+import time
+
+import pytest
+
+from nano_banana.core.chat import (
+    ChatEvent,
+    ChunkCoalescer,
+    acoalesce_events,
+    coalesce_events,
+    coalesce_settings,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_coalescer_sends_the_first_chunk_then_batches_within_the_window():
+    clock = FakeClock()
+    coalescer = ChunkCoalescer(0.05, 10, clock=clock)
+    assert coalescer.push("a") == "a"
+    assert coalescer.push("b") == ""
+    clock.now += 0.02
+    assert coalescer.push("c") == ""
+    assert coalescer.time_left() == pytest.approx(0.03)
+    clock.now += 0.03
+    assert coalescer.push("d") == "bcd"
+    assert coalescer.time_left() is None
+    assert coalescer.push("0123456789") == "0123456789"
+
+
+def test_coalescer_without_a_window_only_flushes_on_size():
+    coalescer = ChunkCoalescer(0, 4)
+    assert [coalescer.push(text) for text in "abcde"] == ["", "", "", "abcd", ""]
+    assert coalescer.time_left() is None
+    assert coalescer.flush() == "e"
+    assert not ChunkCoalescer(0, 0).enabled
+
+
+def _events(*texts):
+    for text in texts:
+        if text.startswith("!"):
+            yield ChatEvent(text[1:], data={"id": text})
+        else:
+            yield ChatEvent("content", text)
+    yield ChatEvent("done", "".join(t for t in texts if not t.startswith("!")))
+
+
+def test_coalesce_events_merges_content_but_keeps_other_events_in_order():
+    events = list(
+        coalesce_events(_events("a", "b", "c", "!field", "d", "e"), window=60, max_chars=1000)
+    )
+    assert [(event.type, event.text) for event in events] == [
+        ("content", "a"),
+        ("content", "bc"),
+        ("field", ""),
+        ("content", "de"),
+        ("done", "abcde"),
+    ]
+
+
+def test_coalesce_events_passes_through_when_disabled(monkeypatch):
+    monkeypatch.setenv("NANO_BANANA_STREAM_COALESCE_MS", "0")
+    monkeypatch.setenv("NANO_BANANA_STREAM_COALESCE_CHARS", "0")
+    assert coalesce_settings() == (0, 0)
+    events = list(coalesce_events(_events("a", "b")))
+    assert [event.text for event in events] == ["a", "b", "ab"]
+
+
+def test_closing_the_coalesced_stream_closes_the_source():
+    closed = []
+
+    def source():
+        try:
+            yield from _events("a", "b", "c")
+        finally:
+            closed.append(True)
+
+    stream = coalesce_events(source(), window=60)
+    assert next(stream).text == "a"
+    stream.close()
+    assert closed == [True]
+
+
+def test_async_coalescing_flushes_when_the_window_expires():
+    async def source():
+        for text in ("a", "b", "c"):
+            yield ChatEvent("content", text)
+        await asyncio.sleep(0.5)
+        yield ChatEvent("content", "d")
+        yield ChatEvent("done", "abcd")
+
+    async def collect():
+        start = time.monotonic()
+        return [
+            (event.text, time.monotonic() - start)
+            async for event in acoalesce_events(source(), window=0.05, max_chars=1000)
+        ]
+
+    received = asyncio.run(collect())
+    assert [text for text, _ in received] == ["a", "bc", "d", "abcd"]
+    # 上游停顿期间攒着的内容在时间窗到期时就发出，不等下一个 token
+    assert received[1][1] < 0.3
@@ -0,0 +1,139 @@
+import asyncio
+
+from nano_banana.core.client_pool import ClientPool, api_key_fingerprint
+from nano_banana.core.images import create_image_provider_from_credentials
+
+
+class _Closable:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def _get(pool, key):
+    with pool.lease(key, _Closable) as client:
+        return client
+
+
+def test_pool_reuses_client_for_same_key():
+    pool = ClientPool()
+    first = _get(pool, ("a",))
+    second = _get(pool, ("a",))
+
+    assert first is second
+    assert _get(pool, ("b",)) is not first
+
+
+def test_pool_evicts_and_closes_idle_clients():
+    pool = ClientPool(idle_timeout=-1)
+    client = _get(pool, ("a",))
+
+    assert pool.evict_idle() == 1
+    assert client.closed
+    assert len(pool) == 0
+
+
+def test_pool_closes_least_recently_used_when_full():
+    pool = ClientPool(max_clients=2)
+    first = _get(pool, ("a",))
+    second = _get(pool, ("b",))
+    _get(pool, ("a",))
+    _get(pool, ("c",))
+
+    assert not first.closed
+    assert second.closed
+    assert len(pool) == 2
+
+
+def test_capacity_eviction_skips_clients_in_flight():
+    pool = ClientPool(max_clients=1)
+    with pool.lease(("a",), _Closable) as busy:
+        newcomer = _get(pool, ("b",))
+        assert not busy.closed
+        assert len(pool) == 2
+        _get(pool, ("c",))
+        assert newcomer.closed
+        assert not busy.closed
+
+
+def test_fingerprint_hides_api_key():
+    assert "secret-key" not in api_key_fingerprint("secret-key")
+    assert api_key_fingerprint("a") != api_key_fingerprint("b")
+
+
+def test_providers_share_openai_client_per_credentials():
+    args = ("doubao_image", "https://ark.example/api/v3", "pool-key", "model-a")
+    first = create_image_provider_from_credentials(*args)
+    second = create_image_provider_from_credentials(*args[:3], "model-b")
+    other = create_image_provider_from_credentials(*args[:2], "other-key", "model-a")
+
+    assert first is not second
+    with first._lease_client() as a, second._lease_client() as b, other._lease_client() as c:
+        assert a is b
+        assert c is not a
+
+
+def test_leased_clients_survive_idle_and_capacity_eviction():
+    pool = ClientPool(idle_timeout=-1, max_clients=1)
+    with pool.lease(("a",), _Closable) as leased:
+        other = _get(pool, ("b",))
+        assert pool.evict_idle() == 1
+        assert other.closed
+        assert not leased.closed
+        assert pool.in_use() == 1
+
+    assert pool.in_use() == 0
+    assert pool.evict_idle() == 1
+    assert leased.closed
+
+
+def test_chat_clients_are_keyed_by_base_url_key_and_timeout():
+    from nano_banana.core.client_pool import chat_client, get_client_pool
+
+    get_client_pool().clear()
+    try:
+        with chat_client(base_url="https://a.test/v1/", api_key="k", timeout=180) as first:
+            pass
+        with chat_client(base_url="https://a.test/v1", api_key="k", timeout=180) as again:
+            assert again is first
+        with chat_client(base_url="https://a.test/v1", api_key="k", timeout=30) as shorter:
+            assert shorter is not first
+        with chat_client(base_url="https://a.test/v1", api_key="other", timeout=180) as rotated:
+            assert rotated is not first
+    finally:
+        get_client_pool().clear()
+
+
+class _AsyncClosable:
+    def __init__(self):
+        self.closed = False
+
+    async def aclose(self):
+        self.closed = True
+
+
+def test_async_clients_are_closed_on_their_loop_and_dropped_with_it():
+    pool = ClientPool(idle_timeout=-1)
+
+    async def use_client():
+        loop = asyncio.get_running_loop()
+        with pool.lease(("x", loop), _AsyncClosable, loop=loop) as client:
+            pass
+        assert pool.evict_idle() == 1
+        await asyncio.sleep(0.01)
+        return client
+
+    assert asyncio.run(use_client()).closed
+
+    async def lease_only():
+        loop = asyncio.get_running_loop()
+        with pool.lease(("y", loop), _AsyncClosable, loop=loop):
+            pass
+
+    pool.idle_timeout = 3600
+    asyncio.run(lease_only())
+    assert len(pool) == 1
+    _get(pool, ("sync",))
+    assert len(pool) == 1
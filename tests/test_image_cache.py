@@ -0,0 +1,103 @@
+import threading
+
+from PIL import Image
+
+from nano_banana.core.images import cache as cache_module
+from nano_banana.core.images.cache import (
+    CachedImageProvider,
+    ImageResultCache,
+    request_fingerprint,
+)
+from nano_banana.core.images.fanout import iter_variant_results
+
+
+class CountingProvider:
+    provider = "qwen_image"
+    model = "qwen-image-3.0-pro"
+    CAPABILITIES = {"options": {"size": {}}}
+
+    def __init__(self):
+        self.calls = 0
+        self.options = None
+        self.lock = threading.Lock()
+
+    def set_generation_options(self, options):
+        self.options = options
+
+    def generate_image(self, text, images=None):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        return Image.new("RGB", (4, 4), (call, 0, 0))
+
+
+def test_cached_provider_reuses_identical_request(tmp_path):
+    cache = ImageResultCache(tmp_path)
+    inner = CountingProvider()
+    provider = CachedImageProvider(inner, cache)
+    provider.set_generation_options({"size": "1024*1024", "ignored": "x"})
+
+    first = provider.generate_image("a cat")
+    second = provider.generate_image("a cat")
+    provider.generate_image("a dog")
+
+    assert inner.calls == 2
+    assert second.size == first.size
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+    assert provider.model == "qwen-image-3.0-pro"
+
+
+def test_variants_get_distinct_cache_entries(tmp_path):
+    cache = ImageResultCache(tmp_path)
+    inner = CountingProvider()
+    provider = CachedImageProvider(inner, cache)
+    provider.set_generation_options({"size": "1024*1024"})
+
+    first = list(iter_variant_results(provider, "a cat", count=3))
+    again = list(iter_variant_results(provider, "a cat", count=3))
+
+    assert inner.calls == 3
+    assert cache.stats()["entries"] == 3
+    assert len({result.image.data for result in first}) == 3
+    by_index = {result.index: result.image.data for result in first}
+    assert {result.index: result.image.data for result in again} == by_index
+    # 单张生成与 0 号候选共用条目
+    assert provider.generate_image("a cat").data == by_index[0]
+    assert inner.calls == 3
+
+
+def test_fingerprint_hashes_reference_file_contents(tmp_path):
+    ref = tmp_path / "ref.png"
+    ref.write_bytes(b"one")
+    before = request_fingerprint("gemini", "m", {}, "text", [str(ref)])
+    ref.write_bytes(b"two")
+    after = request_fingerprint("gemini", "m", {}, "text", [str(ref)])
+
+    assert before != after
+    assert before != request_fingerprint("gemini", "m", {"size": "2K"}, "text", [str(ref)])
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    image = Image.new("RGB", (8, 8), "blue")
+    probe = ImageResultCache(tmp_path / "probe")
+    probe.put("aa", image)
+    entry_size = probe.stats()["bytes"]
+
+    cache = ImageResultCache(tmp_path / "store", max_bytes=entry_size * 2)
+    cache.put("aa" * 32, image)
+    cache.put("bb" * 32, image)
+    assert cache.get("aa" * 32) is not None
+    cache.put("cc" * 32, image)
+
+    assert cache.get("bb" * 32) is None
+    assert cache.get("aa" * 32) is not None
+    assert cache.stats()["entries"] == 2
+    reopened = ImageResultCache(tmp_path / "store", max_bytes=entry_size * 2)
+    assert reopened.stats()["entries"] == 2
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv("NANO_BANANA_IMAGE_CACHE", raising=False)
+    inner = CountingProvider()
+    assert cache_module.with_image_cache(inner) is inner
@@ -0,0 +1,102 @@
+import threading
+import time
+
+from nano_banana.core.images.fanout import (
+    MAX_VARIANTS,
+    clamp_variant_count,
+    iter_variant_results,
+)
+
+
+class SlowFirstProvider:
+    """第一次调用明显慢于其余调用，验证结果按完成顺序产出。"""
+
+    def __init__(self):
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_image(self, text, images=None):
+        with self.lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            time.sleep(0.3)
+            return "slow"
+        if call == 2:
+            return None
+        raise RuntimeError("boom")
+
+
+def test_variant_results_arrive_in_completion_order():
+    provider = SlowFirstProvider()
+
+    results = list(iter_variant_results(provider, "prompt", count=3))
+
+    assert len(results) == 3
+    assert results[-1].image == "slow"
+    errors = sorted(result.error for result in results if result.error)
+    assert errors == ["boom", "未生成图片，请尝试调整提示词或参数"]
+
+
+def test_clamp_variant_count():
+    assert clamp_variant_count("3") == 3
+    assert clamp_variant_count(0) == 1
+    assert clamp_variant_count(None) == 1
+    assert clamp_variant_count(99) == MAX_VARIANTS
+
+
+class ConcurrencyProbe:
+    provider = "qwen_image"
+
+    def __init__(self):
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_image(self, text, images=None):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.05)
+        with self.lock:
+            self.active -= 1
+        return "ok"
+
+
+def test_variants_respect_provider_concurrency_limit(monkeypatch):
+    monkeypatch.setenv("NANO_BANANA_JOB_LIMITS", "qwen_image=2")
+    provider = ConcurrencyProbe()
+
+    results = list(iter_variant_results(provider, "prompt", count=5))
+
+    assert [result.image for result in results] == ["ok"] * 5
+    assert provider.peak == 2
+
+
+def test_closing_early_cancels_queued_variants_without_waiting(monkeypatch):
+    monkeypatch.setenv("NANO_BANANA_JOB_LIMITS", "qwen_image=2")
+    release = threading.Event()
+
+    class GatedProvider(ConcurrencyProbe):
+        def __init__(self):
+            super().__init__()
+            self.started = 0
+
+        def generate_image(self, text, images=None):
+            with self.lock:
+                self.started += 1
+                call = self.started
+            if call > 1:
+                release.wait(5)
+            return call
+
+    provider = GatedProvider()
+    results = iter_variant_results(provider, "prompt", count=6)
+
+    assert next(results).image == 1
+    began = time.monotonic()
+    results.close()
+    assert time.monotonic() - began < 1
+    release.set()
+    time.sleep(0.1)
+    assert provider.started <= 3
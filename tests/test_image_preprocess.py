@@ -0,0 +1,100 @@
+import base64
+from io import BytesIO
+
+from PIL import Image
+
+from nano_banana.core.chat import build_generate_messages
+from nano_banana.core.images import preprocess
+from nano_banana.core.images.openai_images import OpenAIImagesProvider
+from nano_banana.core.images.preprocess import (
+    clear_prepared_cache,
+    prepare_image_file,
+    prepare_images,
+)
+from nano_banana.core.images.protocol import ImageData, encode_image_references
+
+
+def _save_photo(path, size=(4000, 3000)):
+    image = Image.new("RGB", size, "green")
+    exif = Image.Exif()
+    exif[0x010F] = "PhoneMaker"
+    image.save(path, format="JPEG", exif=exif)
+
+
+def test_large_photo_is_downscaled_and_stripped(tmp_path):
+    clear_prepared_cache()
+    photo = tmp_path / "photo.jpg"
+    _save_photo(photo)
+
+    prepared = prepare_image_file(str(photo), max_side=1024)
+
+    assert (prepared.width, prepared.height) == (1024, 768)
+    assert prepared.mime_type == "image/jpeg"
+    assert b"PhoneMaker" not in prepared.data
+    assert prepare_image_file(str(photo), max_side=1024) is prepared
+
+
+def test_transparent_reference_stays_png(tmp_path):
+    clear_prepared_cache()
+    path = tmp_path / "logo.png"
+    Image.new("RGBA", (10, 10), (0, 0, 0, 0)).save(path)
+
+    prepared = prepare_images([str(path), str(path)])
+
+    assert [item.mime_type for item in prepared] == ["image/png", "image/png"]
+
+
+def test_undecodable_file_falls_back_to_raw_bytes(tmp_path):
+    clear_prepared_cache()
+    path = tmp_path / "reference.png"
+    path.write_bytes(b"not-an-image")
+
+    assert prepare_image_file(str(path)).data == b"not-an-image"
+
+
+def test_chat_and_provider_share_encoded_payload(tmp_path):
+    clear_prepared_cache()
+    photo = tmp_path / "photo.jpg"
+    _save_photo(photo, size=(3000, 2000))
+
+    messages = build_generate_messages("prompt", [str(photo), "data:image/png;base64,AAAA"])
+    urls = [part["image_url"]["url"] for part in messages[1]["content"][:2]]
+
+    assert urls[1] == "data:image/png;base64,AAAA"
+    assert urls[0].startswith("data:image/jpeg;base64,")
+    assert encode_image_references([str(photo)])[0] is urls[0]
+
+
+def test_provider_path_reuses_the_chat_encoding(tmp_path, monkeypatch):
+    clear_prepared_cache()
+    photo = tmp_path / "photo.jpg"
+    _save_photo(photo)
+    encodes = []
+    real_encode = preprocess._encode
+    monkeypatch.setattr(
+        preprocess, "_encode", lambda *args: encodes.append(args) or real_encode(*args)
+    )
+
+    messages = build_generate_messages("prompt", [str(photo)])
+    chat_uri = messages[1]["content"][0]["image_url"]["url"]
+    files = OpenAIImagesProvider._read_edit_files([str(photo)], "openai_images")
+
+    assert len(encodes) == 1
+    assert files[0][1] == base64.b64decode(chat_uri.split(",", 1)[1])
+    assert files[0][2] == "image/jpeg"
+
+
+def test_in_memory_reference_is_encoded_without_files():
+    clear_prepared_cache()
+    buffer = BytesIO()
+    Image.new("RGB", (3000, 1500), "red").save(buffer, format="PNG")
+    uri = "data:image/png;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+    image = ImageData.from_data_uri(uri)
+    encoded = encode_image_references([image], max_side=512)[0]
+    files = OpenAIImagesProvider._read_edit_files([image], "openai_images")
+
+    assert image.mime_type == "image/png"
+    assert encoded.startswith("data:image/jpeg;base64,")
+    assert files[0][0] == "reference-1.jpg"
+    assert files[0][2] == "image/jpeg"
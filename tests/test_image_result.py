@@ -0,0 +1,70 @@
+from io import BytesIO
+
+from PIL import Image
+
+from nano_banana.core.images import ImageResult, as_image_result
+from nano_banana.core.images.store import ImageStore
+
+
+def _jpeg_bytes(size=(6, 4)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "orange").save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_result_keeps_provider_bytes_without_decoding():
+    raw = _jpeg_bytes()
+    result = ImageResult.from_bytes(raw, revised_prompt="orange")
+
+    assert result.size == (6, 4)
+    assert result.mime_type == "image/jpeg"
+    assert result._image is None
+    assert result.to_bytes() is result.data == raw
+    assert result.to_bytes("JPEG") is result.data
+    assert result.data_uri().startswith("data:image/jpeg;base64,")
+    assert result.metadata == {"revised_prompt": "orange"}
+
+
+def test_result_transcodes_only_on_request(tmp_path):
+    result = ImageResult.from_bytes(_jpeg_bytes())
+
+    png = result.to_bytes("PNG")
+    result.save(tmp_path / "out.png")
+    result.save(tmp_path / "out.jpg")
+
+    assert png.startswith(b"\x89PNG")
+    assert (tmp_path / "out.png").read_bytes() == png
+    assert (tmp_path / "out.jpg").read_bytes() == result.data
+
+
+def test_as_image_result_wraps_pil_images():
+    result = as_image_result(Image.new("RGBA", (3, 3)))
+
+    assert result.mime_type == "image/png"
+    assert result.size == (3, 3)
+    assert as_image_result(result) is result
+    assert as_image_result(None) is None
+
+
+def test_image_store_shares_results_through_a_directory(tmp_path):
+    data = _jpeg_bytes()
+    writer = ImageStore(directory=tmp_path)
+    reader = ImageStore(directory=tmp_path)
+
+    stored = writer.put(ImageResult(data))
+    shared = reader.get(stored.id)
+
+    assert shared == stored
+    assert reader.thumbnail(stored.id, 128).mime_type == "image/jpeg"
+    assert reader.get("../" + stored.id) is None
+    assert ImageStore().get(stored.id) is None
+
+
+def test_image_store_evicts_oldest_files_beyond_capacity(tmp_path):
+    store = ImageStore(directory=tmp_path, max_bytes=len(_jpeg_bytes()) + 1)
+    first = store.put(ImageResult(_jpeg_bytes((6, 4))))
+    second = store.put(ImageResult(_jpeg_bytes((4, 6))))
+
+    reader = ImageStore(directory=tmp_path)
+    assert reader.get(first.id) is None
+    assert reader.get(second.id) is not None
@@ -0,0 +1,116 @@
+import threading
+
+from nano_banana.core import jobs
+from nano_banana.core.jobs import JOB_DONE, JOB_FAILED, JOB_QUEUED, JOB_RUNNING, JobManager
+from nano_banana.core.storage.sqlite import SqliteJobStore
+
+
+def test_job_result_and_progress_events_are_recorded():
+    manager = JobManager(max_workers=2)
+
+    def work(report):
+        report({"type": "progress", "message": "half"})
+        return {"image": "ok"}
+
+    job = manager.submit(work, provider="gemini")
+    finished = manager.wait(job.id, timeout=5)
+
+    assert finished.status == JOB_DONE
+    assert finished.result == {"image": "ok"}
+    assert finished.events == [{"type": "progress", "message": "half"}]
+    snapshot = manager.snapshot(job.id)
+    assert snapshot["timings"]["run_seconds"] is not None
+    manager.shutdown()
+
+
+def test_failed_job_keeps_error_message():
+    manager = JobManager(max_workers=1)
+
+    def work(_report):
+        raise RuntimeError("upstream failed")
+
+    job = manager.wait(manager.submit(work, provider="gemini").id, timeout=5)
+
+    assert job.status == JOB_FAILED
+    assert job.error == "upstream failed"
+    assert "result" not in job.to_dict()
+    manager.shutdown()
+
+
+def test_provider_limit_keeps_extra_jobs_queued():
+    manager = JobManager(max_workers=4, provider_limits={"qwen_image": 1})
+    release = threading.Event()
+    started = threading.Event()
+
+    def blocking(_report):
+        started.set()
+        release.wait(5)
+        return "first"
+
+    first = manager.submit(blocking, provider="qwen_image")
+    assert started.wait(5)
+    second = manager.submit(lambda _report: "second", provider="qwen_image")
+    other = manager.submit(lambda _report: "other", provider="gemini")
+
+    assert manager.wait(other.id, timeout=5).status == JOB_DONE
+    assert manager.get(second.id).status == JOB_QUEUED
+
+    release.set()
+    assert manager.wait(first.id, timeout=5).result == "first"
+    assert manager.wait(second.id, timeout=5).result == "second"
+    manager.shutdown()
+
+
+def test_iter_updates_ends_with_terminal_snapshot():
+    manager = JobManager(max_workers=1)
+    job = manager.submit(lambda report: report({"type": "progress"}) or 1, provider="gemini")
+    manager.wait(job.id, timeout=5)
+
+    updates = [update for update in manager.iter_updates(job.id) if update]
+
+    assert updates[-1]["status"] == JOB_DONE
+    assert updates[-1]["events"] == [{"type": "progress"}]
+    manager.shutdown()
+
+
+def test_drain_waits_for_running_and_queued_jobs():
+    manager = JobManager(max_workers=1, provider_limits={"gemini": 1})
+    release = threading.Event()
+    manager.submit(lambda _report: release.wait(5), provider="gemini")
+    queued = manager.submit(lambda _report: "second", provider="gemini")
+
+    assert manager.active_count() == 2
+    assert not manager.drain(timeout=0.05)
+
+    release.set()
+    assert manager.drain(timeout=5)
+    assert manager.active_count() == 0
+    assert manager.get(queued.id).status == JOB_DONE
+    manager.shutdown()
+
+
+def test_jobs_are_visible_from_another_process_through_the_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "REMOTE_POLL_INTERVAL", 0.01)
+    # 两个 JobManager 各自打开同一个库，相当于两个 worker 进程
+    submitter = JobManager(max_workers=1, store=SqliteJobStore(tmp_path / "jobs.sqlite3"))
+    reader = JobManager(max_workers=1, store=SqliteJobStore(tmp_path / "jobs.sqlite3"))
+    release = threading.Event()
+
+    def work(report):
+        report({"type": "progress"})
+        release.wait(5)
+        return {"image_id": "abc"}
+
+    job = submitter.submit(work, provider="gemini")
+    assert reader.wait(job.id, timeout=0.05).status in (JOB_QUEUED, JOB_RUNNING)
+    threading.Timer(0.05, release.set).start()
+
+    updates = [update for update in reader.iter_updates(job.id, heartbeat=5) if update]
+    assert updates[-1]["status"] == JOB_DONE
+    assert [event for update in updates for event in update["events"]] == [{"type": "progress"}]
+    assert reader.wait(job.id, timeout=5).result == {"image_id": "abc"}
+    assert reader.snapshot(job.id)["result"] == {"image_id": "abc"}
+    assert reader.get("missing") is None
+    assert reader.active_count() == 0
+    submitter.shutdown()
+    reader.shutdown()
@@ -0,0 +1,275 @@
+import json
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from nano_banana.core.chat import (
+    MODIFY_MODE_PATCH,
+    MODIFY_SCOPE_AUTO,
+    ChatEvent,
+    build_modify_messages,
+    parse_modify_base,
+    resolve_modify_scope,
+    with_patch_result,
+)
+from nano_banana.core.client_pool import get_client_pool
+from nano_banana.core.prompt_doc import (
+    detect_categories,
+    merge_patch,
+    nest,
+    patch_from_operations,
+    subset,
+    validate_patch,
+)
+from nano_banana.core.prompts import MODIFY_PATCH_SYSTEM_PROMPT
+from nano_banana.core.schema import get_schema
+
+
+def _document():
+    data = nest(get_schema().example_values())
+    data["自定义"] = "保留"
+    return data
+
+
+def test_validate_patch_normalizes_schema_leaves():
+    current = _document()
+    patch_doc = {
+        "场景": {"环境": {"光线": "逆光"}},
+        "审美控制": {"材质真实度": "金属, 玻璃"},
+        "反向提示词": None,
+        "自定义": "改了",
+    }
+    assert validate_patch(patch_doc, current=current) == {
+        "场景": {"环境": {"光线": "逆光"}},
+        "审美控制": {"材质真实度": ["金属", "玻璃"]},
+        "反向提示词": "",
+        "自定义": "改了",
+    }
+
+
+@pytest.mark.parametrize(
+    "patch_doc, message",
+    [
+        ({"场景": {"环境": {"光线": {"主光": "逆光"}}}}, "场景.环境.光线 应为字符串"),
+        ({"审美控制": {"材质真实度": [1, 2]}}, "应为字符串数组"),
+        ({"场景": {"未知": "x"}}, "未知字段: 场景.未知"),
+        ({"新分类": {"a": "b"}}, "未知字段: 新分类"),
+    ],
+)
+def test_validate_patch_rejects_paths_and_types_outside_the_schema(patch_doc, message):
+    with pytest.raises(ValueError, match=message):
+        validate_patch(patch_doc, current=_document())
+
+
+def test_merge_patch_only_touches_the_changed_subtree():
+    current = _document()
+    merged = merge_patch(current, {"场景": {"环境": {"光线": "逆光"}}})
+    assert merged["场景"]["环境"]["光线"] == "逆光"
+    assert merged["场景"]["环境"]["天气氛围"] == current["场景"]["环境"]["天气氛围"]
+    for key in current:
+        if key != "场景":
+            assert json.dumps(merged[key], ensure_ascii=False) == json.dumps(
+                current[key], ensure_ascii=False
+            )
+    assert current["场景"]["环境"]["光线"] != "逆光"
+    assert merge_patch(current, {}) == current
+
+
+def test_merge_patch_accepts_json_patch_operations():
+    operations = [
+        {"op": "replace", "path": "/场景/环境/光线", "value": "逆光"},
+        {"op": "remove", "path": "/审美控制/材质真实度"},
+    ]
+    assert patch_from_operations(operations) == {
+        "场景": {"环境": {"光线": "逆光"}},
+        "审美控制": {"材质真实度": None},
+    }
+    merged = merge_patch(_document(), operations)
+    assert merged["审美控制"]["材质真实度"] == []
+    with pytest.raises(ValueError, match="不支持"):
+        patch_from_operations([{"op": "move", "from": "/a", "path": "/b"}])
+
+
+def test_patch_mode_messages_use_the_patch_prompt():
+    messages = build_modify_messages("{}", "把头发改成黑色", mode=MODIFY_MODE_PATCH)
+    assert messages[0]["content"] == MODIFY_PATCH_SYSTEM_PROMPT
+    assert "只返回需要修改的字段" in messages[1]["content"]
+    with pytest.raises(ValueError):
+        build_modify_messages("{}", "x", mode="diff")
+    with pytest.raises(ValueError, match="JSON 对象"):
+        parse_modify_base("[]")
+
+
+def test_patch_result_is_inserted_before_done():
+    current = _document()
+    events = [
+        ChatEvent("content", '{"场景": {"环境": {"光线": "逆光"}}}'),
+        ChatEvent("done", '{"场景": {"环境": {"光线": "逆光"}}}'),
+    ]
+    resolved = list(with_patch_result(iter(events), current))
+    assert [event.type for event in resolved] == ["content", "result", "done"]
+    assert resolved[1].data == merge_patch(current, {"场景": {"环境": {"光线": "逆光"}}})
+
+    events = [ChatEvent("done", '{"场景": {"未知": "x"}}')]
+    resolved = list(with_patch_result(iter(events), current))
+    assert [event.type for event in resolved] == ["error"]
+    assert "未知字段" in resolved[0].text
+
+
+class _Completions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        delta = SimpleNamespace(content=self.content, reasoning_content=None)
+        return iter([SimpleNamespace(choices=[SimpleNamespace(delta=delta)])])
+
+
+def _post_modify(completions, body):
+    from nano_banana.web.app import app
+    from nano_banana.web.context import config_manager
+
+    get_client_pool().clear()
+    with (
+        patch.object(
+            config_manager,
+            "load_config",
+            return_value={"base_url": "https://example.test/v1", "api_key": "k", "model": "m"},
+        ),
+        patch("openai.OpenAI", lambda **_kwargs: SimpleNamespace(
+            chat=SimpleNamespace(completions=completions)
+        )),
+        patch("httpx.Client", lambda **_kwargs: SimpleNamespace(close=lambda: None)),
+    ):
+        response = app.test_client().post("/api/modify", json=body)
+    get_client_pool().clear()
+    if response.status_code != 200:
+        return response.status_code
+    return [
+        json.loads(line[6:])
+        for line in response.get_data(as_text=True).split("\n\n")
+        if line.startswith("data: {")
+    ]
+
+
+def test_modify_endpoint_streams_the_merged_document_in_patch_mode():
+    current = _document()
+    completions = _Completions('{"场景": {"环境": {"光线": "逆光"}}}')
+    payloads = _post_modify(
+        completions,
+        {
+            "current_data": json.dumps(current, ensure_ascii=False),
+            "modify_request": "改成逆光",
+            "mode": "patch",
+        },
+    )
+    bad = _post_modify(
+        completions, {"current_data": "not json", "modify_request": "x", "mode": "patch"}
+    )
+
+    assert completions.calls[0]["messages"][0]["content"] == MODIFY_PATCH_SYSTEM_PROMPT
+    results = [payload["result"] for payload in payloads if "result" in payload]
+    assert results == [merge_patch(current, {"场景": {"环境": {"光线": "逆光"}}})]
+    assert any(payload.get("field", {}).get("id") == "lighting" for payload in payloads)
+    assert bad == 400
+
+
+def test_detect_categories_from_the_instruction():
+    assert detect_categories("把头发改成黑色") == ["subject"]
+    assert detect_categories("把场景改为雪景，光线更冷") == ["scene"]
+    assert detect_categories("换个机位，整体色调偏暖") == ["camera", "aesthetic"]
+    assert detect_categories("再来一版") == []
+
+
+def test_resolve_modify_scope():
+    assert resolve_modify_scope(None, "把头发改成黑色") is None
+    assert resolve_modify_scope(MODIFY_SCOPE_AUTO, "把头发改成黑色") == ["subject"]
+    assert resolve_modify_scope(MODIFY_SCOPE_AUTO, "再来一版") is None
+    assert resolve_modify_scope(None, "换成冬天的雪景，衣服也要换成棉袄") is None
+    assert resolve_modify_scope(["camera", "basic"]) == ["basic", "camera"]
+    with pytest.raises(ValueError, match="未知分类"):
+        resolve_modify_scope(["nope"])
+
+
+def test_auto_scope_covers_every_category_the_instruction_touches():
+    assert resolve_modify_scope(MODIFY_SCOPE_AUTO, "换成冬天的雪景，衣服也要换成棉袄") == [
+        "scene",
+        "subject",
+    ]
+    assert resolve_modify_scope(MODIFY_SCOPE_AUTO, "把人物改成在海边奔跑") == [
+        "scene",
+        "subject",
+    ]
+    assert resolve_modify_scope(MODIFY_SCOPE_AUTO, "把光线改成逆光，镜头换成俯拍") == [
+        "scene",
+        "camera",
+    ]
+    # 有子句认不出分类时没有把握，退回整份文档
+    assert resolve_modify_scope(MODIFY_SCOPE_AUTO, "把头发改成黑色，再梦幻一些") is None
+
+
+def test_scoped_messages_only_carry_the_selected_slices():
+    current = _document()
+    messages = build_modify_messages(
+        json.dumps(current, ensure_ascii=False), "把头发改成黑色", categories=["subject"]
+    )
+    user_text = messages[1]["content"]
+    sent = json.loads(user_text.split("：\n", 1)[1].split("\n\n修改要求", 1)[0])
+    assert sent == subset(current, "subject")
+    assert "主体细节" in user_text
+    assert len(user_text) < len(json.dumps(current, ensure_ascii=False))
+
+
+def test_scoped_merge_keeps_other_categories_byte_identical():
+    current = _document()
+    returned = subset(current, "subject")
+    returned["场景"]["主体"]["外形特征"]["头发"] = "黑色短发"
+    # 模型越界改动的分类必须被忽略
+    returned["场景"]["环境"] = {"光线": "逆光"}
+    returned["相机"] = {"构图": "特写"}
+    merged = merge_patch(current, returned, categories=["subject"])
+
+    assert merged["场景"]["主体"]["外形特征"]["头发"] == "黑色短发"
+    dump = lambda data: json.dumps(data, ensure_ascii=False)  # noqa: E731
+    for category_id in ("basic", "scene", "camera", "aesthetic"):
+        assert dump(subset(merged, category_id)) == dump(subset(current, category_id))
+    assert dump({k: v for k, v in merged.items() if k != "场景"}) == dump(
+        {k: v for k, v in current.items() if k != "场景"}
+    )
+
+
+def test_modify_endpoint_merges_auto_scoped_full_output():
+    current = _document()
+    returned = subset(current, "subject")
+    returned["场景"]["主体"]["外形特征"]["头发"] = "黑色短发"
+    completions = _Completions(json.dumps(returned, ensure_ascii=False))
+    payloads = _post_modify(
+        completions,
+        {
+            "current_data": json.dumps(current, ensure_ascii=False),
+            "modify_request": "把头发改成黑色",
+            "categories": "auto",
+        },
+    )
+    user_text = completions.calls[0]["messages"][1]["content"]
+    assert "地点设定" not in user_text
+    results = [payload["result"] for payload in payloads if "result" in payload]
+    assert results == [merge_patch(current, returned, categories=["subject"])]
+
+
+def test_modify_endpoint_sends_the_whole_document_without_categories():
+    current = _document()
+    completions = _Completions(json.dumps(current, ensure_ascii=False))
+    _post_modify(
+        completions,
+        {
+            "current_data": json.dumps(current, ensure_ascii=False),
+            "modify_request": "换成冬天的雪景，衣服也要换成棉袄",
+            "categories": None,
+        },
+    )
+    user_text = completions.calls[0]["messages"][1]["content"]
+    assert json.dumps(current, ensure_ascii=False) in user_text
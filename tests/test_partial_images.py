@@ -0,0 +1,144 @@
+import base64
+import json
+from io import BytesIO
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from openai import OpenAI
+from PIL import Image
+
+from nano_banana.core.images import (
+    DoubaoImageProvider,
+    OpenAIImagesProvider,
+    supports_partial_images,
+)
+from nano_banana.core.images.fanout import iter_variant_results
+
+
+def _b64_png(size):
+    buffer = BytesIO()
+    Image.new("RGB", size, "white").save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def _sse(*events):
+    return "".join(f"event: {event['type']}\ndata: {json.dumps(event)}\n\n" for event in events)
+
+
+def test_openai_stream_reports_partials_and_returns_completed_image():
+    provider = OpenAIImagesProvider("https://api.example/v1", "test-key", "gpt-image-2")
+    captured = {}
+
+    def handle_request(request):
+        captured["body"] = json.loads(request.content)
+        body = _sse(
+            {"type": "image_generation.partial_image", "b64_json": _b64_png((2, 2)),
+             "partial_image_index": 0, "background": "opaque", "created_at": 1,
+             "output_format": "png", "quality": "low", "size": "1024x1024"},
+            {"type": "image_generation.completed", "b64_json": _b64_png((8, 8)),
+             "background": "opaque", "created_at": 2, "output_format": "png",
+             "quality": "high", "size": "1024x1024",
+             "usage": {"input_tokens": 1, "output_tokens": 1, "total_tokens": 2,
+                       "input_tokens_details": {"image_tokens": 0, "text_tokens": 1}}},
+        )
+        return httpx.Response(200, text=body, headers={"content-type": "text/event-stream"})
+
+    provider.client = OpenAI(
+        api_key="test-key",
+        base_url=provider.base_url,
+        http_client=httpx.Client(transport=httpx.MockTransport(handle_request)),
+    )
+    partials = []
+
+    result = provider.generate_image("prompt", on_partial=partials.append)
+
+    assert captured["body"]["stream"] is True
+    assert captured["body"]["partial_images"] == 2
+    assert [partial.size for partial in partials] == [(2, 2)]
+    assert result.size == (8, 8)
+
+
+def test_doubao_stream_uses_last_partial_and_falls_back_when_unsupported():
+    provider = DoubaoImageProvider(
+        "https://ark.cn-beijing.volces.com/api/v3", "test-key", "doubao-seedream-5-0-pro-260628"
+    )
+    events = [
+        SimpleNamespace(type="image_generation.partial_succeeded", b64_json=_b64_png((5, 5))),
+        SimpleNamespace(type="image_generation.completed", b64_json=None),
+    ]
+    provider.client = SimpleNamespace(
+        images=SimpleNamespace(generate=lambda **kwargs: iter(events) if kwargs.get("stream") else None)
+    )
+    partials = []
+
+    assert provider.generate_image("prompt", on_partial=partials.append).size == (5, 5)
+    assert len(partials) == 1
+
+    def reject_stream(**kwargs):
+        if kwargs.get("stream"):
+            raise TypeError("stream not supported")
+        return SimpleNamespace(data=[SimpleNamespace(b64_json=_b64_png((3, 3)), url=None)])
+
+    provider.client = SimpleNamespace(images=SimpleNamespace(generate=reject_stream))
+    assert provider.generate_image("prompt", on_partial=partials.append).size == (3, 3)
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = {"error": {"message": message}}
+
+
+def test_stream_falls_back_only_when_streaming_is_rejected():
+    provider = OpenAIImagesProvider("https://api.example/v1", "test-key", "gpt-image-2")
+    calls = []
+
+    def generate(error):
+        def handler(**kwargs):
+            calls.append(bool(kwargs.get("stream")))
+            if kwargs.get("stream"):
+                raise error
+            return SimpleNamespace(data=[SimpleNamespace(b64_json=_b64_png((3, 3)), url=None)])
+        return handler
+
+    provider.client = SimpleNamespace(
+        images=SimpleNamespace(generate=generate(_StatusError(400, "Unknown parameter: 'stream'")))
+    )
+    assert provider.generate_image("prompt", on_partial=lambda _: None).size == (3, 3)
+    assert calls == [True, False]
+
+    calls.clear()
+    provider.client = SimpleNamespace(
+        images=SimpleNamespace(generate=generate(_StatusError(503, "upstream timeout")))
+    )
+    with pytest.raises(_StatusError):
+        provider.generate_image("prompt", on_partial=lambda _: None)
+    assert calls == [True]
+
+
+def test_doubao_does_not_resend_after_stream_failure():
+    provider = DoubaoImageProvider(
+        "https://ark.cn-beijing.volces.com/api/v3", "test-key", "doubao-seedream-5-0-pro-260628"
+    )
+    calls = []
+
+    def generate(**kwargs):
+        calls.append(bool(kwargs.get("stream")))
+        raise _StatusError(400, "The request failed because the prompt is too long")
+
+    provider.client = SimpleNamespace(images=SimpleNamespace(generate=generate))
+    with pytest.raises(RuntimeError):
+        provider.generate_image("prompt", on_partial=lambda _: None)
+    assert calls == [True]
+
+
+def test_fanout_only_passes_partial_callback_to_streaming_providers():
+    class PlainProvider:
+        def generate_image(self, text, images=None):
+            return "done"
+
+    assert not supports_partial_images(PlainProvider())
+    results = list(iter_variant_results(PlainProvider(), "prompt", on_partial=lambda *_: None))
+    assert results[0].image == "done"
@@ -0,0 +1,160 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from nano_banana.core.chat import ChatEvent, iter_completion_events, iter_sse
+from nano_banana.core.partial_json import (
+    IncrementalJSONParser,
+    PartialJSONError,
+    PromptFieldParser,
+)
+from nano_banana.core.prompt_doc import nest
+from nano_banana.core.schema import get_schema
+
+
+def _document():
+    data = nest(get_schema().example_values())
+    data["反向提示词"] = "模糊, \"低质量\"\n水印 \U0001f600"
+    return data
+
+
+def _feed_in_pieces(parser, text, size):
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+
+
+@pytest.mark.parametrize("size", [1, 3, 17, 10_000])
+def test_parser_rebuilds_the_document_from_any_chunking(size):
+    document = {"a": [1, -2.5e3, True, None, {"b": "\\u0041"}], "c": {}, "d": []}
+    text = "好的，结果如下：\n```json\n" + json.dumps(document, indent=2) + "\n```\n以上。"
+    parser = IncrementalJSONParser()
+    _feed_in_pieces(parser, text, size)
+    assert parser.finish() == document
+
+
+def test_parser_reports_each_value_once_when_it_closes():
+    seen = []
+    parser = IncrementalJSONParser(lambda path, value: seen.append((path, value)))
+    _feed_in_pieces(parser, '{"a": {"b": "x"}, "c": [1, "y"]}', 2)
+    assert seen == [
+        (("a", "b"), "x"),
+        (("a",), {"b": "x"}),
+        (("c", 0), 1),
+        (("c", 1), "y"),
+        (("c",), [1, "y"]),
+        ((), {"a": {"b": "x"}, "c": [1, "y"]}),
+    ]
+
+
+def test_unicode_escapes_and_surrogate_pairs_split_across_chunks():
+    text = json.dumps({"k": "中文 \U0001f600"}, ensure_ascii=True)
+    parser = IncrementalJSONParser()
+    _feed_in_pieces(parser, text, 1)
+    assert parser.finish() == {"k": "中文 \U0001f600"}
+
+
+@pytest.mark.parametrize(
+    "text, position",
+    [
+        ('{"a": "x" "b": 1}', 10),
+        ('{"a": tru}', 6),
+        ("{'a': 1}", 1),
+        ('{"a": [1, 2}', 11),
+        ('{"a": "\x01"}', 7),
+    ],
+)
+def test_syntax_errors_surface_at_the_offending_character(text, position):
+    parser = IncrementalJSONParser()
+    with pytest.raises(PartialJSONError) as info:
+        _feed_in_pieces(parser, text, 4)
+    assert info.value.position == position
+    with pytest.raises(PartialJSONError):
+        parser.feed("}")
+
+
+def test_finish_rejects_missing_or_truncated_documents():
+    with pytest.raises(PartialJSONError, match="没有找到"):
+        IncrementalJSONParser().finish()
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": "unterminated')
+    with pytest.raises(PartialJSONError, match="不完整"):
+        parser.finish()
+
+
+def test_field_parser_emits_schema_fields_as_they_complete():
+    schema = get_schema()
+    document = _document()
+    text = json.dumps(document, ensure_ascii=False)
+    parser = PromptFieldParser(schema)
+
+    fields = {}
+    lighting_at = None
+    for offset in range(0, len(text), 5):
+        for field in parser.feed(text[offset:offset + 5]):
+            fields[field.id] = field
+            if field.id == "lighting":
+                lighting_at = offset
+    assert parser.finish() == ""
+
+    expected = {field.id for field in schema.iter_fields()} | {"negativePrompt"}
+    assert set(fields) == expected
+    assert fields["lighting"].path == ("场景", "环境", "光线")
+    assert fields["materialRealism"].value == document["审美控制"]["材质真实度"]
+    assert fields["negativePrompt"].value == document["反向提示词"]
+    # 光线在文档前部闭合，远早于流结束
+    assert lighting_at < len(text) // 2
+
+
+def test_field_parser_flags_wrong_shapes_but_keeps_going():
+    parser = PromptFieldParser()
+    ready = parser.feed('{"风格模式": {"x": 1}, "画面气质": "清透"}')
+    assert [field.id for field in ready] == ["atmosphere"]
+    assert "风格模式" in parser.error
+
+
+def test_field_parser_stops_after_a_syntax_error():
+    parser = PromptFieldParser()
+    ready = parser.feed('{"风格模式": "a",, "画面气质": "b"}')
+    assert [field.id for field in ready] == ["styleMode"]
+    assert "第 14 个字符" in parser.error
+    assert parser.finish() == parser.error
+
+
+def _chunks(*parts):
+    return [
+        SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=part))])
+        for part in parts
+    ]
+
+
+def _client(chunks):
+    create = lambda **_kwargs: iter(chunks)  # noqa: E731
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def test_completion_events_interleave_field_events_with_content():
+    client = _client(_chunks('```json\n{"场景": {"环境": {"光线": "逆', '光"}}, "画面', '气质": "冷"}\n```'))
+    events = list(iter_completion_events(client, [], model="m"))
+    assert [event.type for event in events] == [
+        "content", "content", "field", "content", "field", "done",
+    ]
+    assert events[2].data == {"id": "lighting", "path": ["场景", "环境", "光线"], "value": "逆光"}
+
+    lines = list(iter_sse(iter(events), include_started=False))
+    assert lines[2] == 'data: {"field": {"id": "lighting", "path": ["\\u573a\\u666f", "\\u73af\\u5883", "\\u5149\\u7ebf"], "value": "\\u9006\\u5149"}}\n\n'
+
+
+def test_invalid_output_is_reported_before_the_stream_ends():
+    client = _client(_chunks('{"风格模式": "a" "画面气质"', ': "b"}', "more text"))
+    events = list(iter_completion_events(client, [], model="m"))
+    assert [event.type for event in events] == [
+        "content", "field", "invalid", "content", "content", "done",
+    ]
+    assert json.loads(next(iter_sse(iter(events[2:3]), include_started=False))[6:]) == {
+        "invalid": events[2].text
+    }
+
+    events = list(iter_completion_events(_client(_chunks("抱歉，我无法完成。")), [], model="m"))
+    assert [event.type for event in events] == ["content", "invalid", "done"]
+    assert ChatEvent("done", "抱歉，我无法完成。") == events[-1]
@@ -1,5 +1,8 @@
 import json
+import os
+import time
 from pathlib import Path
+from unittest.mock import patch
 
 from utils.preset_manager import PresetManager
 
@@ -155,4 +158,111 @@ def test_bundled_aesthetic_presets_are_a_small_complete_default_set():
         assert all(value.strip() for value in aesthetic["材质真实度"])
         assert set(aesthetic["色彩风格"]) == {"整体色调", "对比度", "特殊效果"}
         assert aesthetic["呈现意图"].strip()
-        assert all(value.strip() for value in aesthetic["色彩风格"].values())
\ No newline at end of file
+        assert all(value.strip() for value in aesthetic["色彩风格"].values())
+
+def test_preset_index_answers_listing_and_details_without_rereading_files(tmp_path):
+    manager = PresetManager(tmp_path)
+    assert manager.save_preset("旧方案", {"风格模式": "写实"})
+    assert manager.save_preset("新方案", {"风格模式": "插画"})
+    os.utime(tmp_path / "旧方案.json", ns=(1_000_000_000, 1_000_000_000))
+    manager.store.refresh("", force=True)
+
+    with patch.object(Path, "read_bytes", side_effect=AssertionError("不应重读预设文件")):
+        assert [item["name"] for item in manager.get_all_presets()] == ["新方案", "旧方案"]
+        assert manager.get_all_preset_details() == [{"风格模式": "插画"}, {"风格模式": "写实"}]
+
+
+def test_preset_index_picks_up_external_changes(tmp_path):
+    manager = PresetManager(tmp_path)
+    assert manager.save_preset("方案", {"风格模式": "写实"})
+    assert [item["name"] for item in manager.get_all_presets()] == ["方案"]
+
+    (tmp_path / "外部添加.json").write_text(
+        json.dumps({"风格模式": "水彩"}, ensure_ascii=False), encoding="utf-8"
+    )
+    (tmp_path / "方案.json").unlink()
+
+    assert [item["name"] for item in manager.get_all_presets()] == ["外部添加"]
+    assert manager.get_all_preset_details() == [{"风格模式": "水彩"}]
+    assert not list(tmp_path.glob(".index/*.json"))
+
+    reopened = PresetManager(tmp_path)
+    entry = reopened.store.get_entry("", "外部添加")
+    assert entry["hash"]
+    assert entry["fields"]
+
+
+def test_preset_index_picks_up_files_edited_in_place(tmp_path, monkeypatch):
+    from nano_banana.core import preset_index
+
+    manager = PresetManager(tmp_path)
+    assert manager.save_preset("a", {"风格模式": "写实"})
+    assert manager.search_presets("插画") == []
+    path = tmp_path / "a.json"
+    stat = path.stat()
+
+    # 原地改写文件，目录 mtime 不变
+    path.write_text(json.dumps({"风格模式": "插画"}, ensure_ascii=False), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    monkeypatch.setattr(preset_index, "RESCAN_INTERVAL", 3600.0)
+    assert manager.get_all_preset_details() == [{"风格模式": "写实"}]
+
+    monkeypatch.setattr(preset_index, "RESCAN_INTERVAL", 0.0)
+    assert manager.get_all_preset_details() == [{"风格模式": "插画"}]
+    assert [item["name"] for item in manager.search_presets("插画")] == ["a"]
+    assert manager.load_preset("a") == {"风格模式": "插画"}
+
+
+def test_category_index_tracks_saves_and_deletes(tmp_path):
+    manager = PresetManager(tmp_path)
+    assert manager.get_category_presets("basic") == []
+    assert manager.save_category_preset("basic", "写实", {"风格模式": "写实"})
+    assert [item["name"] for item in manager.get_category_presets("basic")] == ["写实"]
+    assert manager.delete_category_preset("basic", "写实")
+    assert manager.get_category_presets("basic") == []
+
+
+def test_preset_search_matches_cjk_substrings_and_schema_fields(tmp_path):
+    manager = PresetManager(tmp_path)
+    assert manager.save_preset("海边逆光", {"场景": {"环境": {"光线": "夕阳逆光，金色轮廓光"}}})
+    assert manager.save_preset("雪景", {"场景": {"环境": {"天气氛围": "大雪纷飞的冬夜"}}})
+    assert manager.save_preset("High Key", {"场景": {"环境": {"光线": "High-key lighting"}}})
+
+    assert [item["name"] for item in manager.search_presets("逆光")] == ["海边逆光"]
+    assert [item["name"] for item in manager.search_presets("lighting:轮廓")] == ["海边逆光"]
+    assert [item["name"] for item in manager.search_presets("光线:key")] == ["High Key"]
+    assert manager.search_presets("weather:逆光") == []
+    # bigram 都命中但原文并不连续时不算匹配
+    assert manager.search_presets("逆轮") == []
+    hit = manager.search_presets("冬夜 name:雪")[0]
+    assert hit["name"] == "雪景"
+    assert hit["matched_fields"] == ["weather", "name"]
+
+
+def test_preset_search_updates_on_save_delete_and_rename(tmp_path):
+    manager = PresetManager(tmp_path)
+    assert manager.save_preset("方案", {"画面气质": "清透"})
+    assert [item["name"] for item in manager.search_presets("清透")] == ["方案"]
+
+    assert manager.save_preset("方案", {"画面气质": "治愈"})
+    assert manager.search_presets("清透") == []
+    assert manager.rename_preset("方案", "改名方案")
+    assert [item["name"] for item in manager.search_presets("atmosphere:治愈")] == ["改名方案"]
+
+    assert manager.delete_preset("改名方案")
+    assert manager.search_presets("治愈") == []
+
+
+def test_preset_search_handles_ten_thousand_presets_quickly():
+    from nano_banana.core.preset_search import PresetSearchIndex
+
+    index = PresetSearchIndex()
+    for i in range(10_000):
+        index.add("", f"preset-{i}", {"lighting": f"第{i}号 柔和的侧逆光", "location": "海边车站"}, i)
+    index.add("", "目标", {"lighting": "罕见的极光", "location": "海边车站"}, 0)
+
+    started = time.perf_counter()
+    for _ in range(10):
+        assert [item["name"] for item in index.search("lighting:极光 海边")] == ["目标"]
+    assert (time.perf_counter() - started) / 10 < 0.01
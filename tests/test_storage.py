@@ -0,0 +1,161 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+
+import pytest
+
+from nano_banana.core.config import AIConfigManager
+from nano_banana.core.presets import PresetManager
+from nano_banana.core.storage.files import FilePresetStore, YamlOptionsStore
+from nano_banana.core.storage.migrate import main as migrate_main
+from nano_banana.core.storage.sqlite import SqliteOptionsStore, SqlitePresetStore
+from nano_banana.core.yaml_handler import YamlHandler
+
+
+def test_sqlite_store_backs_the_preset_manager(tmp_path):
+    store = SqlitePresetStore(tmp_path / "data.sqlite3")
+    manager = PresetManager(tmp_path / "presets", store=store)
+
+    assert manager.save_preset("海边", {"场景": {"环境": {"光线": "逆光"}}})
+    assert manager.save_category_preset("basic", "写实", {"风格模式": "写实"})
+    assert manager.load_preset("海边") == {"场景": {"环境": {"光线": "逆光"}}}
+    assert [item["name"] for item in manager.get_category_presets("basic")] == ["写实"]
+    assert [item["name"] for item in manager.search_presets("lighting:逆光")] == ["海边"]
+
+    assert manager.rename_preset("海边", "海边2")
+    assert not manager.rename_preset("不存在", "x")
+    assert manager.load_preset("海边") is None
+    assert [item["name"] for item in manager.search_presets("逆光")] == ["海边2"]
+    assert manager.delete_preset("海边2")
+    assert not manager.delete_preset("海边2")
+    assert manager.get_all_presets() == []
+    assert not list((tmp_path / "presets").glob("*.json"))
+
+    mode = sqlite3.connect(tmp_path / "data.sqlite3").execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+
+def test_options_in_sqlite_are_seen_by_other_handlers(tmp_path):
+    db = tmp_path / "data.sqlite3"
+    writer = YamlHandler(store=SqliteOptionsStore(db))
+    reader = YamlHandler(store=SqliteOptionsStore(db))
+
+    with writer.batch():
+        writer.add_option("场景", "森林")
+        writer.add_option("场景", "城市")
+    assert reader.get_field_options("场景") == ["森林", "城市"]
+
+    writer.remove_option("场景", "森林")
+    writer.flush()
+    assert reader.get_field_options("场景") == ["城市"]
+
+
+def test_migration_round_trips_presets_and_options(tmp_path):
+    presets_dir = tmp_path / "presets"
+    files = FilePresetStore(presets_dir)
+    files.save("", "旧", {"风格模式": "写实"}, mtime_ns=1_000_000_000)
+    files.save("", "新", {"风格模式": "插画"}, mtime_ns=2_000_000_000)
+    files.save("scene", "夜景", {"场景": {"环境": {"光线": "月光"}}})
+    options_path = tmp_path / "options.yaml"
+    YamlOptionsStore(options_path).save({"场景": ["森林"], "角色线稿提示词": "线稿"})
+    db = tmp_path / "data.sqlite3"
+    args = ["--presets-dir", str(presets_dir), "--options", str(options_path), "--db", str(db)]
+
+    assert migrate_main(["to-sqlite", *args]) == 0
+    sqlite_store = SqlitePresetStore(db)
+    assert [entry["name"] for entry in sqlite_store.entries("")] == ["新", "旧"]
+    assert sqlite_store.load("scene", "夜景") == {"场景": {"环境": {"光线": "月光"}}}
+    assert SqliteOptionsStore(db).load() == {"场景": ["森林"], "角色线稿提示词": "线稿"}
+
+    exported_dir = tmp_path / "exported"
+    exported_options = tmp_path / "exported.yaml"
+    assert migrate_main([
+        "to-files", "--presets-dir", str(exported_dir),
+        "--options", str(exported_options), "--db", str(db),
+    ]) == 0
+    assert json.loads((exported_dir / "新.json").read_text(encoding="utf-8")) == {"风格模式": "插画"}
+    assert os.stat(exported_dir / "旧.json").st_mtime_ns == 1_000_000_000
+    assert (exported_dir / "categories" / "scene" / "夜景.json").exists()
+    assert YamlOptionsStore(exported_options).load() == {"场景": ["森林"], "角色线稿提示词": "线稿"}
+
+
+def _add_options(path, worker, count):
+    handler = YamlHandler()
+    handler.config_path = path
+    for index in range(count):
+        handler.add_option("场景", f"{worker}-{index}")
+        handler.flush()
+
+
+def _save_configs(path, worker, count):
+    manager = AIConfigManager()
+    manager.config_path = path
+    for index in range(count):
+        manager.save_image_generation_options("gemini", f"model-{worker}", {"n": index})
+
+
+def _run_workers(target, *args, workers=4):
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=target, args=(*args, worker, 10)) for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+        assert process.exitcode == 0
+
+
+@pytest.mark.skipif(os.name == "nt", reason="需要 fork")
+def test_concurrent_processes_do_not_lose_option_writes(tmp_path):
+    path = tmp_path / "options.yaml"
+    _run_workers(_add_options, path)
+
+    handler = YamlHandler()
+    handler.config_path = path
+    values = handler.get_field_options("场景")
+    assert sorted(values) == sorted(f"{w}-{i}" for w in range(4) for i in range(10))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="需要 fork")
+def test_concurrent_processes_do_not_lose_config_writes(tmp_path):
+    path = tmp_path / "ai_config.yaml"
+    _run_workers(_save_configs, path)
+
+    manager = AIConfigManager()
+    manager.config_path = path
+    for worker in range(4):
+        assert manager.get_image_generation_options("gemini", f"model-{worker}") == {"n": 9}
+
+
+def test_handlers_replay_their_changes_over_other_writers(tmp_path):
+    path = tmp_path / "options.yaml"
+    first, second = YamlHandler(), YamlHandler()
+    first.config_path = second.config_path = path
+    first.save_options({"场景": ["森林"]})
+    assert second.get_field_options("场景") == ["森林"]
+
+    with first.batch():
+        first.add_option("场景", "城市")
+        with second.batch():
+            second.remove_option("场景", "森林")
+            second.save_line_art_prompt("线稿")
+
+    assert first.load_options() == {"场景": ["城市"], "角色线稿提示词": "线稿"}
+
+
+@pytest.mark.parametrize("backend", ["files", "sqlite"])
+def test_search_index_sees_presets_saved_by_another_process(tmp_path, backend):
+    def manager():
+        if backend == "sqlite":
+            return PresetManager(tmp_path, store=SqlitePresetStore(tmp_path / "data.sqlite3"))
+        return PresetManager(tmp_path)
+
+    # 两个实例各自持有连接与倒排索引，等同于两个 worker 进程
+    writer, reader = manager(), manager()
+    writer.save_preset("海边", {"场景": {"环境": {"光线": "逆光"}}})
+    assert [item["name"] for item in reader.search_presets("逆光")] == ["海边"]
+
+    writer.rename_preset("海边", "黄昏")
+    reader.save_preset("城市", {"场景": {"环境": {"光线": "霓虹"}}})
+    assert [item["name"] for item in reader.search_presets("逆光")] == ["黄昏"]
+    assert [item["name"] for item in writer.search_presets("霓虹")] == ["城市"]
@@ -0,0 +1,184 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from nano_banana.core import chat
+from nano_banana.core.chat import (
+    StructuredOutput,
+    aiter_completion_events,
+    build_generate_messages,
+    generate_structured_output,
+    iter_completion_events,
+)
+from nano_banana.core.prompt_doc import document_json_schema, nest
+from nano_banana.core.prompts import STRUCTURED_SYSTEM_PROMPT, SYSTEM_PROMPT
+from nano_banana.core.schema import get_schema
+
+
+@pytest.fixture(autouse=True)
+def fresh_levels(monkeypatch):
+    monkeypatch.setattr(chat, "_response_format_levels", {})
+
+
+def _leaf_paths(node, prefix=()):
+    if node["type"] != "object":
+        yield prefix, node
+        return
+    assert node["additionalProperties"] is False
+    assert node["required"] == list(node["properties"])
+    for key, child in node["properties"].items():
+        yield from _leaf_paths(child, prefix + (key,))
+
+
+def test_json_schema_mirrors_the_schema_fields():
+    schema = get_schema()
+    leaves = dict(_leaf_paths(document_json_schema(schema)))
+    assert set(leaves) == {field.path for field in schema.iter_fields()}
+    for field in schema.iter_fields():
+        if field.type == "string_list":
+            assert leaves[field.path] == {"type": "array", "items": {"type": "string"}}
+        else:
+            assert leaves[field.path] == {"type": "string"}
+    # 顶层顺序与示例文档一致
+    example = nest(schema.example_values(), schema, include_empty=False)
+    assert list(document_json_schema(schema)["properties"]) == [
+        key for key in schema.root_order if key in example
+    ]
+
+
+def test_structured_generation_uses_the_short_prompt():
+    messages = build_generate_messages("森林", structured=True)
+    assert messages[0]["content"] == STRUCTURED_SYSTEM_PROMPT
+    assert len(STRUCTURED_SYSTEM_PROMPT) < len(SYSTEM_PROMPT) // 2
+    assert build_generate_messages("森林")[0]["content"] == SYSTEM_PROMPT
+
+
+def test_structured_output_can_be_disabled(monkeypatch):
+    assert isinstance(generate_structured_output(), StructuredOutput)
+    monkeypatch.setenv("NANO_BANANA_STRUCTURED_OUTPUT", "0")
+    assert generate_structured_output() is None
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code, message="Invalid parameter: 'response_format' is not supported"):
+        super().__init__(f"Error code: {status_code} - {message}")
+        self.status_code = status_code
+
+
+def _chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class _Completions:
+    def __init__(self, rejected=(), status=400, **error):
+        self.rejected = set(rejected)
+        self.status = status
+        self.error = error
+        self.calls = []
+
+    def _level(self, kwargs):
+        return kwargs.get("response_format", {}).get("type", "none")
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self._level(kwargs) in self.rejected:
+            raise _StatusError(self.status, **self.error)
+        return iter([_chunk('{"画面气质": "冷"}')])
+
+
+def _client(completions, base_url="https://a.test/v1/"):
+    return SimpleNamespace(base_url=base_url, chat=SimpleNamespace(completions=completions))
+
+
+def _run(client, structured):
+    messages = build_generate_messages("森林", structured=True)
+    return list(iter_completion_events(client, messages, model="m", structured=structured))
+
+
+def test_falls_back_through_the_levels_and_remembers_the_working_one():
+    structured = generate_structured_output()
+    completions = _Completions(rejected={"json_schema", "json_object"})
+    events = _run(_client(completions), structured)
+    assert events[-1].type == "done"
+    assert [completions._level(call) for call in completions.calls] == [
+        "json_schema", "json_object", "none",
+    ]
+    first = completions.calls[0]
+    assert first["response_format"]["json_schema"]["schema"] == structured.schema
+    assert first["messages"][0]["content"] == STRUCTURED_SYSTEM_PROMPT
+    # 降级后结构只能靠示例，换回完整提示词
+    assert completions.calls[-1]["messages"][0]["content"] == SYSTEM_PROMPT
+
+    completions.calls.clear()
+    _run(_client(completions), structured)
+    assert [completions._level(call) for call in completions.calls] == ["none"]
+
+    other = _Completions()
+    _run(_client(other, "https://b.test/v1/"), structured)
+    assert [other._level(call) for call in other.calls] == ["json_schema"]
+
+
+def test_other_errors_are_not_treated_as_unsupported_formats():
+    completions = _Completions(rejected={"json_schema"}, status=401)
+    with pytest.raises(_StatusError):
+        _run(_client(completions), generate_structured_output())
+    assert len(completions.calls) == 1
+    assert chat._response_format_levels == {}
+
+
+def test_bad_requests_unrelated_to_the_format_do_not_downgrade():
+    completions = _Completions(
+        rejected={"json_schema"},
+        message="This model's maximum context length is 8192 tokens",
+    )
+    with pytest.raises(_StatusError):
+        _run(_client(completions), generate_structured_output())
+    assert len(completions.calls) == 1
+    assert chat._response_format_levels == {}
+
+
+def test_remembered_downgrade_expires(monkeypatch):
+    structured = generate_structured_output()
+    completions = _Completions(rejected={"json_schema"})
+    _run(_client(completions), structured)
+    assert chat._response_format_levels
+
+    monkeypatch.setattr(chat, "FORMAT_LEVEL_TTL", -1)
+    completions.rejected.clear()
+    completions.calls.clear()
+    _run(_client(completions), structured)
+    assert [completions._level(call) for call in completions.calls] == ["json_schema"]
+    assert chat._response_format_levels == {}
+
+
+def test_async_completion_falls_back_too():
+    completions = _Completions(rejected={"json_schema"})
+
+    async def create(**kwargs):
+        stream = completions.create(**kwargs)
+
+        async def chunks():
+            for chunk in stream:
+                yield chunk
+
+        return chunks()
+
+    client = SimpleNamespace(
+        base_url="https://a.test/v1/",
+        chat=SimpleNamespace(completions=SimpleNamespace(create=create)),
+    )
+
+    async def collect():
+        messages = build_generate_messages("森林", structured=True)
+        return [
+            event
+            async for event in aiter_completion_events(
+                client, messages, model="m", structured=generate_structured_output()
+            )
+        ]
+
+    events = asyncio.run(collect())
+    assert json.loads(events[-1].text) == {"画面气质": "冷"}
+    assert [completions._level(call) for call in completions.calls] == ["json_schema", "json_object"]
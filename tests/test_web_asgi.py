@@ -0,0 +1,217 @@
+import asyncio
+import json
+import threading
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from nano_banana.core.chat import astream_chat
+from nano_banana.core.client_pool import get_client_pool
+from nano_banana.web import context
+from nano_banana.web.asgi import NanoBananaASGI
+
+CHAT_CONFIG = {
+    "base_url": "https://example.test/v1",
+    "api_key": "test-key",
+    "model": "reasoning-model",
+}
+
+
+def _chunk(content="", reasoning=None):
+    delta = SimpleNamespace(content=content, reasoning_content=reasoning)
+    return SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+
+class _AsyncStream:
+    opened = []
+
+    def __init__(self, chunks, delay):
+        self._chunks = list(chunks)
+        self._delay = delay
+        self.closed = False
+        type(self).opened.append(self)
+
+    async def close(self):
+        self.closed = True
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if not self._chunks:
+            raise StopAsyncIteration
+        await asyncio.sleep(self._delay)
+        return self._chunks.pop(0)
+
+
+class DummyAsyncOpenAI:
+    delay = 0.0
+    created = 0
+
+    def __init__(self, **_kwargs):
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        assert kwargs["stream"] is True
+        type(self).created += 1
+        return _AsyncStream(
+            [_chunk(reasoning="thinking"), _chunk('{"scene":'), _chunk('"forest"}')], self.delay
+        )
+
+
+class DummyAsyncHttpClient:
+    instances = []
+
+    def __init__(self, **_kwargs):
+        self.closed = False
+        type(self).instances.append(self)
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture()
+def upstream():
+    DummyAsyncOpenAI.delay = 0.0
+    DummyAsyncOpenAI.created = 0
+    DummyAsyncHttpClient.instances = []
+    _AsyncStream.opened = []
+    get_client_pool().clear()
+    with (
+        patch.object(context.config_manager, "load_config", return_value=dict(CHAT_CONFIG)),
+        patch("openai.AsyncOpenAI", DummyAsyncOpenAI),
+        patch("httpx.AsyncClient", DummyAsyncHttpClient),
+    ):
+        yield
+    get_client_pool().clear()
+
+
+async def _request(app, path, payload, *, disconnect_after=None):
+    body = json.dumps(payload).encode()
+    messages = []
+    disconnected = asyncio.Event()
+    sent_body = False
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if disconnect_after is not None and len(messages) >= disconnect_after:
+            disconnected.set()
+
+    scope = {"type": "http", "method": "POST", "path": path, "headers": []}
+    await app(scope, receive, send)
+    status = messages[0]["status"]
+    text = b"".join(m.get("body", b"") for m in messages[1:]).decode()
+    return status, dict(messages[0]["headers"]), text
+
+
+def test_async_chat_endpoints_stream_the_existing_sse_protocol(upstream):
+    app = NanoBananaASGI()
+    for path, payload in [
+        ("/api/generate", {"prompt": "a forest"}),
+        ("/api/modify", {"current_data": "{}", "modify_request": "add a forest"}),
+    ]:
+        status, headers, text = asyncio.run(_request(app, path, payload))
+        assert status == 200
+        assert headers[b"content-type"].startswith(b"text/event-stream")
+        assert headers[b"x-accel-buffering"] == b"no"
+        assert text.startswith('data: {"status": "started"}\n\n')
+        assert 'data: {"status": "thinking"}' in text
+        assert text.endswith("data: [DONE]\n\n")
+    # 同一事件循环内复用一个客户端；每条上游响应读完即关闭，借出随之归还
+    assert all(stream.closed for stream in _AsyncStream.opened)
+    assert get_client_pool().in_use() == 0
+
+
+def test_async_chat_validates_like_the_flask_blueprint(upstream):
+    app = NanoBananaASGI()
+    status, _, text = asyncio.run(_request(app, "/api/modify", {"current_data": "{}"}))
+    assert status == 400
+    assert json.loads(text) == {"error": "当前数据和修改要求不能为空"}
+
+    with patch.object(context.config_manager, "load_config", return_value={**CHAT_CONFIG, "api_key": ""}):
+        status, _, text = asyncio.run(_request(app, "/api/generate", {"prompt": "x"}))
+    assert status == 400
+    assert DummyAsyncOpenAI.created == 0
+
+
+def test_client_disconnect_cancels_the_upstream_stream(upstream):
+    DummyAsyncOpenAI.delay = 0.5
+    app = NanoBananaASGI()
+    status, _, text = asyncio.run(
+        _request(app, "/api/generate", {"prompt": "a forest"}, disconnect_after=2)
+    )
+    assert status == 200
+    assert "[DONE]" not in text
+    assert _AsyncStream.opened[0].closed
+    assert get_client_pool().in_use() == 0
+
+
+def test_hundreds_of_streams_share_one_thread(upstream):
+    DummyAsyncOpenAI.delay = 0.01
+    app = NanoBananaASGI()
+    threads_before = threading.active_count()
+
+    async def run_all():
+        return await asyncio.gather(
+            *(_request(app, "/api/generate", {"prompt": f"p{i}"}) for i in range(300))
+        )
+
+    results = asyncio.run(run_all())
+    assert all(text.endswith("data: [DONE]\n\n") for _, _, text in results)
+    # messages_for 借用默认线程池片刻，但流本身不按连接数占线程
+    assert threading.active_count() - threads_before < 50
+
+
+def test_astream_chat_reports_missing_config_and_content(upstream):
+    async def collect(**overrides):
+        settings = {**CHAT_CONFIG, **overrides}
+        return [event async for event in astream_chat([], **settings)]
+
+    assert [e.type for e in asyncio.run(collect(api_key=""))] == ["error"]
+    events = asyncio.run(collect())
+    assert [e.type for e in events] == ["thinking", "content", "content", "done"]
+    assert events[-1].text == '{"scene":"forest"}'
+
+
+def test_other_routes_fall_through_to_flask():
+    pytest.importorskip("a2wsgi")
+    app = NanoBananaASGI()
+
+    async def get(path):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "GET",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": b"",
+            "root_path": "",
+            "headers": [(b"host", b"testserver")],
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 1234),
+        }
+        await app(scope, receive, send)
+        return messages[0]["status"], b"".join(m.get("body", b"") for m in messages[1:])
+
+    status, body = asyncio.run(get("/api/schema"))
+    assert status == 200
+    assert json.loads(body)
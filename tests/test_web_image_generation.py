@@ -1,6 +1,8 @@
 import importlib.util
 import re
+from io import BytesIO
 import sys
+import threading
 import unittest
 from pathlib import Path
 from unittest.mock import patch
@@ -18,15 +20,20 @@ spec = importlib.util.spec_from_file_location(
 web_app = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(web_app)
 
+from nano_banana.core.images import ImageData, ImageResult  # noqa: E402
+from nano_banana.web.context import image_store, job_manager  # noqa: E402
+
 
 class DummyImageClient:
     def __init__(self):
         self.options = None
+        self.images = None
 
     def set_generation_options(self, options):
         self.options = options
 
     def generate_image(self, text, images=None):
+        self.images = images
         return Image.new("RGB", (2, 2), "white")
 
 
@@ -160,6 +167,8 @@ class WebImageGenerationApiTests(unittest.TestCase):
                     "provider": "qwen_image",
                     "model": "requested-model",
                     "options": {"aspect_ratio": "16:9"},
+                    "images": ["data:image/png;base64,cmVm"],
+                    "wait": True,
                 },
             )
 
@@ -171,6 +180,9 @@ class WebImageGenerationApiTests(unittest.TestCase):
             "requested-model",
         )
         self.assertEqual(image_client.options, {"aspect_ratio": "16:9"})
+        self.assertEqual(
+            image_client.images, [ImageData(data=b"ref", mime_type="image/png")]
+        )
 
     def test_generate_image_returns_provider_error_verbatim(self):
         raw_error = (
@@ -213,12 +225,165 @@ class WebImageGenerationApiTests(unittest.TestCase):
                     "provider": "doubao_image",
                     "model": "doubao-seedream-5-0-pro-260628",
                     "options": {},
+                    "wait": True,
                 },
             )
 
         self.assertEqual(response.status_code, 500)
         self.assertEqual(response.get_json()["error"], raw_error)
 
+    def test_generate_image_returns_job_by_default_and_reports_result(self):
+        credentials = {
+            "base_url": "https://gemini.example",
+            "api_key": "gemini-key",
+            "model": "gemini-3-pro-image-preview",
+        }
+        with (
+            patch.object(
+                web_app.config_manager,
+                "get_image_provider_config",
+                return_value=credentials,
+            ),
+            patch.object(
+                web_app.config_manager, "set_active_image_selection", return_value=True
+            ),
+            patch.object(
+                web_app.config_manager, "save_image_generation_options", return_value=True
+            ),
+            patch(
+                "nano_banana.web.blueprints.images.create_image_provider_from_credentials",
+                return_value=DummyImageClient(),
+            ),
+        ):
+            response = self.client.post(
+                "/api/generate-image",
+                json={"prompt": "test prompt", "provider": "gemini"},
+            )
+            self.assertEqual(response.status_code, 202)
+            job_id = response.get_json()["job_id"]
+            events = self.client.get(f"/api/jobs/{job_id}/events").get_data(as_text=True)
+
+        self.assertIn('"status": "done"', events)
+        status = self.client.get(f"/api/jobs/{job_id}").get_json()
+        self.assertEqual(status["status"], "done")
+        self.assertNotIn("image", status["result"])
+        image = self.client.get(status["result"]["image_url"])
+        self.assertEqual(image.mimetype, "image/png")
+        self.assertEqual(Image.open(BytesIO(image.data)).size, (2, 2))
+        self.assertEqual(self.client.get("/api/jobs/missing").status_code, 404)
+
+    def test_generate_image_variants_return_each_result(self):
+        class FailingImageClient(DummyImageClient):
+            def generate_image(self, text, images=None):
+                raise RuntimeError("variant failed")
+
+        credentials = {
+            "base_url": "https://gemini.example",
+            "api_key": "gemini-key",
+            "model": "gemini-3-pro-image-preview",
+        }
+        with (
+            patch.object(
+                web_app.config_manager,
+                "get_image_provider_config",
+                return_value=credentials,
+            ),
+            patch.object(
+                web_app.config_manager, "set_active_image_selection", return_value=True
+            ),
+            patch.object(
+                web_app.config_manager, "save_image_generation_options", return_value=True
+            ),
+            patch(
+                "nano_banana.web.blueprints.images.create_image_provider_from_credentials",
+                side_effect=[DummyImageClient(), FailingImageClient()],
+            ),
+        ):
+            response = self.client.post(
+                "/api/generate-image",
+                json={
+                    "prompt": "test prompt",
+                    "provider": "gemini",
+                    "variants": 2,
+                    "wait": True,
+                },
+            )
+
+        self.assertEqual(response.status_code, 200)
+        results = {item["variant"]: item for item in response.get_json()["results"]}
+        self.assertTrue(results[0]["image_url"].startswith("/api/images/"))
+        self.assertEqual(results[1]["error"], "variant failed")
+
+    def test_sync_generate_image_stops_waiting_after_timeout(self):
+        release = threading.Event()
+
+        class SlowImageClient(DummyImageClient):
+            def generate_image(self, text, images=None):
+                release.wait(5)
+                return super().generate_image(text, images)
+
+        credentials = {
+            "base_url": "https://gemini.example",
+            "api_key": "gemini-key",
+            "model": "gemini-3-pro-image-preview",
+        }
+        with (
+            patch.object(
+                web_app.config_manager,
+                "get_image_provider_config",
+                return_value=credentials,
+            ),
+            patch.object(
+                web_app.config_manager, "set_active_image_selection", return_value=True
+            ),
+            patch.object(
+                web_app.config_manager, "save_image_generation_options", return_value=True
+            ),
+            patch(
+                "nano_banana.web.blueprints.images.create_image_provider_from_credentials",
+                return_value=SlowImageClient(),
+            ),
+        ):
+            response = self.client.post(
+                "/api/generate-image",
+                json={
+                    "prompt": "test prompt",
+                    "provider": "gemini",
+                    "wait": True,
+                    "timeout": 0.05,
+                },
+            )
+            release.set()
+
+        self.assertEqual(response.status_code, 202)
+        job_id = response.get_json()["job_id"]
+        self.assertEqual(job_manager.wait(job_id, timeout=5).status, "done")
+
+    def test_image_endpoint_serves_bytes_with_etag_range_and_thumbnail(self):
+        buffer = BytesIO()
+        Image.new("RGB", (600, 300), "navy").save(buffer, format="PNG")
+        stored = image_store.put(ImageResult(buffer.getvalue()))
+        url = f"/api/images/{stored.id}"
+
+        full = self.client.get(url)
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full.data, stored.data)
+        self.assertIn("immutable", full.headers["Cache-Control"])
+        etag = full.headers["ETag"]
+
+        cached = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(cached.status_code, 304)
+
+        partial = self.client.get(url, headers={"Range": "bytes=0-9"})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.data, stored.data[:10])
+
+        thumb = self.client.get(f"{url}?size=128")
+        self.assertEqual(thumb.mimetype, "image/jpeg")
+        self.assertEqual(Image.open(BytesIO(thumb.data)).size, (128, 64))
+        self.assertEqual(self.client.get(f"{url}?size=77").status_code, 400)
+        self.assertEqual(self.client.get("/api/images/missing").status_code, 404)
+
 
 if __name__ == "__main__":
     unittest.main()
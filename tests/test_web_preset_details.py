@@ -0,0 +1,91 @@
+import json
+import os
+from unittest.mock import patch
+
+import pytest
+
+from nano_banana.core.presets import PresetManager
+from nano_banana.web.app import create_app
+
+
+@pytest.fixture()
+def client(tmp_path):
+    manager = PresetManager(tmp_path)
+    for index, name in enumerate(["甲", "乙", "丙"]):
+        manager.save_preset(
+            name,
+            {"风格模式": f"风格{name}", "场景": {"环境": {"光线": f"光线{name}"}}},
+        )
+        mtime = (index + 1) * 1_000_000_000
+        os.utime(tmp_path / f"{name}.json", ns=(mtime, mtime))
+    manager.store.refresh("", force=True)
+    with patch("nano_banana.web.blueprints.presets.preset_manager", manager):
+        yield create_app().test_client(), manager
+
+
+def test_details_without_params_keep_the_array_contract(client):
+    http, _ = client
+    response = http.get("/api/presets/details")
+    assert response.status_code == 200
+    assert [item["风格模式"] for item in response.get_json()] == ["风格丙", "风格乙", "风格甲"]
+
+
+def test_details_are_cursor_paginated_and_projected(client):
+    http, _ = client
+    first = http.get("/api/presets/details?limit=2&fields=scene").get_json()
+    assert [item["name"] for item in first["items"]] == ["丙", "乙"]
+    assert first["items"][0]["data"] == {"场景": {"环境": {"光线": "光线丙"}}}
+    assert first["next_cursor"]
+
+    second = http.get(
+        f"/api/presets/details?limit=2&fields=scene&cursor={first['next_cursor']}"
+    ).get_json()
+    assert [item["name"] for item in second["items"]] == ["甲"]
+    assert second["next_cursor"] is None
+
+    assert http.get("/api/presets/details?cursor=not-a-cursor").status_code == 400
+    assert http.get("/api/presets/details?fields=unknown").status_code == 400
+
+
+def test_details_stream_as_ndjson(client):
+    http, _ = client
+    response = http.get("/api/presets/details?format=ndjson&limit=2")
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line["name"] for line in lines] == ["丙", "乙"]
+    assert response.headers["X-Next-Cursor"]
+
+    everything = http.get("/api/presets/details", headers={"Accept": "application/x-ndjson"})
+    assert len(everything.get_data(as_text=True).splitlines()) == 3
+
+
+def test_ndjson_page_reads_the_library_once(client):
+    http, manager = client
+    with patch.object(
+        manager, "get_preset_details_page", wraps=manager.get_preset_details_page
+    ) as page:
+        response = http.get("/api/presets/details?format=ndjson&limit=2&fields=scene")
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert page.call_count == 1
+    assert lines[0]["data"] == {"场景": {"环境": {"光线": "光线丙"}}}
+    follow = http.get(
+        f"/api/presets/details?format=ndjson&limit=2&cursor={response.headers['X-Next-Cursor']}"
+    )
+    assert [json.loads(line)["name"] for line in follow.get_data(as_text=True).splitlines()] == ["甲"]
+    assert "X-Next-Cursor" not in follow.headers
+
+
+def test_details_etag_revalidates_until_the_library_changes(client):
+    http, manager = client
+    response = http.get("/api/presets/details?limit=2")
+    etag = response.headers["ETag"]
+    assert not etag.startswith("W/")
+
+    cached = http.get("/api/presets/details?limit=2", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert http.get("/api/presets/details?limit=1", headers={"If-None-Match": etag}).status_code == 200
+
+    manager.save_preset("乙", {"风格模式": "新风格"})
+    changed = http.get("/api/presets/details?limit=2", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
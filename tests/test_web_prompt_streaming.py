@@ -19,6 +19,8 @@ spec = importlib.util.spec_from_file_location(
 web_app = importlib.util.module_from_spec(spec)
 spec.loader.exec_module(web_app)
 
+from nano_banana.core.client_pool import get_client_pool
+
 
 class DummyHttpClient:
     def __init__(self):
@@ -61,8 +63,10 @@ class DummyCompletions:
 
 class DummyOpenAI:
     completions = None
+    instances = 0
 
     def __init__(self, **_kwargs):
+        type(self).instances += 1
         type(self).completions = DummyCompletions()
         self.chat = SimpleNamespace(completions=type(self).completions)
 
@@ -70,6 +74,8 @@ class DummyOpenAI:
 class WebPromptStreamingApiTests(unittest.TestCase):
     def setUp(self):
         self.client = web_app.app.test_client()
+        get_client_pool().clear()
+        self.addCleanup(get_client_pool().clear)
 
     def test_prompt_endpoints_start_before_upstream_and_report_thinking(self):
         cases = [
@@ -86,6 +92,7 @@ class WebPromptStreamingApiTests(unittest.TestCase):
 
         for endpoint, payload in cases:
             with self.subTest(endpoint=endpoint):
+                get_client_pool().clear()
                 http_client = DummyHttpClient()
                 with (
                     patch.object(
@@ -122,9 +129,33 @@ class WebPromptStreamingApiTests(unittest.TestCase):
                         remaining,
                     )
                     self.assertTrue(remaining.endswith("data: [DONE]\n\n"))
-                    self.assertTrue(http_client.closed)
+                    # 连接池里的客户端留给下一条流复用，流结束后归还
+                    self.assertFalse(http_client.closed)
+                    self.assertEqual(get_client_pool().in_use(), 0)
+
+    def test_streams_to_the_same_endpoint_reuse_one_pooled_client(self):
+        DummyOpenAI.instances = 0
+        with (
+            patch.object(
+                web_app.config_manager,
+                "load_config",
+                return_value={
+                    "base_url": "https://example.test/v1",
+                    "api_key": "test-key",
+                    "model": "reasoning-model",
+                },
+            ),
+            patch("openai.OpenAI", DummyOpenAI),
+            patch("httpx.Client", return_value=DummyHttpClient()) as http_client_class,
+        ):
+            for _ in range(3):
+                response = self.client.post("/api/generate", json={"prompt": "a forest"})
+                self.assertTrue(response.get_data(as_text=True).endswith("data: [DONE]\n\n"))
 
-    def test_abort_after_started_closes_http_client_without_calling_upstream(self):
+        self.assertEqual(DummyOpenAI.instances, 1)
+        self.assertEqual(http_client_class.call_count, 1)
+
+    def test_abort_after_started_releases_client_without_calling_upstream(self):
         http_client = DummyHttpClient()
         with (
             patch.object(
@@ -154,7 +185,8 @@ class WebPromptStreamingApiTests(unittest.TestCase):
             response.close()
 
         self.assertFalse(DummyOpenAI.completions.create_called)
-        self.assertTrue(http_client.closed)
+        self.assertFalse(http_client.closed)
+        self.assertEqual(get_client_pool().in_use(), 0)
 
 
 @unittest.skipUnless(shutil.which("node"), "Node.js is required for browser parser tests")
@@ -181,6 +213,18 @@ try {
 if (errorMessage !== 'upstream failed') {
     throw new Error('server error was not surfaced');
 }
+const field = parseSseJsonEvent('{"field":{"id":"lighting","path":["a"],"value":"x"}}');
+if (field.type !== 'field' || field.field.value !== 'x') {
+    throw new Error('field event was not parsed');
+}
+const invalid = parseSseJsonEvent('{"invalid":"bad json"}');
+if (invalid.type !== 'invalid' || invalid.message !== 'bad json') {
+    throw new Error('invalid event was not parsed');
+}
+const result = parseSseJsonEvent('{"result":{"a":"b"}}');
+if (result.type !== 'result' || result.result.a !== 'b') {
+    throw new Error('result event was not parsed');
+}
 """
 
         result = subprocess.run(
@@ -0,0 +1,83 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+from nano_banana.web.serve import build_parser, gunicorn_options, main
+
+
+def test_serve_options_default_to_threads_with_long_timeouts(monkeypatch):
+    monkeypatch.delenv("NANO_BANANA_WEB_THREADS", raising=False)
+    options = gunicorn_options(build_parser().parse_args(["serve"]))
+
+    assert options["bind"] == "0.0.0.0:5000"
+    assert options["worker_class"] == "gthread"
+    assert options["workers"] == 1
+    assert options["threads"] == 32
+    assert options["timeout"] >= 300
+    assert options["graceful_timeout"] > 0
+    assert options["preload_app"] is False
+
+
+def test_serve_options_come_from_flags_and_environment(monkeypatch):
+    monkeypatch.setenv("NANO_BANANA_WEB_THREADS", "8")
+    monkeypatch.setenv("NANO_BANANA_WEB_PORT", "8080")
+    args = build_parser().parse_args(["serve", "--workers", "3", "--graceful-timeout", "30"])
+    options = gunicorn_options(args)
+
+    assert options["bind"] == "0.0.0.0:8080"
+    assert (options["workers"], options["threads"], options["graceful_timeout"]) == (3, 8, 30)
+
+
+def test_dev_flag_and_bare_command_run_the_development_server():
+    with patch("nano_banana.web.app.main") as run_dev:
+        assert main(["serve", "--dev", "--port", "5001"]) == 0
+        run_dev.assert_called_once_with(host="0.0.0.0", port=5001)
+    with patch("nano_banana.web.app.main") as run_dev:
+        assert main([]) == 0
+        run_dev.assert_called_once_with()
+
+
+def test_multiple_workers_share_job_state_through_a_directory(monkeypatch, tmp_path):
+    # 置空而不是删除，测试结束后 monkeypatch 会撤掉 main 写入的值
+    monkeypatch.setenv("NANO_BANANA_SHARED_STATE_DIR", "")
+    with patch("nano_banana.web.serve.run_production", return_value=0) as run_production:
+        assert main(["serve", "--workers", "2"]) == 0
+        run_production.assert_called_once()
+    assert os.environ["NANO_BANANA_SHARED_STATE_DIR"].endswith(os.path.join("data", "shared"))
+
+    with patch("nano_banana.web.serve.run_asgi", return_value=0) as run_asgi:
+        assert main(["serve", "--asgi", "--workers", "4", "--shared-dir", str(tmp_path)]) == 0
+        run_asgi.assert_called_once()
+    assert os.environ["NANO_BANANA_SHARED_STATE_DIR"] == str(tmp_path)
+
+
+def test_single_worker_keeps_job_state_in_memory(monkeypatch):
+    # 置空而不是删除，测试结束后 monkeypatch 会撤掉 main 写入的值
+    monkeypatch.setenv("NANO_BANANA_SHARED_STATE_DIR", "")
+    with patch("nano_banana.web.serve.run_production", return_value=0):
+        assert main(["serve"]) == 0
+    assert os.environ["NANO_BANANA_SHARED_STATE_DIR"] == ""
+
+
+def test_cli_does_not_build_the_app_before_workers_fork():
+    code = "import sys, nano_banana.web.serve; print('nano_banana.web.context' in sys.modules)"
+    src = str(Path(__file__).resolve().parents[1] / "src")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))}
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env
+    )
+    assert output.stdout.strip() == "False"
+
+
+def test_asgi_options_drain_within_the_graceful_timeout():
+    from nano_banana.web.serve import uvicorn_options
+
+    args = build_parser().parse_args(["serve", "--asgi", "--port", "8000", "--graceful-timeout", "45"])
+    options = uvicorn_options(args)
+
+    assert args.asgi
+    assert (options["host"], options["port"]) == ("0.0.0.0", 8000)
+    assert options["timeout_graceful_shutdown"] == 45
+    assert options["lifespan"] == "on"
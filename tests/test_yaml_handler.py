@@ -1,12 +1,17 @@
 import sys
 import tempfile
+import time
 import unittest
 from pathlib import Path
+from unittest.mock import patch
+
+import yaml
 
 
 ROOT = Path(__file__).resolve().parents[1]
 sys.path.insert(0, str(ROOT / "src"))
 
+from nano_banana.core.yaml_io import write_yaml_atomic
 from utils.yaml_handler import YamlHandler
 
 
@@ -56,6 +61,65 @@ class YamlHandlerTests(unittest.TestCase):
 
             self.assertEqual(handler.get_field_options("反向提示词标签"), [])
 
+    def test_fields_are_served_from_memory_until_the_file_changes(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = YamlHandler()
+            handler.config_path = Path(temp_dir) / "options.yaml"
+            handler.save_options({"场景": ["森林"], "光线": ["逆光"]})
+
+            with patch("yaml.load", wraps=yaml.load) as load:
+                self.assertEqual(handler.get_field_options("场景"), ["森林"])
+                self.assertEqual(handler.get_field_options("光线"), ["逆光"])
+                self.assertEqual(load.call_count, 0)
+
+                handler.config_path.write_text(
+                    yaml.safe_dump({"场景": ["外部修改后的城市"]}, allow_unicode=True),
+                    encoding="utf-8",
+                )
+                self.assertEqual(handler.get_field_options("场景"), ["外部修改后的城市"])
+                self.assertEqual(load.call_count, 1)
+
+    def test_batch_writes_once_on_exit(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = YamlHandler()
+            handler.config_path = Path(temp_dir) / "options.yaml"
+            handler.save_options({"场景": ["森林"]})
+
+            with patch(
+                "nano_banana.core.storage.files.write_yaml_atomic",
+                wraps=write_yaml_atomic,
+            ) as write:
+                with handler.batch():
+                    handler.add_option("场景", "城市")
+                    handler.add_option("场景", "城市")
+                    handler.update_option("场景", "森林", "雪山")
+                    handler.remove_option("反向提示词标签", "水印、签名、文字")
+                    self.assertEqual(write.call_count, 0)
+                self.assertEqual(write.call_count, 1)
+
+            written = yaml.safe_load(handler.config_path.read_text(encoding="utf-8"))
+            self.assertEqual(written["场景"], ["雪山", "城市"])
+            self.assertEqual(written["反向提示词标签"], [])
+
+    def test_edits_are_flushed_in_the_background(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            handler = YamlHandler()
+            handler.FLUSH_DELAY = 0.01
+            handler.config_path = Path(temp_dir) / "options.yaml"
+            handler.save_options({})
+
+            handler.add_option("场景", "森林")
+            self.assertEqual(handler.get_field_options("场景"), ["森林"])
+
+            deadline = time.monotonic() + 2
+            while time.monotonic() < deadline:
+                written = yaml.safe_load(handler.config_path.read_text(encoding="utf-8"))
+                if written:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(written, {"场景": ["森林"]})
+            self.assertEqual(list(Path(temp_dir).glob("*.tmp")), [])
+
 
 if __name__ == "__main__":
     unittest.main()